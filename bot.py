@@ -1,10 +1,14 @@
 import logging
+from urllib.parse import urlsplit
+
 from aiogram import Bot, Dispatcher, types
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher import filters
 from aiogram.utils import executor
 
+from config import REDIS_URL, STATE_BACKEND
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
@@ -12,7 +16,25 @@ API_TOKEN = 'YOUR_API_TOKEN'
 
 # Initialize bot and dispatcher
 bot = Bot(token=API_TOKEN)
-storage = MemoryStorage()
+
+
+# FSM state lives in Redis when several bot instances share the state (STATE_BACKEND=redis)
+def _make_storage():
+    if STATE_BACKEND != "redis":
+        return MemoryStorage()
+    from aiogram.contrib.fsm_storage.redis import RedisStorage2
+
+    url = urlsplit(REDIS_URL)
+    return RedisStorage2(
+        host=url.hostname or "localhost",
+        port=url.port or 6379,
+        db=int(url.path.lstrip("/") or 0),
+        password=url.password,
+        ssl=url.scheme == "rediss",
+    )
+
+
+storage = _make_storage()
 dispatcher = Dispatcher(bot, storage=storage)
 
 # Command handler for /start
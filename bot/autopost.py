@@ -0,0 +1,248 @@
+"""
+Автопостинг новостей в каналы пользователей.
+За один цикл: активные каналы → объединение их источников → каждый источник загружается
+ровно один раз, из ленты разбираются только записи новее прошлого цикла (parser/ingest.py) →
+новые новости раздаются всем каналам, подписанным на источник
+(обратный индекс «источник → каналы» берётся из снимка каналов в памяти).
+Стоимость цикла растёт с числом различных источников, а не каналов × источников;
+каждая новость обобщается один раз, сколько бы каналов её ни получили.
+Если планировщиков несколько (STATE_BACKEND=redis), цикл одновременно идёт только в одном из них
+(блокировка в общем состоянии), а каждая публикация «канал + новость» отмечается перед отправкой.
+Картинка новости определяется один раз и во все каналы, кроме первого, уходит по file_id (bot/media.py).
+Новость, которую не удалось подготовить или отправить, повторяется в следующих циклах
+(лента остаётся на прежней отметке), но не больше AUTOPOST_MAX_ATTEMPTS раз.
+"""
+import asyncio
+import logging
+from contextlib import suppress
+from urllib.parse import urlsplit
+
+from telegram import Bot
+
+from bot.media import media_pipeline
+from bot.pipeline import render_many
+from bot.send_queue import CHANNEL
+from config import (
+    AUTOPOST_CONCURRENCY,
+    AUTOPOST_LOCK_TTL,
+    AUTOPOST_MAX_ATTEMPTS,
+    AUTOPOST_MAX_PER_CHANNEL,
+    POSTED_CLAIM_TTL,
+)
+from database.channels import ActiveChannel, channel_snapshot, load_posted, mark_posted
+from parser.base import NewsItem, published_key
+from parser.dedup import story_index
+from parser.executor import background_parsing
+from parser.ingest import feed_ingest
+from parser.registry import SOURCE_FEEDS
+from utils.state import state_backend
+from utils.urls import normalize_url, url_hash
+
+logger = logging.getLogger(__name__)
+
+# Неудачные попытки публикации (channel_id, url_hash) → сколько циклов подряд не удалось
+_attempts: dict[tuple[int, int], int] = {}
+
+
+def feed_url_for_source(source_url: str) -> str:
+    """URL ленты для источника канала: для известных сайтов — их RSS, иначе сама ссылка."""
+    parts = urlsplit(normalize_url(source_url))
+    if parts.path in ("", "/") and parts.netloc in SOURCE_FEEDS:
+        return SOURCE_FEEDS[parts.netloc]
+    return source_url
+
+
+async def _fetch_source(feed_url: str) -> list[NewsItem]:
+    """Новые с прошлого цикла записи ленты источника."""
+    try:
+        return await feed_ingest.fetch_new(feed_url)
+    except Exception:
+        logger.exception("Не удалось загрузить ленту %s", feed_url)
+        return []
+
+
+def _merge_duplicates(items_by_source: dict[str, list[NewsItem]]) -> dict[str, list[NewsItem]]:
+    """
+    Заменяет почти-дубликаты (одна история в разных источниках или уже встречавшаяся раньше)
+    представителем истории: статью загружает и обобщает только он, каналы получают его один раз.
+    """
+    representatives = story_index.cluster([item for items in items_by_source.values() for item in items])
+    merged = {}
+    for source, items in items_by_source.items():
+        unique: dict[int, NewsItem] = {}
+        for item in items:
+            rep = representatives[url_hash(item.url)]
+            unique.setdefault(url_hash(rep.url), rep)
+        merged[source] = list(unique.values())
+    return merged
+
+
+def _plan(
+    source_index: dict[str, set[int]],
+    items_by_source: dict[str, list[NewsItem]],
+    posted: set[tuple[int, int]],
+) -> tuple[dict[int, list[tuple[int, NewsItem]]], list[tuple[int, int]]]:
+    """
+    Что публиковать в каждый канал: не больше AUTOPOST_MAX_PER_CHANNEL самых свежих новых новостей
+    (от старых к новым). Более старые новые новости помечаются пропущенными, чтобы не копить хвост.
+    """
+    fresh: dict[int, dict[int, NewsItem]] = {}
+    for source, items in items_by_source.items():
+        channel_ids = source_index.get(source, ())
+        for item in items:
+            h = url_hash(item.url)
+            for channel_id in channel_ids:
+                if (channel_id, h) not in posted:
+                    fresh.setdefault(channel_id, {}).setdefault(h, item)
+    plan: dict[int, list[tuple[int, NewsItem]]] = {}
+    skipped: list[tuple[int, int]] = []
+    for channel_id, channel_fresh in fresh.items():
+        ordered = sorted(channel_fresh.items(), key=lambda pair: published_key(pair[1]), reverse=True)
+        plan[channel_id] = list(reversed(ordered[:AUTOPOST_MAX_PER_CHANNEL]))
+        skipped.extend((channel_id, h) for h, _ in ordered[AUTOPOST_MAX_PER_CHANNEL:])
+    return plan, skipped
+
+
+async def _render_all(items: dict[int, NewsItem]) -> dict[int, str]:
+    """
+    Готовит сообщения для всех новостей цикла: статьи загружаются не больше AUTOPOST_CONCURRENCY
+    одновременно, обобщения делаются одной пачкой через пул обобщений.
+    """
+    hashes = list(items)
+    try:
+        texts = await render_many([items[h] for h in hashes], AUTOPOST_CONCURRENCY)
+    except Exception:
+        logger.exception("Не удалось подготовить новости цикла")
+        return {}
+    return {h: text for h, text in zip(hashes, texts) if text}
+
+
+async def _resolve_images(items: dict[int, NewsItem]) -> dict[int, str | None]:
+    """Картинки новостей цикла (статьи уже в кэше после _render_all), не больше AUTOPOST_CONCURRENCY одновременно."""
+    semaphore = asyncio.Semaphore(AUTOPOST_CONCURRENCY)
+
+    async def resolve(item: NewsItem) -> str | None:
+        async with semaphore:
+            return await media_pipeline.resolve(item)
+
+    hashes = list(items)
+    images = await asyncio.gather(*(resolve(items[h]) for h in hashes))
+    return dict(zip(hashes, images))
+
+
+async def _post_to_channel(
+    bot: Bot,
+    channel: ActiveChannel,
+    queue: list[tuple[int, NewsItem]],
+    messages: dict[int, str],
+    images: dict[int, str | None],
+) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+    """
+    Публикует новости в канал по порядку. Возвращает пары (channel_id, url_hash): опубликованные
+    и неудавшиеся (сообщение не подготовлено или не отправлено) — их повторит следующий цикл.
+    """
+    sent, failed = [], []
+    for h, item in queue:
+        text = messages.get(h)
+        if not text:
+            failed.append((channel.id, h))
+            continue
+        claim_key = f"posted:{channel.id}:{h}"
+        try:
+            if not await state_backend.claim(claim_key, POSTED_CLAIM_TTL):
+                continue  # уже опубликовал другой процесс
+        except Exception as e:
+            # Повторную публикацию отсекает ещё posted_news; от второго планировщика — блокировка цикла
+            logger.debug("Общее состояние недоступно, публикуем без отметки: %s", e)
+        try:
+            await media_pipeline.send(bot, channel.telegram_channel_id, text, images.get(h), CHANNEL)
+        except Exception:
+            logger.warning("Не удалось опубликовать %s в канал %s", item.url, channel.telegram_channel_id)
+            with suppress(Exception):
+                await state_backend.forget(claim_key)
+            failed.append((channel.id, h))
+            continue
+        sent.append((channel.id, h))
+    return sent, failed
+
+
+def _count_attempts(sent: list[tuple[int, int]], failed: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Учитывает неудачные попытки публикации; возвращает пары, исчерпавшие AUTOPOST_MAX_ATTEMPTS:
+    их отмечают пропущенными, чтобы одна «сломанная» новость не держала отметку ленты вечно.
+    """
+    for pair in sent:
+        _attempts.pop(pair, None)
+    exhausted = []
+    for pair in failed:
+        _attempts[pair] = _attempts.get(pair, 0) + 1
+        if _attempts[pair] >= AUTOPOST_MAX_ATTEMPTS:
+            del _attempts[pair]
+            exhausted.append(pair)
+    if exhausted:
+        logger.warning("Новости пропущены после %d неудачных попыток: %d", AUTOPOST_MAX_ATTEMPTS, len(exhausted))
+    return exhausted
+
+
+async def run_autopost_cycle(bot: Bot) -> dict[str, int]:
+    """
+    Один цикл автопостинга по всем активным каналам. Возвращает счётчики цикла.
+    Разбор лент и статей цикла идёт с фоновым приоритетом: ответы по кнопке его обгоняют.
+    Если цикл уже идёт в другом процессе, этот пропускается (счётчики нулевые).
+    """
+    async with state_backend.lock("autopost_cycle", AUTOPOST_LOCK_TTL) as acquired:
+        if not acquired:
+            logger.info("Цикл автопостинга уже идёт в другом процессе, пропускаем")
+            return _empty_stats()
+        with background_parsing():
+            return await _run_autopost_cycle(bot)
+
+
+def _empty_stats() -> dict[str, int]:
+    return {"channels": 0, "sources": 0, "items": 0, "rendered": 0, "sent": 0, "failed": 0}
+
+
+async def _run_autopost_cycle(bot: Bot) -> dict[str, int]:
+    stats = _empty_stats()
+    await channel_snapshot.refresh()
+    channels = channel_snapshot.channels()
+    source_index = channel_snapshot.source_index()
+    if not channels:
+        return stats
+    sources = sorted(source_index)
+    source_urls = channel_snapshot.source_urls()
+    stats["channels"], stats["sources"] = len(channels), len(sources)
+
+    # Ключи индекса нормализованы, загружается же адрес в том виде, в каком его записал владелец канала
+    feeds = {source: feed_url_for_source(source_urls.get(source, source)) for source in sources}
+    results = await asyncio.gather(*(_fetch_source(feeds[source]) for source in sources))
+    items_by_source = _merge_duplicates(dict(zip(sources, results)))
+    all_hashes = list({url_hash(item.url) for items in items_by_source.values() for item in items})
+    stats["items"] = len(all_hashes)
+    posted = await load_posted(all_hashes)
+
+    plan, skipped = _plan(source_index, items_by_source, posted)
+    to_render = {h: item for queue in plan.values() for h, item in queue}
+    messages = await _render_all(to_render)
+    stats["rendered"] = len(messages)
+    images = await _resolve_images({h: to_render[h] for h in messages})
+
+    by_id = {channel.id: channel for channel in channels}
+    results = await asyncio.gather(
+        *(_post_to_channel(bot, by_id[channel_id], queue, messages, images) for channel_id, queue in plan.items() if queue)
+    )
+    sent = [pair for channel_sent, _ in results for pair in channel_sent]
+    failed = [pair for _, channel_failed in results for pair in channel_failed]
+    stats["sent"], stats["failed"] = len(sent), len(failed)
+    exhausted = _count_attempts(sent, failed)
+    await mark_posted(sent + skipped + exhausted)
+    # Отметки лент сдвигаются только после того, как их записи учтены в posted_news;
+    # ленты с неудавшимися новостями остаются на прежней отметке, и следующий цикл их повторит
+    retry_hashes = {h for _, h in set(failed) - set(exhausted)}
+    retry_feeds = {
+        feeds[source]
+        for source, items in items_by_source.items()
+        if any(url_hash(item.url) in retry_hashes for item in items)
+    }
+    await feed_ingest.commit(retry_feeds)
+    return stats
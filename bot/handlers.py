@@ -1,123 +1,114 @@
 """
 Обработчики команд и кнопок бота.
 """
-import html
+import asyncio
 import logging
+from contextlib import suppress
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
-from config import CHANNEL_USERNAME, GEMINI_API_KEY
-from parser.article import fetch_article_full_text_and_image
-from parser.sports_ru import get_football_news_fresh
-from utils.gemini import summarize_for_telegram
+from bot.media import media_pipeline
+from bot.pipeline import render_news
+from bot.prefetch import news_prefetcher
+from bot.send_queue import CHANNEL, INTERACTIVE, get_send_queue
+from bot.sent_news import sent_news
+from config import CHANNEL_USERNAME, POSTED_CLAIM_TTL
+from parser.sports_ru import get_football_news_fresh_async
+from utils.metrics import span
+from utils.state import state_backend
+from utils.urls import url_hash
 
 logger = logging.getLogger(__name__)
 
-MAX_MESSAGE_LENGTH = 4096
+# Идущие публикации в канал: ссылки держим, чтобы задачи не собрал сборщик мусора
+_channel_posts: set[asyncio.Task] = set()
 
 
-def _escape_html(text: str) -> str:
-    """Экранирует HTML для parse_mode='HTML' в Telegram."""
-    return html.escape(text or "", quote=False)
-
-
-_sent_news_by_user: dict[int, set[str]] = {}
-
-
-def _get_next_unique_news(user_id: int):
+async def _get_next_unique_news(user_id: int):
     """Следующая уникальная новость — только футбол, по возможности самая свежая (лента футбола, при пустоте — общая с фильтром)."""
-    news = get_football_news_fresh()
+    news_prefetcher.touch(user_id)
+    with span("feed"):
+        news = await get_football_news_fresh_async()
     if not news:
         return None
-    sent = _sent_news_by_user.setdefault(user_id, set())
-    for item in news:
-        if item.url not in sent:
-            sent.add(item.url)
-            return item
-    _sent_news_by_user[user_id] = {news[0].url}
-    return news[0]
-
-
-def _get_full_text(item) -> str:
-    """Полный текст новости: со страницы статьи или из RSS."""
-    full_text_from_page, _ = fetch_article_full_text_and_image(item.url)
-    full_text = full_text_from_page.strip() if full_text_from_page else (item.summary or "").strip()
-    if not full_text:
-        full_text = item.title
-    return full_text
+    with span("next_unseen"):
+        return await sent_news.next_unseen(user_id, news)
 
 
-def _build_one_message(item, body_text: str) -> str:
-    """Одно сообщение: заголовок + текст + ссылка (влезает в лимит)."""
-    title_safe = _escape_html(item.title)
-    text_safe = _escape_html(body_text)
-    link_part = f'🔗 <a href="{item.url}">Читать на Sports.ru</a>'
-    return f"<b>{title_safe}</b>\n\n{text_safe}\n\n{link_part}"
+async def button_news_man_city(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Получить новость: полный текст → обобщение через Gemini → одно сообщение с картинкой статьи (bot/media.py)."""
+    with span("button"):
+        await _button_news_man_city(update, context)
 
 
-async def button_news_man_city(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Получить новость: полный текст → обобщение через Gemini → одно сообщение (без картинок)."""
+async def _button_news_man_city(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
     user_id = update.effective_user.id if update.effective_user else 0
+    chat_id = query.message.chat_id
+    send_queue = get_send_queue()
+
+    async def reply(text: str, **kwargs) -> None:
+        with span("send"):
+            await send_queue.send(chat_id, lambda: query.message.reply_text(text, **kwargs), priority=INTERACTIVE)
 
     try:
-        item = _get_next_unique_news(user_id)
+        item = await _get_next_unique_news(user_id)
     except Exception:
         logger.exception("Ошибка при загрузке новостей")
-        await query.message.reply_text("Не удалось загрузить новости. Попробуйте позже.")
+        await reply("Не удалось загрузить новости. Попробуйте позже.")
         return
 
     if not item:
-        await query.message.reply_text("Не удалось загрузить футбольные новости. Попробуйте позже.")
+        await reply("Не удалось загрузить футбольные новости. Попробуйте позже.")
         return
 
-    try:
-        full_text = _get_full_text(item)
-    except Exception:
-        logger.exception("Ошибка при загрузке текста статьи")
-        full_text = item.summary or item.title
-
-    # Обобщение через Gemini, чтобы влезло в одно сообщение
-    if GEMINI_API_KEY:
-        try:
-            body_text = summarize_for_telegram(full_text, GEMINI_API_KEY)
-        except Exception:
-            logger.warning("Gemini недоступен, обрезаем текст")
-            body_text = full_text[:3800] + "…" if len(full_text) > 3800 else full_text
-    else:
-        body_text = full_text[:3800] + "…" if len(full_text) > 3800 else full_text
-
-    message_text = _build_one_message(item, body_text)
-    if len(message_text) > MAX_MESSAGE_LENGTH:
-        message_text = message_text[: MAX_MESSAGE_LENGTH - 3] + "…"
+    async def render() -> str:
+        # Сообщение могло быть подготовлено заранее, пока пользователь читал прошлую новость
+        return news_prefetcher.take(user_id, item) or await render_news(item)
+
+    with span("render"):
+        message_text, image_url = await asyncio.gather(render(), media_pipeline.resolve(item))
 
     try:
-        await query.message.reply_text(
-            message_text,
-            parse_mode="HTML",
-            disable_web_page_preview=True,
-        )
+        with span("send"):
+            await media_pipeline.send(context.bot, chat_id, message_text, image_url, INTERACTIVE)
     except Exception:
         logger.exception("Ошибка при отправке сообщения пользователю")
-        await query.message.reply_text("Не удалось отправить новость. Попробуйте ещё раз.")
+        await reply("Не удалось отправить новость. Попробуйте ещё раз.")
         return
+    news_prefetcher.schedule(user_id)
 
     if CHANNEL_USERNAME:
+        # Публикация в канал идёт в фоне: ответ пользователю её не ждёт
         channel_id = f"@{CHANNEL_USERNAME}" if not str(CHANNEL_USERNAME).startswith("-") else CHANNEL_USERNAME
-        try:
-            await context.bot.send_message(
-                chat_id=channel_id,
-                text=message_text,
-                parse_mode="HTML",
-                disable_web_page_preview=True,
-            )
-        except Exception:
-            logger.warning(
-                "Не удалось опубликовать новость в канал %s",
-                channel_id,
-            )
+        task = asyncio.create_task(_post_to_channel(context.bot, channel_id, item.url, message_text, image_url))
+        _channel_posts.add(task)
+        task.add_done_callback(lambda t: _on_channel_posted(channel_id, item.url, t))
+
+
+async def _post_to_channel(bot, channel_id: str, url: str, message_text: str, image_url: str | None) -> None:
+    """Зеркалирует новость в канал, если её ещё не публиковали."""
+    # Ту же новость могли уже опубликовать по нажатию другого пользователя (в том числе на другом экземпляре бота)
+    claim_key = f"channel_post:{channel_id}:{url_hash(url)}"
+    try:
+        if not await state_backend.claim(claim_key, POSTED_CLAIM_TTL):
+            return
+    except Exception as e:
+        logger.debug("Общее состояние недоступно, публикуем без проверки: %s", e)
+    try:
+        await media_pipeline.send(bot, channel_id, message_text, image_url, CHANNEL)
+    except Exception:
+        with suppress(Exception):
+            await state_backend.forget(claim_key)
+        raise
+
+
+def _on_channel_posted(channel_id: str, url: str, task: asyncio.Task) -> None:
+    _channel_posts.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Не удалось опубликовать новость %s в канал %s: %s", url, channel_id, task.exception())
 
 
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -4,7 +4,9 @@
   python -m bot.main
   или
   python bot/main.py
+Обновления принимаются long polling (по умолчанию) или через webhook: BOT_MODE=webhook (bot/webhook.py).
 """
+import asyncio
 import logging
 import sys
 import time
@@ -43,8 +45,24 @@ if __name__ == "__main__":
     try:
         from telegram.ext import Application, CallbackQueryHandler, CommandHandler
 
-        from config import BOT_TOKEN
+        from config import (
+            BOT_MODE,
+            BOT_TOKEN,
+            CONCURRENT_UPDATES,
+            METRICS_HOST,
+            METRICS_PORT,
+            TELEGRAM_API_URL,
+            WEBHOOK_SECRET,
+            WEBHOOK_URL,
+        )
         from bot.handlers import button_news_man_city, cmd_start
+        from bot.prefetch import news_prefetcher
+        from bot.send_queue import close_send_queue
+        from bot.webhook import run_webhook
+        from database import close_async_engine
+        from parser.executor import parse_executor
+        from utils import http_client, metrics
+        from utils.state import state_backend
     except Exception:
         _pause_on_error()
         raise
@@ -55,15 +73,53 @@ if __name__ == "__main__":
     )
     logger = logging.getLogger(__name__)
 
+    async def _on_startup(app) -> None:
+        """Запускает HTTP-эндпоинт метрик и предзагрузку новостей в цикле событий бота."""
+        if METRICS_PORT:
+            await metrics.start_server(METRICS_HOST, METRICS_PORT)
+        news_prefetcher.start()
+
+    async def _on_shutdown(app) -> None:
+        """
+        Останавливает предзагрузку, очередь отправки и сервер метрик, закрывает общий HTTP-пул,
+        пул БД и соединения с общим состоянием при остановке бота.
+        """
+        await news_prefetcher.close()
+        await metrics.stop_server()
+        await close_send_queue()
+        logger.info("HTTP pool: %s", http_client.pool_stats())
+        await http_client.close()
+        await close_async_engine()
+        await state_backend.close()
+        parse_executor.shutdown()
+
     def main() -> None:
         if not BOT_TOKEN:
             logger.error("BOT_TOKEN не задан. Укажите в .env или переменной окружения.")
             return
-        app = Application.builder().token(BOT_TOKEN).build()
+        if BOT_MODE == "webhook" and not (WEBHOOK_URL and WEBHOOK_SECRET):
+            logger.error("BOT_MODE=webhook: задайте WEBHOOK_URL и WEBHOOK_SECRET.")
+            return
+        # concurrent_updates: обработчики разных пользователей выполняются параллельно,
+        # а не в очереди друг за другом
+        app = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .base_url(TELEGRAM_API_URL)
+            .concurrent_updates(CONCURRENT_UPDATES)
+            .post_init(_on_startup)
+            .post_shutdown(_on_shutdown)
+            .build()
+        )
         app.add_handler(CommandHandler("start", cmd_start))
         app.add_handler(CallbackQueryHandler(button_news_man_city, pattern="^news_man_city$"))
-        logger.info("Бот запущен.")
-        app.run_polling(allowed_updates=["message", "callback_query"])
+        allowed_updates = ["message", "callback_query"]
+        if BOT_MODE == "webhook":
+            logger.info("Бот запущен (webhook).")
+            asyncio.run(run_webhook(app, allowed_updates))
+        else:
+            logger.info("Бот запущен.")
+            app.run_polling(allowed_updates=allowed_updates)
 
     try:
         main()
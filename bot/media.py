@@ -0,0 +1,361 @@
+"""
+Картинки к новостям.
+Картинка новости определяется один раз — со страницы статьи (og:image), из RSS или поиском по заголовку
+на Pexels — и помнится MEDIA_CACHE_TTL секунд; ответы Pexels по запросу тоже.
+Первая отправка картинки идёт по ссылке (Telegram скачивает её сам; если не смог — бот скачивает файл
+и загружает его), file_id из ответа сохраняется в памяти, в общем состоянии и в БД (media_files):
+повторные отправки той же картинки пользователям и в каналы идут по file_id, без скачивания и загрузки.
+Одновременные первые отправки одной картинки объединяются: остальные ждут file_id первой.
+Картинку, которую Telegram не принял ни по ссылке, ни файлом (ошибка про саму картинку, а не про чат
+или подпись), MEDIA_CACHE_TTL секунд не пробуем снова.
+Подпись к фото — не длиннее CAPTION_LIMIT символов; более длинное сообщение уходит двумя:
+фото без подписи (тоже по file_id) и следом текст.
+"""
+import hashlib
+import html
+import logging
+import re
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from telegram import Bot, Message
+from telegram.error import BadRequest
+
+from bot.send_queue import get_send_queue
+from config import MEDIA_CACHE_TTL, MEDIA_ENABLED, MEDIA_MAX_BYTES, PEXELS_API_KEY
+from database.media import delete_file_id, get_file_id, save_file_id
+from parser.article import get_article_cached, search_photo_by_query_async
+from parser.base import NewsItem
+from utils import http_client
+from utils.cache import LRUCache, SingleFlight, TTLCache
+from utils.metrics import registry
+from utils.state import state_backend
+from utils.urls import url_hash
+
+logger = logging.getLogger(__name__)
+
+# Лимит подписи к фото в Telegram (видимый текст, в единицах UTF-16)
+CAPTION_LIMIT = 1024
+# Память под найденные картинки и ответы Pexels, байты; сколько file_id держать в памяти
+CACHE_MAX_BYTES = 4 * 1024 * 1024
+FILE_ID_LRU_SIZE = 4096
+# Сколько секунд file_id живёт в общем кэше (STATE_BACKEND=redis); дальше — из БД
+FILE_ID_SHARED_TTL = 7 * 24 * 3600
+# Значение в кэше «картинки нет» (Pexels ничего не нашёл)
+NO_IMAGE = ""
+
+_TAG = re.compile(r"<[^>]+>")
+# Ошибки Bot API про саму картинку (в нижнем регистре); остальные — про чат, права или текст подписи
+_IMAGE_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "failed to get http url content",
+    "wrong type of the web page content",
+    "photo_invalid_dimensions",
+    "photo_ext_invalid",
+    "photo_save_file_invalid",
+    "image_process_failed",
+    "file is too big",
+    "не удалось скачать картинку",
+)
+
+
+def caption_length(message_html: str) -> int:
+    """Длина подписи так, как её считает Telegram: видимый текст без HTML-разметки, в единицах UTF-16."""
+    visible = html.unescape(_TAG.sub("", message_html))
+    return len(visible.encode("utf-16-le")) // 2
+
+
+def _str_size(value: str) -> int:
+    return len(value.encode("utf-8")) + 64
+
+
+def _is_image_error(error: BadRequest) -> bool:
+    """Telegram не принял именно картинку: по ссылке, файлом или по file_id."""
+    message = str(error).lower()
+    return any(marker in message for marker in _IMAGE_ERRORS)
+
+
+def _largest_file_id(message: Message) -> str | None:
+    """file_id самого большого размера фото из отправленного сообщения."""
+    return message.photo[-1].file_id if message.photo else None
+
+
+class MediaPipeline:
+    """Картинки новостей: resolve() — картинка новости, send() — отправка сообщения с картинкой."""
+
+    def __init__(self, enabled: bool, pexels_api_key: str, cache_ttl: float, max_bytes: int):
+        self.enabled = enabled
+        self.pexels_api_key = pexels_api_key
+        self.cache_ttl = cache_ttl
+        self.max_bytes = max_bytes
+        # Хэш URL новости → URL картинки (NO_IMAGE — картинки нет)
+        self._images = TTLCache(cache_ttl, CACHE_MAX_BYTES, _str_size)
+        # Запрос к Pexels → URL фото (NO_IMAGE — ничего не нашлось)
+        self._queries = TTLCache(cache_ttl, CACHE_MAX_BYTES, _str_size)
+        # Хэш URL картинки → file_id
+        self._file_ids = LRUCache(FILE_ID_LRU_SIZE)
+        # Хэши URL картинок, которые Telegram не принял
+        self._broken = TTLCache(cache_ttl, CACHE_MAX_BYTES, lambda _: 64)
+        self._flight = SingleFlight()
+        self._uploads = SingleFlight()
+        self.stats = {
+            "resolved": 0,
+            "no_image": 0,
+            "shared_hits": 0,
+            "pexels_requests": 0,
+            "pexels_errors": 0,
+            "file_id_sent": 0,
+            "file_id_db_hits": 0,
+            "file_id_invalid": 0,
+            "sent_by_url": 0,
+            "uploaded": 0,
+            "upload_coalesced": 0,
+            "photo_failed": 0,
+            "photo_then_text": 0,
+        }
+
+    async def resolve(self, item: NewsItem) -> str | None:
+        """URL картинки новости или None; одновременные запросы одной новости объединяются."""
+        if not self.enabled:
+            return None
+        key = url_hash(item.url)
+        cached = self._images.get(key)
+        if cached is not None:
+            return cached or None
+        return await self._flight.do(("image", key), lambda: self._resolve(key, item))
+
+    async def _shared_get(self, key: str) -> str | None:
+        if not state_backend.shared:
+            return None
+        try:
+            value = await state_backend.get(key)
+        except Exception as e:
+            logger.debug("MediaPipeline: общий кэш недоступен при чтении: %s", e)
+            return None
+        if value is not None:
+            self.stats["shared_hits"] += 1
+        return value
+
+    async def _shared_set(self, key: str, value: str, ttl: float) -> None:
+        if not state_backend.shared:
+            return
+        try:
+            await state_backend.set(key, value, ttl)
+        except Exception as e:
+            logger.debug("MediaPipeline: не удалось сохранить в общий кэш: %s", e)
+
+    async def _resolve(self, key: int, item: NewsItem) -> str | None:
+        shared_key = f"media:image:{key}"
+        shared = await self._shared_get(shared_key)
+        if shared is not None:
+            self._images.set(key, shared)
+            return shared or None
+        full_text, image_url = "", None
+        try:
+            # Статья обычно уже в кэше: её текст нужен для обобщения
+            full_text, image_url = await get_article_cached(item.url)
+        except Exception as e:
+            logger.debug("MediaPipeline: статья %s не загрузилась: %s", item.url, e)
+        image_url = image_url or item.image_url
+        if not image_url:
+            try:
+                image_url = await self.search(item.title)
+            except Exception as e:
+                self.stats["pexels_errors"] += 1
+                logger.debug("MediaPipeline: поиск на Pexels не удался: %s", e)
+                return None  # не запоминаем: попробуем при следующей отправке
+        if not image_url and not full_text:
+            return None  # страница не загрузилась — картинка на ней могла быть
+        self.stats["resolved" if image_url else "no_image"] += 1
+        self._images.set(key, image_url or NO_IMAGE)
+        await self._shared_set(shared_key, image_url or NO_IMAGE, self.cache_ttl)
+        return image_url
+
+    async def search(self, query: str) -> str | None:
+        """Фото на Pexels по запросу (ответ помнится MEDIA_CACHE_TTL секунд); без PEXELS_API_KEY — None."""
+        query = " ".join(query.lower().split())[:100]
+        if not self.pexels_api_key or not query:
+            return None
+        cached = self._queries.get(query)
+        if cached is not None:
+            return cached or None
+        return await self._flight.do(("pexels", query), lambda: self._search(query))
+
+    async def _search(self, query: str) -> str | None:
+        shared_key = f"media:pexels:{hashlib.sha256(query.encode('utf-8')).hexdigest()}"
+        shared = await self._shared_get(shared_key)
+        if shared is not None:
+            self._queries.set(query, shared)
+            return shared or None
+        self.stats["pexels_requests"] += 1
+        photo_url = await search_photo_by_query_async(query, self.pexels_api_key)
+        self._queries.set(query, photo_url or NO_IMAGE)
+        await self._shared_set(shared_key, photo_url or NO_IMAGE, self.cache_ttl)
+        return photo_url
+
+    async def _file_id(self, image_url: str) -> str | None:
+        key = url_hash(image_url)
+        cached = self._file_ids.get(key)
+        if cached is not None:
+            return cached
+        shared = await self._shared_get(f"media:file:{key}")
+        if shared:
+            self._file_ids.set(key, shared)
+            return shared
+        try:
+            stored = await get_file_id(key)
+        except Exception as e:
+            logger.debug("MediaPipeline: БД недоступна при чтении: %s", e)
+            return None
+        if stored:
+            self.stats["file_id_db_hits"] += 1
+            self._file_ids.set(key, stored)
+        return stored
+
+    async def _remember(self, image_url: str, file_id: str) -> None:
+        key = url_hash(image_url)
+        self._file_ids.set(key, file_id)
+        await self._shared_set(f"media:file:{key}", file_id, FILE_ID_SHARED_TTL)
+        try:
+            await save_file_id(key, image_url, file_id)
+        except Exception as e:
+            logger.debug("MediaPipeline: не удалось сохранить file_id: %s", e)
+
+    async def _forget(self, image_url: str) -> None:
+        key = url_hash(image_url)
+        self._file_ids.set(key, None)
+        try:
+            if state_backend.shared:
+                await state_backend.forget(f"media:file:{key}")
+            await delete_file_id(key)
+        except Exception as e:
+            logger.debug("MediaPipeline: не удалось забыть file_id: %s", e)
+
+    async def send(self, bot: Bot, chat_id: Any, text: str, image_url: str | None, priority: int) -> Message:
+        """
+        Отправляет HTML-сообщение через очередь отправки: с картинкой — фото с подписью, если текст
+        в неё помещается, иначе фото и следом текст; без картинки — текст без превью.
+        Если Telegram не принял фото, сообщение уходит текстом без него; картинку помечаем негодной,
+        только если ошибка про неё саму (ошибка чата или разметки повторится и для текста).
+        """
+        send_queue = get_send_queue()
+        if image_url and self._broken.get(url_hash(image_url)):
+            image_url = None
+        if image_url:
+            fits = caption_length(text) <= CAPTION_LIMIT
+            try:
+                photo = await self._send_photo(bot, chat_id, text if fits else None, image_url, priority)
+            except BadRequest as e:
+                self.stats["photo_failed"] += 1
+                if _is_image_error(e):
+                    self._broken.set(url_hash(image_url), True)
+                logger.info("Не удалось отправить картинку %s в %s, отправляем текстом: %s", image_url, chat_id, e)
+            else:
+                if fits:
+                    return photo
+                self.stats["photo_then_text"] += 1
+        return await send_queue.send(
+            chat_id,
+            lambda: bot.send_message(chat_id=chat_id, text=text, parse_mode="HTML", disable_web_page_preview=True),
+            priority=priority,
+        )
+
+    async def _send_photo(self, bot: Bot, chat_id: Any, caption: str | None, image_url: str, priority: int) -> Message:
+        send_queue = get_send_queue()
+
+        def send(photo: str | bytes) -> Awaitable[Message]:
+            return send_queue.send(
+                chat_id,
+                lambda: bot.send_photo(
+                    chat_id=chat_id, photo=photo, caption=caption, parse_mode="HTML" if caption else None
+                ),
+                priority=priority,
+            )
+
+        file_id = await self._file_id(image_url)
+        if file_id:
+            try:
+                message = await send(file_id)
+            except BadRequest as e:
+                if not _is_image_error(e):
+                    raise  # ошибка чата или подписи — file_id тут ни при чём
+                # file_id больше не принимается (например, сменился токен бота) — загружаем картинку заново
+                self.stats["file_id_invalid"] += 1
+                logger.info("file_id картинки %s не принят: %s", image_url, e)
+                await self._forget(image_url)
+            else:
+                self.stats["file_id_sent"] += 1
+                return message
+        key = url_hash(image_url)
+        if not self._uploads.in_flight(key):
+            return await self._uploads.do(key, lambda: self._upload(send, image_url))
+        # Картинку в это время отправляет другая отправка — ждём её и отправляем тот же file_id
+        self.stats["upload_coalesced"] += 1
+        try:
+            file_id = _largest_file_id(await self._uploads.do(key, lambda: self._upload(send, image_url)))
+        except BadRequest as e:
+            if _is_image_error(e):
+                raise  # Telegram не принял саму картинку
+            file_id = None  # та отправка не удалась из-за своего чата или подписи — отправляем сами
+        except Exception:
+            file_id = None  # та отправка не удалась из-за сети — отправляем сами
+        if not file_id:
+            return await self._upload(send, image_url)
+        message = await send(file_id)
+        self.stats["file_id_sent"] += 1
+        return message
+
+    async def _upload(self, send: Callable[[str | bytes], Awaitable[Message]], image_url: str) -> Message:
+        """Первая отправка картинки: по ссылке, а если Telegram не смог её скачать — файлом."""
+        try:
+            message = await send(image_url)
+            self.stats["sent_by_url"] += 1
+        except BadRequest as e:
+            if not _is_image_error(e):
+                raise  # чат или подпись: загрузка файлом не поможет
+            # Защита от хотлинков, неподдерживаемый ответ сервера, больше 5 МБ для загрузки по ссылке
+            logger.debug("Telegram не скачал картинку %s: %s", image_url, e)
+            message = await send(await self._download(image_url))
+            self.stats["uploaded"] += 1
+        file_id = _largest_file_id(message)
+        if file_id:
+            await self._remember(image_url, file_id)
+        return message
+
+    async def _download(self, image_url: str) -> bytes:
+        """Скачивает картинку (не больше MEDIA_MAX_BYTES); ошибка — BadRequest, как у Telegram."""
+        try:
+            async with http_client.get_session().get(image_url) as resp:
+                resp.raise_for_status()
+                if (resp.content_length or 0) > self.max_bytes:
+                    raise ValueError(f"картинка больше {self.max_bytes} байт")
+                chunks = []
+                size = 0
+                async for chunk in resp.content.iter_chunked(64 * 1024):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ValueError(f"картинка больше {self.max_bytes} байт")
+                    chunks.append(chunk)
+        except Exception as e:
+            raise BadRequest(f"Не удалось скачать картинку: {e}") from e
+        return b"".join(chunks)
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {
+            **self.stats,
+            "image_hits": self._images.hits,
+            "image_misses": self._images.misses,
+            "pexels_hits": self._queries.hits,
+            "file_id_hits": self._file_ids.hits,
+            "coalesced": self._flight.coalesced,
+        }
+
+
+media_pipeline = MediaPipeline(
+    enabled=MEDIA_ENABLED,
+    pexels_api_key=PEXELS_API_KEY,
+    cache_ttl=MEDIA_CACHE_TTL,
+    max_bytes=MEDIA_MAX_BYTES,
+)
+registry.collect("media", media_pipeline.snapshot_stats)
@@ -0,0 +1,113 @@
+"""
+Подготовка новости к публикации: полный текст статьи → обобщение через Gemini → HTML-сообщение.
+Общая часть для кнопки в боте и автопостинга в каналы.
+"""
+import asyncio
+import html
+import logging
+from urllib.parse import urlsplit
+
+from config import GEMINI_API_KEY
+from parser.article import get_article_cached
+from parser.base import NewsItem
+from utils.summary_cache import summary_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+MAX_BODY_CHARS = 3800
+
+# Подпись ссылки для известных источников
+SOURCE_NAMES = {
+    "sports.ru": "Sports.ru",
+    "championat.com": "Championat.com",
+    "sportbox.ru": "Sportbox.ru",
+}
+
+
+def escape_html(text: str) -> str:
+    """Экранирует HTML для parse_mode='HTML' в Telegram."""
+    return html.escape(text or "", quote=False)
+
+
+def _source_name(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return SOURCE_NAMES.get(host, host or "сайте")
+
+
+async def get_full_text(item: NewsItem) -> str:
+    """Полный текст новости: со страницы статьи или из RSS."""
+    full_text_from_page, _ = await get_article_cached(item.url)
+    full_text = full_text_from_page.strip() if full_text_from_page else (item.summary or "").strip()
+    if not full_text:
+        full_text = item.title
+    return full_text
+
+
+def _cut(text: str) -> str:
+    return text[:MAX_BODY_CHARS] + "…" if len(text) > MAX_BODY_CHARS else text
+
+
+async def get_body_text(item: NewsItem) -> str:
+    """Текст для сообщения: обобщение через Gemini (из кэша, если уже было), при ошибке — обрезка."""
+    try:
+        full_text = await get_full_text(item)
+    except Exception:
+        logger.exception("Ошибка при загрузке текста статьи")
+        full_text = item.summary or item.title
+
+    # Обобщение через Gemini, чтобы влезло в одно сообщение
+    if not GEMINI_API_KEY:
+        return _cut(full_text)
+    try:
+        return await summary_cache.summarize(item.url, full_text, GEMINI_API_KEY)
+    except Exception:
+        logger.warning("Gemini недоступен, обрезаем текст")
+        return _cut(full_text)
+
+
+def build_message(item: NewsItem, body_text: str) -> str:
+    """Одно сообщение: заголовок + текст + ссылка (влезает в лимит)."""
+    title_safe = escape_html(item.title)
+    text_safe = escape_html(body_text)
+    link_part = f'🔗 <a href="{item.url}">Читать на {_source_name(item.url)}</a>'
+    message_text = f"<b>{title_safe}</b>\n\n{text_safe}\n\n{link_part}"
+    if len(message_text) > MAX_MESSAGE_LENGTH:
+        message_text = message_text[: MAX_MESSAGE_LENGTH - 3] + "…"
+    return message_text
+
+
+async def render_news(item: NewsItem) -> str:
+    """Готовое HTML-сообщение для новости."""
+    return build_message(item, await get_body_text(item))
+
+
+async def render_many(items: list[NewsItem], concurrency: int) -> list[str]:
+    """
+    Сообщения для пачки новостей в том же порядке: статьи загружаются параллельно
+    (не больше concurrency одновременно), затем все обобщаются одним вызовом пула обобщений.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def full_text(item: NewsItem) -> str:
+        async with semaphore:
+            try:
+                return await get_full_text(item)
+            except Exception:
+                logger.exception("Ошибка при загрузке текста статьи %s", item.url)
+                return item.summary or item.title
+
+    texts = await asyncio.gather(*(full_text(item) for item in items))
+    if not GEMINI_API_KEY:
+        bodies = [_cut(text) for text in texts]
+    else:
+        try:
+            bodies = await summary_cache.summarize_many(
+                [(item.url, text) for item, text in zip(items, texts)], GEMINI_API_KEY
+            )
+        except Exception:
+            logger.warning("Gemini недоступен, обрезаем текст")
+            bodies = [_cut(text) for text in texts]
+    return [build_message(item, body) for item, body in zip(items, bodies)]
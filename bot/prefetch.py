@@ -0,0 +1,204 @@
+"""
+Предзагрузка следующей новости по кнопке.
+Пока пользователь читает новость, для него заранее готовится следующая непросмотренная
+(лента → статья → обобщение → HTML, картинка новости), и по нажатию остаётся только отправить готовое сообщение.
+Активные пользователи — нажимавшие кнопку не раньше PREFETCH_ACTIVE_SECONDS назад; раз в
+PREFETCH_INTERVAL секунд для них проверяется, не сдвинулась ли лента (тогда сообщение готовится заново).
+Бюджет: не больше PREFETCH_PER_MINUTE подготовок в минуту на процесс, MAX_PREPARES_PER_PRESS
+на одно нажатие и PREFETCH_MAX_READY готовых сообщений — ушедшие пользователи квоту Gemini не тратят.
+Если пользователь нажал раньше, чем подготовка закончилась, загрузка статьи и запрос к Gemini
+объединяются с уже идущими (SingleFlight в кэшах статей и обобщений).
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from bot.media import media_pipeline
+from bot.pipeline import render_news
+from bot.sent_news import sent_news
+from config import (
+    PREFETCH_ACTIVE_SECONDS,
+    PREFETCH_CONCURRENCY,
+    PREFETCH_INTERVAL,
+    PREFETCH_MAX_READY,
+    PREFETCH_PER_MINUTE,
+)
+from parser.base import NewsItem
+from parser.executor import background_parsing
+from parser.sports_ru import get_football_news_fresh_async
+from utils.metrics import registry
+from utils.ratelimit import TokenBucket
+from utils.urls import url_hash
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз готовить сообщение заново (лента сдвинулась) на одно нажатие пользователя
+MAX_PREPARES_PER_PRESS = 2
+# Корзина бюджета вмещает подготовки за столько секунд (допустимый всплеск)
+BUDGET_BURST_SECONDS = 10
+
+
+@dataclass
+class _Ready:
+    """Готовое сообщение и хэш URL новости, для которой оно подготовлено."""
+    url_hash: int
+    message: str
+
+
+class NewsPrefetcher:
+    """Готовит следующую новость активным пользователям: touch() — нажатие, take() — готовое сообщение."""
+
+    def __init__(self, active_seconds: float, max_ready: int, concurrency: int, per_minute: float, interval: float):
+        self.active_seconds = active_seconds
+        self.max_ready = max_ready
+        self.concurrency = concurrency
+        self.interval = interval
+        self.enabled = per_minute > 0 and max_ready > 0
+        self._budget = TokenBucket(per_minute / 60, max(1.0, per_minute / 60 * BUDGET_BURST_SECONDS))
+        # Пользователь → время последнего нажатия (от давних к недавним)
+        self._active: OrderedDict[int, float] = OrderedDict()
+        self._prepares: dict[int, int] = {}
+        self._ready: OrderedDict[int, _Ready] = OrderedDict()
+        self._tasks: dict[int, asyncio.Task] = {}
+        # Нажали, пока подготовка шла: после неё готовим ещё раз
+        self._again: set[int] = set()
+        self._refresher: asyncio.Task | None = None
+        # Семафор привязан к циклу событий: пересоздаём, если цикл сменился
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "prepared": 0,
+            "unchanged": 0,
+            "budget_skipped": 0,
+            "press_limited": 0,
+            "errors": 0,
+        }
+
+    def _slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def _forget(self, user_id: int) -> None:
+        self._ready.pop(user_id, None)
+        self._prepares.pop(user_id, None)
+
+    def touch(self, user_id: int) -> None:
+        """Пользователь нажал кнопку: он активен, бюджет подготовок на нажатие обновляется."""
+        if not self.enabled:
+            return
+        self._active[user_id] = time.monotonic()
+        self._active.move_to_end(user_id)
+        self._prepares[user_id] = 0
+        while len(self._active) > self.max_ready:
+            old_user, _ = self._active.popitem(last=False)
+            self._forget(old_user)
+
+    def take(self, user_id: int, item: NewsItem) -> str | None:
+        """Готовое сообщение для новости item, если оно подготовлено этому пользователю."""
+        if not self.enabled:
+            return None
+        ready = self._ready.pop(user_id, None)
+        if ready is not None and ready.url_hash == url_hash(item.url):
+            self.stats["hits"] += 1
+            return ready.message
+        self.stats["misses"] += 1
+        return None
+
+    def schedule(self, user_id: int) -> None:
+        """Готовит следующую новость пользователя в фоне (не ждёт подготовки)."""
+        if not self.enabled or user_id not in self._active:
+            return
+        if user_id in self._tasks:
+            self._again.add(user_id)
+            return
+        task = asyncio.create_task(self._prefetch(user_id))
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda t: self._on_done(user_id, t))
+
+    def _on_done(self, user_id: int, task: asyncio.Task) -> None:
+        self._tasks.pop(user_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+            logger.debug("Предзагрузка для %s не удалась: %s", user_id, task.exception())
+        if user_id in self._again:
+            self._again.discard(user_id)
+            self.schedule(user_id)
+
+    async def _prefetch(self, user_id: int) -> None:
+        with background_parsing():
+            news = await get_football_news_fresh_async()
+            item = await sent_news.peek_unseen(user_id, news)
+            if item is None:
+                return
+            h = url_hash(item.url)
+            ready = self._ready.get(user_id)
+            if ready is not None and ready.url_hash == h:
+                self.stats["unchanged"] += 1
+                return
+            if self._prepares.get(user_id, 0) >= MAX_PREPARES_PER_PRESS:
+                self.stats["press_limited"] += 1
+                return
+            if not self._budget.consume():
+                self.stats["budget_skipped"] += 1
+                return
+            self._prepares[user_id] = self._prepares.get(user_id, 0) + 1
+            async with self._slots():
+                # Картинка запоминается в bot/media.py — по нажатию она берётся из кэша
+                message, _ = await asyncio.gather(render_news(item), media_pipeline.resolve(item))
+        if user_id not in self._active:
+            return  # пользователь ушёл, пока готовили
+        self._ready[user_id] = _Ready(h, message)
+        self._ready.move_to_end(user_id)
+        while len(self._ready) > self.max_ready:
+            self._ready.popitem(last=False)
+        self.stats["prepared"] += 1
+
+    def refresh(self) -> None:
+        """Забывает ушедших пользователей и перепроверяет следующую новость для активных."""
+        deadline = time.monotonic() - self.active_seconds
+        while self._active:
+            user_id, pressed_at = next(iter(self._active.items()))
+            if pressed_at >= deadline:
+                break
+            self._active.popitem(last=False)
+            self._forget(user_id)
+        for user_id in list(self._active):
+            self.schedule(user_id)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.refresh()
+
+    def start(self) -> None:
+        """Запускает периодическую перепроверку в текущем цикле событий."""
+        if self.enabled and self._refresher is None and self.interval > 0:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        """Останавливает перепроверку и идущие подготовки."""
+        tasks = [task for task in (self._refresher, *self._tasks.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refresher = None
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {**self.stats, "active": len(self._active), "ready": len(self._ready), "in_flight": len(self._tasks)}
+
+
+news_prefetcher = NewsPrefetcher(
+    active_seconds=PREFETCH_ACTIVE_SECONDS,
+    max_ready=PREFETCH_MAX_READY,
+    concurrency=PREFETCH_CONCURRENCY,
+    per_minute=PREFETCH_PER_MINUTE,
+    interval=PREFETCH_INTERVAL,
+)
+registry.collect("prefetch", news_prefetcher.snapshot_stats)
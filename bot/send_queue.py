@@ -0,0 +1,256 @@
+"""
+Очередь исходящих сообщений в Telegram.
+Все отправки (ответы по кнопке и публикации в каналы) идут через неё:
+общая корзина токенов на бота (~30 сообщений/с) и корзина на каждый чат,
+при 429 — пауза чата на Retry-After и повтор, ответы пользователям — раньше постов в каналы.
+Число ожидающих отправок ограничено: при переполнении send() ждёт свободного места.
+Если общая корзина (Redis) недоступна, лимит бота соблюдается корзиной процесса.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from config import SEND_QUEUE_MAX_PENDING, TELEGRAM_GLOBAL_RATE
+from utils.metrics import registry, span
+from utils.ratelimit import TokenBucket
+from utils.state import state_backend
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше — раньше
+INTERACTIVE = 0
+CHANNEL = 1
+
+# Лимиты Telegram на чат: личные чаты — около 1 сообщения в секунду,
+# группы и каналы — около 20 сообщений в минуту
+PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST = 1.0, 1
+GROUP_CHAT_RATE, GROUP_CHAT_BURST = 20 / 60, 3
+# Повторы при сетевых ошибках и 429
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 1.0
+# Одновременно выполняемых HTTP-запросов отправки
+MAX_IN_FLIGHT = 32
+# При скольких корзинах чатов чистить неактивные
+CHAT_BUCKETS_PRUNE_AT = 10000
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    ready_at: float
+    seq: int
+    chat_id: Any = field(compare=False)
+    send: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempt: int = field(default=0, compare=False)
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    value = error.retry_after
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+
+def _is_private(chat_id: Any) -> bool:
+    """Личный чат: положительный числовой id (у групп и каналов id отрицательный или @username)."""
+    try:
+        return int(chat_id) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+class SendQueue:
+    """Очередь отправки с приоритетами, корзинами токенов и учётом Retry-After."""
+
+    def __init__(self, global_rate: float, max_pending: int):
+        # Общий лимит бота делится между всеми его процессами (при STATE_BACKEND=redis)
+        self._global = state_backend.bucket("telegram_global", global_rate, global_rate)
+        # Запасная корзина процесса — пока общая недоступна
+        self._local = TokenBucket(global_rate, global_rate)
+        self._global_down = False
+        self._chats: dict[Any, TokenBucket] = {}
+        self._heap: list[_Job] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        # Места в очереди: часть зарезервирована за ответами пользователям
+        reserved = max(1, max_pending // 5)
+        self._slots = {
+            INTERACTIVE: asyncio.Semaphore(reserved),
+            CHANNEL: asyncio.Semaphore(max(1, max_pending - reserved)),
+        }
+        self._in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._dispatcher: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"sent": 0, "retried": 0, "rate_limited": 0, "failed": 0, "local_tokens": 0}
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= CHAT_BUCKETS_PRUNE_AT:
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle()}
+            if _is_private(chat_id):
+                bucket = TokenBucket(PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST)
+            else:
+                bucket = TokenBucket(GROUP_CHAT_RATE, GROUP_CHAT_BURST)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _push(self, job: _Job) -> None:
+        heapq.heappush(self._heap, job)
+        self._wakeup.set()
+
+    async def send(self, chat_id: Any, send: Callable[[], Awaitable[Any]], priority: int = CHANNEL) -> Any:
+        """
+        Ставит отправку в очередь и ждёт результата.
+        send — функция без аргументов, возвращающая корутину запроса к Bot API
+        (например, lambda: bot.send_message(chat_id, text)).
+        """
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        slots = self._slots[INTERACTIVE if priority == INTERACTIVE else CHANNEL]
+        async with slots:
+            future = asyncio.get_running_loop().create_future()
+            self._push(_Job(priority, time.monotonic(), next(self._seq), chat_id, send, future))
+            return await future
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    async def _acquire_global(self) -> None:
+        """Токен общей корзины бота; при ошибке общего состояния — токен корзины процесса."""
+        try:
+            await self._global.acquire()
+        except Exception as e:
+            if not self._global_down:
+                logger.warning("Общая корзина отправки недоступна, лимит — по корзине процесса: %s", e)
+                self._global_down = True
+            self.stats["local_tokens"] += 1
+            await self._local.acquire()
+            return
+        if self._global_down:
+            logger.info("Общая корзина отправки снова доступна")
+            self._global_down = False
+
+    async def _dispatch(self) -> None:
+        """Выбирает готовое к отправке задание с наивысшим приоритетом и запускает его."""
+        # Токен общего лимита и место для запроса берутся до того, как задание снято с кучи:
+        # ожидание или ошибка здесь не оставляет снятое задание без результата
+        ready = False
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if not ready:
+                await self._acquire_global()
+                await self._in_flight.acquire()
+                ready = True
+            now = time.monotonic()
+            job = self._pick(now)
+            if job is None:
+                # Все задания ждут своих чатов: спим до ближайшего готового или новой отправки
+                wait = min(max(j.ready_at, now + self._chat_bucket(j.chat_id).delay()) for j in self._heap) - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0.01))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            ready = False
+            self._chat_bucket(job.chat_id).consume()
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _pick(self, now: float) -> _Job | None:
+        """Первое по приоритету задание, чей чат может принять сообщение сейчас."""
+        postponed = []
+        picked = None
+        while self._heap:
+            job = heapq.heappop(self._heap)
+            if job.ready_at <= now and self._chat_bucket(job.chat_id).delay() == 0:
+                picked = job
+                break
+            postponed.append(job)
+        for job in postponed:
+            heapq.heappush(self._heap, job)
+        return picked
+
+    async def _run(self, job: _Job) -> None:
+        try:
+            with span("telegram_send"):
+                result = await job.send()
+        except RetryAfter as e:
+            seconds = _retry_after_seconds(e)
+            self.stats["rate_limited"] += 1
+            self._chat_bucket(job.chat_id).block(seconds)
+            self._retry(job, seconds, e)
+        except (BadRequest, Forbidden, TimedOut) as e:
+            # TimedOut не повторяем: сообщение могло дойти, повтор дал бы дубль
+            self._fail(job, e)
+        except NetworkError as e:
+            self._retry(job, BACKOFF_BASE * 2 ** job.attempt, e)
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            self.stats["sent"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight.release()
+
+    def _retry(self, job: _Job, delay: float, error: Exception) -> None:
+        job.attempt += 1
+        if job.attempt >= MAX_ATTEMPTS or job.future.done():
+            self._fail(job, error)
+            return
+        self.stats["retried"] += 1
+        logger.info("Повтор отправки в %s через %.1f с: %s", job.chat_id, delay, error)
+        job.ready_at = time.monotonic() + delay
+        job.seq = next(self._seq)
+        self._push(job)
+
+    def _fail(self, job: _Job, error: Exception) -> None:
+        self.stats["failed"] += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    async def close(self) -> None:
+        """Останавливает диспетчер (незавершённые отправки отменяются)."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+        for job in self._heap:
+            if not job.future.done():
+                job.future.cancel()
+        self._heap.clear()
+
+
+_queue: SendQueue | None = None
+_queue_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_send_queue() -> SendQueue:
+    """Очередь отправки процесса, привязанная к текущему циклу событий."""
+    global _queue, _queue_loop
+    loop = asyncio.get_running_loop()
+    if _queue is None or _queue_loop is not loop:
+        _queue = SendQueue(TELEGRAM_GLOBAL_RATE, SEND_QUEUE_MAX_PENDING)
+        _queue_loop = loop
+    return _queue
+
+
+registry.collect("send_queue", lambda: _queue.stats if _queue is not None else {})
+
+
+async def close_send_queue() -> None:
+    global _queue
+    if _queue is not None:
+        await _queue.close()
+    _queue = None
@@ -0,0 +1,179 @@
+"""
+Какие новости пользователь уже получил по кнопке.
+В памяти — ограниченный набор 64-битных хэшей URL на пользователя (LRU по пользователям),
+в Postgres — таблица sent_news, чтобы история переживала перезапуски и была общей для процессов.
+Поиск следующей непросмотренной новости идёт от курсора, а не с начала ленты.
+Если экземпляров бота несколько (STATE_BACKEND=redis), выдача новости ещё и отмечается в общем
+состоянии: один и тот же пользователь не получит новость дважды, на каком бы экземпляре ни нажал.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from config import SENT_NEWS_PER_USER, SENT_NEWS_TTL_DAYS
+from database.sent_news import add_sent, load_sent, reset_sent
+from parser.base import NewsItem
+from utils.cache import LRUCache
+from utils.state import state_backend
+from utils.urls import url_hash
+
+logger = logging.getLogger(__name__)
+
+# Сколько пользователей держать в памяти (остальные подгружаются из БД при обращении)
+USERS_IN_MEMORY = 10000
+
+
+@dataclass
+class _UserState:
+    """Хэши отправленных новостей (от старых к новым, с временем отправки) и курсор по ленте."""
+    seen: OrderedDict[int, float] = field(default_factory=OrderedDict)
+    # Курсор: хэш первой новости ленты при прошлом ответе и позиция выданной новости
+    head: int | None = None
+    pos: int = -1
+
+
+class SentNewsStore:
+    """Ограниченное по размеру хранилище отправленных новостей с курсором «следующая непросмотренная»."""
+
+    def __init__(self, per_user: int, ttl_days: int):
+        self.per_user = per_user
+        self.ttl_days = ttl_days
+        self.ttl = ttl_days * 24 * 3600
+        self._users = LRUCache(USERS_IN_MEMORY)
+        self._locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+        self._background: set[asyncio.Task] = set()
+        # Последняя запись в БД по пользователю: следующая ждёт её, чтобы записи шли по порядку
+        self._writes: dict[int, asyncio.Task] = {}
+
+    async def _state(self, user_id: int) -> _UserState:
+        state = self._users.get(user_id)
+        if state is not None:
+            return state
+        state = _UserState()
+        try:
+            hashes = await load_sent(user_id, self.per_user, self.ttl_days)
+        except Exception as e:
+            logger.debug("SentNewsStore: не удалось загрузить историю %s: %s", user_id, e)
+            hashes = []
+        now = time.time()
+        for h in reversed(hashes):
+            state.seen[h] = now
+        self._users.set(user_id, state)
+        return state
+
+    def _is_seen(self, state: _UserState, h: int, now: float) -> bool:
+        sent_at = state.seen.get(h)
+        return sent_at is not None and now - sent_at < self.ttl
+
+    def _mark(self, state: _UserState, h: int, now: float) -> None:
+        state.seen[h] = now
+        state.seen.move_to_end(h)
+        while len(state.seen) > self.per_user:
+            state.seen.popitem(last=False)
+
+    def _persist(self, user_id: int, fn, *args) -> None:
+        """
+        Запись в БД в фоне: ответ пользователю её не ждёт. Записи одного пользователя выполняются
+        в порядке вызовов (сброс истории не обгонит отметку, сделанную до него, и наоборот).
+        """
+        task = asyncio.create_task(self._write_after(self._writes.get(user_id), fn, *args))
+        self._writes[user_id] = task
+        self._background.add(task)
+        task.add_done_callback(lambda t: self._on_persisted(user_id, t))
+
+    @staticmethod
+    async def _write_after(previous: asyncio.Task | None, fn, *args) -> None:
+        if previous is not None:
+            # Ошибка предыдущей записи не отменяет следующую
+            await asyncio.wait([previous])
+        await fn(*args)
+
+    def _on_persisted(self, user_id: int, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if self._writes.get(user_id) is task:
+            del self._writes[user_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("SentNewsStore: не удалось сохранить историю: %s", task.exception())
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    def _find_next(self, state: _UserState, items: list[NewsItem], head: int, now: float) -> int | None:
+        """Позиция следующей непросмотренной новости (None — просмотрено всё)."""
+        start = state.pos + 1 if state.head == head else 0
+        for pos in range(start, len(items)):
+            h = head if pos == 0 else url_hash(items[pos].url)
+            if not self._is_seen(state, h, now):
+                return pos
+        return None
+
+    def _claim_key(self, user_id: int, h: int) -> str:
+        return f"sent:{user_id}:{h}"
+
+    async def _claim(self, user_id: int, h: int) -> bool:
+        """Отметка выдачи в общем состоянии; False — новость уже выдал другой экземпляр бота."""
+        if not state_backend.shared:
+            return True
+        try:
+            return await state_backend.claim(self._claim_key(user_id, h), self.ttl)
+        except Exception as e:
+            logger.debug("SentNewsStore: общее состояние недоступно: %s", e)
+            return True
+
+    async def _forget_claims(self, user_id: int, items: list[NewsItem]) -> None:
+        if not state_backend.shared:
+            return
+        try:
+            await state_backend.forget(*(self._claim_key(user_id, url_hash(item.url)) for item in items))
+        except Exception as e:
+            logger.debug("SentNewsStore: общее состояние недоступно: %s", e)
+
+    async def peek_unseen(self, user_id: int, items: list[NewsItem]) -> NewsItem | None:
+        """Какую новость выдаст next_unseen на ленте items — без отметки (для предзагрузки)."""
+        if not items:
+            return None
+        async with self._lock(user_id):
+            state = await self._state(user_id)
+            pos = self._find_next(state, items, url_hash(items[0].url), time.time())
+            return items[0] if pos is None else items[pos]
+
+    async def next_unseen(self, user_id: int, items: list[NewsItem]) -> NewsItem | None:
+        """
+        Следующая непросмотренная новость из ленты items (от свежих к старым) и отметка её отправленной.
+        Если лента не сдвинулась, поиск продолжается с позиции прошлой выдачи; если сверху появились
+        новые новости — просматриваются только они, дальше курсор. Когда всё просмотрено — история
+        сбрасывается и выдаётся самая свежая новость.
+        """
+        if not items:
+            return None
+        async with self._lock(user_id):
+            state = await self._state(user_id)
+            now = time.time()
+            head = url_hash(items[0].url)
+            pos = self._find_next(state, items, head, now)
+            while pos is not None:
+                h = head if pos == 0 else url_hash(items[pos].url)
+                claimed = await self._claim(user_id, h)
+                self._mark(state, h, now)
+                state.head, state.pos = head, pos
+                if claimed:
+                    self._persist(user_id, add_sent, user_id, h, self.per_user, self.ttl_days)
+                    return items[pos]
+                # Эту новость пользователь получил через другой экземпляр бота — ищем дальше
+                pos = self._find_next(state, items, head, now)
+            state.seen.clear()
+            await self._forget_claims(user_id, items)
+            await self._claim(user_id, head)
+            self._mark(state, head, now)
+            state.head, state.pos = head, 0
+            self._persist(user_id, reset_sent, user_id, head)
+            return items[0]
+
+
+sent_news = SentNewsStore(per_user=SENT_NEWS_PER_USER, ttl_days=SENT_NEWS_TTL_DAYS)
@@ -0,0 +1,84 @@
+"""
+Обработка подписок: ежедневное снятие истёкших и уведомления пользователям.
+Сама обработка — массовые запросы в database/subscriptions.py, здесь — уведомления.
+Уведомления отправляются пачками и не больше SUBSCRIPTION_NOTIFY_LIMIT за запуск, чтобы задача
+не занимала планировщик (и автопостинг) часами: остальные ждут следующего запуска send_notifications.
+Напоминание отмечается в БД только после отправки — неотправленные повторяются в следующий запуск;
+уведомления об окончании ждут отправки в памяти процесса планировщика.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import timedelta
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden
+
+from bot.send_queue import CHANNEL, get_send_queue
+from config import SUBSCRIPTION_NOTIFY_BATCH, SUBSCRIPTION_NOTIFY_LIMIT, SUBSCRIPTION_REMIND_DAYS
+from database.subscriptions import expire_subscriptions, mark_reminded, pending_reminders
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_TEXT = "Ваша подписка закончилась. Автопостинг в каналы приостановлен."
+REMINDER_TEXT = "Подписка закончится {:%d.%m.%Y}. Продлите её, чтобы автопостинг не остановился."
+
+# Пользователи, чья подписка закончилась, а уведомление ещё не отправлено
+_expired: deque[int] = deque()
+
+
+async def _notify(bot: Bot, user_id: int, text: str) -> bool:
+    """True — уведомление отправлено или доставить его нельзя (бот заблокирован, чата нет): повтор не нужен."""
+    try:
+        await get_send_queue().send(user_id, lambda: bot.send_message(chat_id=user_id, text=text), priority=CHANNEL)
+        return True
+    except (BadRequest, Forbidden) as e:
+        logger.debug("Пользователю %s не доставить уведомление: %s", user_id, e)
+        return True
+    except Exception:
+        logger.debug("Не удалось уведомить пользователя %s", user_id)
+        return False
+
+
+async def _send_batch(bot: Bot, notices: list[tuple[int, str]]) -> list[int]:
+    """Отправляет пачку уведомлений одновременно; возвращает id тех, кому повтор не нужен."""
+    results = await asyncio.gather(*(_notify(bot, user_id, text) for user_id, text in notices))
+    return [user_id for (user_id, _), done in zip(notices, results) if done]
+
+
+async def send_notifications(bot: Bot) -> dict[str, int]:
+    """
+    Отправляет до SUBSCRIPTION_NOTIFY_LIMIT уведомлений пачками по SUBSCRIPTION_NOTIFY_BATCH:
+    сначала об окончании подписки, затем напоминания; возвращает счётчики.
+    """
+    stats = {"notified": 0, "reminded": 0, "failed": 0}
+    budget = SUBSCRIPTION_NOTIFY_LIMIT
+    while _expired and budget > 0:
+        batch = [_expired.popleft() for _ in range(min(SUBSCRIPTION_NOTIFY_BATCH, budget, len(_expired)))]
+        done = await _send_batch(bot, [(user_id, EXPIRED_TEXT) for user_id in batch])
+        budget -= len(batch)
+        stats["notified"] += len(done)
+        stats["failed"] += len(batch) - len(done)
+
+    remind_before = timedelta(days=SUBSCRIPTION_REMIND_DAYS)
+    after = None
+    while budget > 0:
+        page = await pending_reminders(remind_before, min(SUBSCRIPTION_NOTIFY_BATCH, budget), after)
+        if not page:
+            break
+        done = await _send_batch(bot, [(user_id, REMINDER_TEXT.format(expires_at)) for user_id, expires_at in page])
+        await mark_reminded(done)
+        budget -= len(page)
+        # Неотправленные в этот запуск больше не выбираются: следующая страница — после последней
+        after = page[-1][1], page[-1][0]
+        stats["reminded"] += len(done)
+        stats["failed"] += len(page) - len(done)
+    stats["pending_expired"] = len(_expired)
+    return stats
+
+
+async def run_subscription_cycle(bot: Bot) -> dict[str, int]:
+    """Снимает истёкшие подписки и отправляет первую порцию уведомлений; возвращает счётчики."""
+    expired = await expire_subscriptions()
+    _expired.extend(expired)
+    return {"expired": len(expired), **await send_notifications(bot)}
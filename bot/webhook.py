@@ -0,0 +1,106 @@
+"""
+Режим webhook: Telegram присылает обновления POST-запросами на встроенный HTTP-сервер (aiohttp),
+обновление сразу ставится в очередь приложения, ответ Telegram — 200 без ожидания обработчика.
+В отличие от long polling, нет цикла getUpdates: обновление приходит одним запросом, а несколько
+экземпляров бота можно поставить за балансировщиком (общее состояние — utils/state.py).
+Запросы без верного X-Telegram-Bot-Api-Secret-Token (WEBHOOK_SECRET) отклоняются.
+"""
+import asyncio
+import hmac
+import logging
+import signal
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from config import (
+    WEBHOOK_LISTEN,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def make_webhook_app(application: Application, path: str, secret: str) -> web.Application:
+    """HTTP-приложение: POST path — обновления от Telegram, GET /healthz — проверка для балансировщика."""
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            # Корректный JSON, но не объект обновления: 400, а не 500 — иначе Telegram повторяет его снова
+            return web.Response(status=400)
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        return web.Response()
+
+    async def handle_health(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    app.router.add_get("/healthz", handle_health)
+    return app
+
+
+async def start_webhook_server(application: Application, listen: str, port: int, path: str, secret: str) -> web.AppRunner:
+    """Запускает HTTP-сервер webhook в текущем цикле событий; остановка — runner.cleanup()."""
+    runner = web.AppRunner(make_webhook_app(application, path, secret), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, listen, port).start()
+    return runner
+
+
+def _stop_event() -> asyncio.Event:
+    """Событие остановки по SIGINT/SIGTERM (на Windows — Ctrl+C прерывает asyncio.run)."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    return stop
+
+
+async def run_webhook(application: Application, allowed_updates: list[str]) -> None:
+    """
+    Запускает приложение в режиме webhook: post_init, сервер на WEBHOOK_LISTEN:WEBHOOK_PORT,
+    регистрация WEBHOOK_URL + WEBHOOK_PATH в Telegram; при остановке — post_stop и post_shutdown.
+    Webhook при остановке не снимается: его обслуживают и другие экземпляры бота.
+    """
+    await application.initialize()
+    runner = None
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        runner = await start_webhook_server(application, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET)
+        await application.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=allowed_updates,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        logger.info("Webhook: %s:%d%s", WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH)
+        await _stop_event().wait()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -1,14 +1,31 @@
 """
 Инициализация подключения к БД и сессий.
 """
-from database.engine import engine, get_session, init_db
-from database.models import Base, Channel, User
+from database.engine import (
+    async_engine,
+    async_session,
+    close_async_engine,
+    engine,
+    get_session,
+    init_db,
+    pool_stats,
+)
+from database.models import Base, Channel, FeedMark, MediaFile, PostedNews, SentNews, Summary, User
 
 __all__ = [
     "Base",
     "User",
     "Channel",
+    "Summary",
+    "SentNews",
+    "PostedNews",
+    "FeedMark",
+    "MediaFile",
     "engine",
+    "async_engine",
     "get_session",
+    "async_session",
+    "close_async_engine",
+    "pool_stats",
     "init_db",
 ]
@@ -0,0 +1,185 @@
+"""
+Каналы для автопостинга: снимок активных каналов в памяти процесса с обратным индексом
+«источник → каналы» и учёт уже опубликованных новостей.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import CHANNEL_SNAPSHOT_FULL_REFRESH, CHANNEL_SNAPSHOT_OVERLAP, TEST_MODE
+from database.engine import async_session
+from database.models import Channel, PostedNews, User
+from utils.cache import SingleFlight
+from utils.urls import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ActiveChannel:
+    """Канал, в который нужно публиковать: id в БД, id в Telegram и источники."""
+    id: int
+    telegram_channel_id: int
+    news_source_urls: tuple[str, ...]
+    publication_style: str
+
+
+@dataclass(frozen=True)
+class _SnapshotEntry:
+    channel: ActiveChannel
+    sources: frozenset[str]
+    is_subscribed: bool
+    expires_at: datetime | None
+
+    def active(self, now: datetime) -> bool:
+        if TEST_MODE:
+            return True
+        return self.is_subscribed and self.expires_at is not None and self.expires_at > now
+
+
+class ChannelSnapshot:
+    """
+    Копия каналов в памяти процесса с обратным индексом «источник → каналы».
+    refresh() догружает только каналы, изменённые после прошлого обновления
+    (по updated_at канала и владельца, с запасом overlap на долгие транзакции),
+    удалённые каналы убирает по списку id; раз в full_refresh секунд перечитывает всё.
+    Истечение подписки проверяется при чтении, поэтому снимок не отстаёт от времени.
+    """
+
+    def __init__(self, overlap: float, full_refresh: float):
+        self.overlap = timedelta(seconds=overlap)
+        self.full_refresh = full_refresh
+        self._entries: dict[int, _SnapshotEntry] = {}
+        self._by_source: dict[str, set[int]] = {}
+        self._watermark: datetime | None = None
+        self._loaded_at = 0.0
+        self._flight = SingleFlight()
+        self.stats = {"full": 0, "incremental": 0, "changed": 0, "removed": 0}
+
+    def _remove(self, channel_id: int) -> None:
+        entry = self._entries.pop(channel_id, None)
+        if entry is None:
+            return
+        for source in entry.sources:
+            ids = self._by_source.get(source)
+            if ids is not None:
+                ids.discard(channel_id)
+                if not ids:
+                    del self._by_source[source]
+
+    def _put(self, entry: _SnapshotEntry) -> None:
+        self._remove(entry.channel.id)
+        if not entry.sources:
+            return
+        self._entries[entry.channel.id] = entry
+        for source in entry.sources:
+            self._by_source.setdefault(source, set()).add(entry.channel.id)
+
+    async def refresh(self) -> None:
+        """Обновляет снимок; одновременные вызовы объединяются в один."""
+        await self._flight.do("refresh", self._refresh)
+
+    async def _refresh(self) -> None:
+        full = self._watermark is None or time.monotonic() - self._loaded_at >= self.full_refresh
+        changed_at = func.greatest(Channel.updated_at, User.updated_at).label("changed_at")
+        stmt = select(
+            Channel.id,
+            Channel.telegram_channel_id,
+            Channel.news_source_urls,
+            Channel.publication_style,
+            User.is_subscribed,
+            User.subscription_expires_at,
+            changed_at,
+        ).join(User, Channel.user_id == User.id)
+        if not full:
+            stmt = stmt.where(changed_at >= self._watermark - self.overlap)
+        async with async_session() as session:
+            rows = list(await session.execute(stmt))
+            existing = None if full else set(await session.scalars(select(Channel.id)))
+
+        if full:
+            self._entries.clear()
+            self._by_source.clear()
+            self._loaded_at = time.monotonic()
+            self.stats["full"] += 1
+        else:
+            removed = [channel_id for channel_id in self._entries if channel_id not in existing]
+            for channel_id in removed:
+                self._remove(channel_id)
+            self.stats["incremental"] += 1
+            self.stats["removed"] += len(removed)
+        for row in rows:
+            sources = tuple(row.news_source_urls or ())
+            self._put(_SnapshotEntry(
+                ActiveChannel(row.id, row.telegram_channel_id, sources, row.publication_style or ""),
+                frozenset(normalize_url(url) for url in sources),
+                bool(row.is_subscribed),
+                row.subscription_expires_at,
+            ))
+            if row.changed_at is not None and (self._watermark is None or row.changed_at > self._watermark):
+                self._watermark = row.changed_at
+        self.stats["changed"] += len(rows)
+        logger.debug("Снимок каналов: %d каналов, %d источников", len(self._entries), len(self._by_source))
+
+    def channels(self) -> list[ActiveChannel]:
+        """Активные каналы с хотя бы одним источником."""
+        now = datetime.now(timezone.utc)
+        return [entry.channel for entry in self._entries.values() if entry.active(now)]
+
+    def source_index(self) -> dict[str, set[int]]:
+        """Источник (нормализованный URL) → id активных каналов."""
+        now = datetime.now(timezone.utc)
+        index = {}
+        for source, ids in self._by_source.items():
+            active = {channel_id for channel_id in ids if self._entries[channel_id].active(now)}
+            if active:
+                index[source] = active
+        return index
+
+    def source_urls(self) -> dict[str, str]:
+        """
+        Источник (нормализованный URL) → адрес, как он записан у активного канала: загружать нужно его,
+        нормализованный вид (https, без www и слэша) — только ключ. Из разных написаний берётся первое
+        по алфавиту, чтобы отметка ленты не менялась от цикла к циклу.
+        """
+        now = datetime.now(timezone.utc)
+        urls: dict[str, str] = {}
+        for entry in self._entries.values():
+            if not entry.active(now):
+                continue
+            for url in entry.channel.news_source_urls:
+                key = normalize_url(url)
+                if key not in urls or url < urls[key]:
+                    urls[key] = url
+        return urls
+
+
+channel_snapshot = ChannelSnapshot(CHANNEL_SNAPSHOT_OVERLAP, CHANNEL_SNAPSHOT_FULL_REFRESH)
+
+
+async def load_posted(url_hashes: list[int]) -> set[tuple[int, int]]:
+    """Какие из url_hashes уже опубликованы: множество пар (channel_id, url_hash) — один запрос на все каналы."""
+    if not url_hashes:
+        return set()
+    async with async_session() as session:
+        rows = await session.execute(
+            select(PostedNews.channel_id, PostedNews.url_hash).where(PostedNews.url_hash.in_(url_hashes))
+        )
+        return {(row.channel_id, row.url_hash) for row in rows}
+
+
+async def mark_posted(pairs: list[tuple[int, int]]) -> None:
+    """Отмечает пары (channel_id, url_hash) опубликованными."""
+    if not pairs:
+        return
+    now = datetime.now(timezone.utc)
+    stmt = insert(PostedNews).values(
+        [{"channel_id": channel_id, "url_hash": h, "posted_at": now} for channel_id, h in pairs]
+    ).on_conflict_do_nothing()
+    async with async_session() as session:
+        await session.execute(stmt)
+        await session.commit()
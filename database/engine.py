@@ -1,12 +1,18 @@
 """
 Движок БД, фабрика сессий и создание таблиц.
+Синхронный движок (psycopg2) — для скриптов вроде scripts/init_db.py,
+асинхронный (asyncpg) — для бота и планировщика, чтобы запросы не блокировали цикл событий.
 """
-from sqlalchemy import create_engine
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
-from config import DATABASE_URL
+from config import ASYNC_DATABASE_URL, DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_SIZE, DB_POOL_TIMEOUT
 from database.base import Base
-from database.models import Channel, User  # noqa: F401 — регистрируем модели у Base
+from database.models import Channel, FeedMark, PostedNews, SentNews, Summary, User  # noqa: F401 — регистрируем модели у Base
 
 
 engine = create_engine(
@@ -20,11 +26,74 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def _async_url(url: str) -> str:
+    """postgresql:// или postgresql+psycopg2:// → postgresql+asyncpg://"""
+    scheme, sep, rest = url.partition("://")
+    if scheme.startswith("postgresql") and sep:
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL or _async_url(DATABASE_URL),
+    echo=False,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+# Счётчики асинхронного пула: выдачи соединений и открытия новых
+_pool_counters = {"checkouts": 0, "connects": 0}
+
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    _pool_counters["checkouts"] += 1
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record) -> None:
+    _pool_counters["connects"] += 1
+
+
 def get_session() -> Session:
     """Возвращает новую сессию. После использования нужно вызвать session.close()."""
     return SessionLocal()
 
 
+@asynccontextmanager
+async def async_session() -> AsyncIterator[AsyncSession]:
+    """
+    Асинхронная сессия для использования в боте и планировщике:
+        async with async_session() as session:
+            ...
+            await session.commit()
+    Закрывается автоматически; незакоммиченные изменения откатываются.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def pool_stats() -> dict[str, int]:
+    """Занятость асинхронного пула соединений и счётчики выдач/подключений."""
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **_pool_counters,
+    }
+
+
+async def close_async_engine() -> None:
+    """Закрывает соединения асинхронного пула (они привязаны к циклу событий)."""
+    await async_engine.dispose()
+
+
 def init_db() -> None:
     """Создаёт все таблицы в БД (если их ещё нет)."""
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,36 @@
+"""
+Отметки уровня RSS-лент (таблица feed_marks): загрузка и сохранение.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.engine import async_session
+from database.models import FeedMark
+
+
+async def load_mark(feed_url: str) -> tuple[datetime | None, list[str]] | None:
+    """(время отметки, ссылки на отметке) для ленты или None, если лента ещё не обрабатывалась."""
+    async with async_session() as session:
+        row = (
+            await session.execute(select(FeedMark.published_at, FeedMark.urls).where(FeedMark.feed_url == feed_url))
+        ).first()
+    return (row.published_at, list(row.urls or ())) if row is not None else None
+
+
+async def save_marks(marks: list[tuple[str, datetime | None, list[str]]]) -> None:
+    """Сохраняет отметки (feed_url, время, ссылки) одним запросом."""
+    if not marks:
+        return
+    now = datetime.now(timezone.utc)
+    stmt = insert(FeedMark).values(
+        [{"feed_url": url, "published_at": published_at, "urls": urls, "updated_at": now} for url, published_at, urls in marks]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FeedMark.feed_url],
+        set_={"published_at": stmt.excluded.published_at, "urls": stmt.excluded.urls, "updated_at": now},
+    )
+    async with async_session() as session:
+        await session.execute(stmt)
+        await session.commit()
@@ -0,0 +1,36 @@
+"""
+file_id картинок, уже загруженных в Telegram (таблица media_files).
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.engine import async_session
+from database.models import MediaFile
+
+
+async def get_file_id(url_hash: int) -> str | None:
+    """file_id картинки по хэшу её URL или None."""
+    async with async_session() as session:
+        return await session.scalar(select(MediaFile.file_id).where(MediaFile.url_hash == url_hash))
+
+
+async def save_file_id(url_hash: int, url: str, file_id: str) -> None:
+    """Сохраняет file_id картинки (заменяет прежний, если картинку загрузили заново)."""
+    now = datetime.now(timezone.utc)
+    stmt = insert(MediaFile).values(url_hash=url_hash, url=url, file_id=file_id, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MediaFile.url_hash],
+        set_={"url": stmt.excluded.url, "file_id": stmt.excluded.file_id, "updated_at": now},
+    )
+    async with async_session() as session:
+        await session.execute(stmt)
+        await session.commit()
+
+
+async def delete_file_id(url_hash: int) -> None:
+    """Забывает file_id картинки (Telegram его больше не принимает)."""
+    async with async_session() as session:
+        await session.execute(delete(MediaFile).where(MediaFile.url_hash == url_hash))
+        await session.commit()
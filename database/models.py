@@ -1,10 +1,11 @@
 """
-Модели SQLAlchemy: Пользователи и Каналы.
+Модели SQLAlchemy: Пользователи, Каналы, кэш обобщений статей, отправленные и опубликованные новости,
+отметки обработанных RSS-лент, картинки, уже загруженные в Telegram.
 """
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, String, Text
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, String, Text, UniqueConstraint, false
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -19,9 +20,18 @@ class User(Base):
     Пользователь бота.
     id — Telegram user id.
     Подписка и каналы связаны через subscription_expires_at и отношение channels.
+    is_subscribed снимается ежедневной задачей, когда subscription_expires_at прошла.
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Частичный индекс: ежедневная задача ищет среди действующих подписок истёкшие и истекающие
+        Index(
+            "ix_users_subscription_expires_at",
+            "subscription_expires_at",
+            postgresql_where="is_subscribed",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(
         BigInteger,
@@ -34,6 +44,18 @@ class User(Base):
         nullable=True,
         comment="До какой даты действует подписка",
     )
+    is_subscribed: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default=false(),
+        comment="Подписка действует (снимается по истечении subscription_expires_at)",
+    )
+    expiry_reminded_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="Когда отправлено напоминание о скором окончании подписки",
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=datetime.utcnow,
@@ -102,3 +124,136 @@ class Channel(Base):
 
     def __repr__(self) -> str:
         return f"<Channel(id={self.id}, telegram_channel_id={self.telegram_channel_id}, user_id={self.user_id})>"
+
+
+class Summary(Base):
+    """
+    Готовое обобщение статьи от Gemini.
+    Ключ — нормализованный URL, хэш текста статьи и версия промпта/стиля:
+    одна статья обобщается один раз для всех пользователей и каналов.
+    """
+
+    __tablename__ = "summaries"
+    __table_args__ = (
+        UniqueConstraint("url", "content_hash", "prompt_version", name="uq_summaries_key"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    url: Mapped[str] = mapped_column(Text, nullable=False, comment="Нормализованный URL статьи")
+    content_hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="sha256 текста, который обобщался",
+    )
+    prompt_version: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="Версия промпта и стиля публикации",
+    )
+    summary: Mapped[str] = mapped_column(Text, nullable=False)
+    model: Mapped[str] = mapped_column(String(64), nullable=False, comment="Модель Gemini")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self) -> str:
+        return f"<Summary(id={self.id}, url={self.url}, model={self.model})>"
+
+
+class SentNews(Base):
+    """
+    Новость, уже отправленная пользователю по кнопке.
+    Хранится 64-битный хэш нормализованного URL; на пользователя — ограниченное число последних записей.
+    """
+
+    __tablename__ = "sent_news"
+    __table_args__ = (
+        Index("ix_sent_news_user_sent_at", "user_id", "sent_at"),
+    )
+
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, comment="Telegram user id")
+    url_hash: Mapped[int] = mapped_column(BigInteger, primary_key=True, comment="Хэш нормализованного URL")
+    sent_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self) -> str:
+        return f"<SentNews(user_id={self.user_id}, url_hash={self.url_hash})>"
+
+
+class PostedNews(Base):
+    """
+    Новость, уже опубликованная автопостингом в канал (или пропущенная как устаревшая).
+    url_hash — 64-битный хэш нормализованного URL.
+    """
+
+    __tablename__ = "posted_news"
+
+    channel_id: Mapped[int] = mapped_column(
+        ForeignKey("channels.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    url_hash: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    posted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self) -> str:
+        return f"<PostedNews(channel_id={self.channel_id}, url_hash={self.url_hash})>"
+
+
+class FeedMark(Base):
+    """
+    Отметка уровня RSS-ленты для автопостинга: время самой свежей обработанной записи
+    и ссылки записей с этим временем (и записей без даты). Всё, что не новее отметки,
+    при следующей загрузке ленты не разбирается — в том числе после перезапуска.
+    """
+
+    __tablename__ = "feed_marks"
+
+    feed_url: Mapped[str] = mapped_column(Text, primary_key=True)
+    published_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="Время публикации самой свежей обработанной записи",
+    )
+    urls: Mapped[list[str]] = mapped_column(
+        ARRAY(Text),
+        nullable=False,
+        default=list,
+        comment="Ссылки записей на отметке и записей без даты",
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self) -> str:
+        return f"<FeedMark(feed_url={self.feed_url}, published_at={self.published_at})>"
+
+
+class MediaFile(Base):
+    """
+    Картинка, уже загруженная в Telegram: её file_id отправляется повторно вместо ссылки,
+    и Telegram не скачивает картинку заново. url_hash — 64-битный хэш нормализованного URL картинки.
+    """
+
+    __tablename__ = "media_files"
+
+    url_hash: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    url: Mapped[str] = mapped_column(Text, nullable=False, comment="URL картинки")
+    file_id: Mapped[str] = mapped_column(Text, nullable=False, comment="file_id самого большого размера фото")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=datetime.utcnow,
+    )
+
+    def __repr__(self) -> str:
+        return f"<MediaFile(url_hash={self.url_hash}, url={self.url})>"
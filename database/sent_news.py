@@ -0,0 +1,65 @@
+"""
+Отправленные пользователям новости (таблица sent_news): загрузка, добавление с обрезкой, сброс.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.engine import async_session
+from database.models import SentNews
+
+
+async def load_sent(user_id: int, limit: int, ttl_days: int) -> list[int]:
+    """Хэши последних limit отправленных пользователю новостей не старше ttl_days (от новых к старым)."""
+    since = datetime.now(timezone.utc) - timedelta(days=ttl_days)
+    async with async_session() as session:
+        rows = await session.scalars(
+            select(SentNews.url_hash)
+            .where(SentNews.user_id == user_id, SentNews.sent_at >= since)
+            .order_by(SentNews.sent_at.desc())
+            .limit(limit)
+        )
+        return list(rows)
+
+
+async def add_sent(user_id: int, url_hash: int, limit: int, ttl_days: int) -> None:
+    """Отмечает новость отправленной и оставляет у пользователя не больше limit свежих записей."""
+    now = datetime.now(timezone.utc)
+    stmt = insert(SentNews).values(user_id=user_id, url_hash=url_hash, sent_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SentNews.user_id, SentNews.url_hash],
+        set_={"sent_at": now},
+    )
+    keep = (
+        select(SentNews.url_hash)
+        .where(SentNews.user_id == user_id)
+        .order_by(SentNews.sent_at.desc())
+        .limit(limit)
+    )
+    async with async_session() as session:
+        await session.execute(stmt)
+        await session.execute(
+            delete(SentNews).where(
+                SentNews.user_id == user_id,
+                (SentNews.sent_at < now - timedelta(days=ttl_days)) | SentNews.url_hash.not_in(keep.scalar_subquery()),
+            )
+        )
+        await session.commit()
+
+
+async def reset_sent(user_id: int, url_hash: int) -> None:
+    """
+    Все новости просмотрены: начинаем заново — одной транзакцией удаляет историю пользователя
+    и отмечает url_hash отправленной сейчас.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = insert(SentNews).values(user_id=user_id, url_hash=url_hash, sent_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SentNews.user_id, SentNews.url_hash],
+        set_={"sent_at": now},
+    )
+    async with async_session() as session:
+        await session.execute(delete(SentNews).where(SentNews.user_id == user_id, SentNews.url_hash != url_hash))
+        await session.execute(stmt)
+        await session.commit()
@@ -0,0 +1,109 @@
+"""
+Подписки пользователей: продление и ежедневная обработка истечения.
+Истечение — один SQL-запрос над всеми пользователями сразу (без построчного ORM),
+по частичному индексу ix_users_subscription_expires_at. Условие «истекла к текущему моменту»
+само догоняет пропущенные дни, если планировщик был остановлен.
+Напоминания выбираются страницами по тому же индексу и отмечаются пачкой после отправки.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from database.engine import async_session
+from database.models import User
+
+
+def extend_subscription_stmt(user_id: int, days: int, now: datetime | None = None):
+    """
+    INSERT ... ON CONFLICT: продлевает подписку на days дней от текущей даты окончания
+    (или от now, если подписки нет или она уже истекла).
+    """
+    now = now or datetime.now(timezone.utc)
+    stmt = insert(User).values(
+        id=user_id,
+        subscription_expires_at=now + timedelta(days=days),
+        is_subscribed=True,
+        created_at=now,
+        updated_at=now,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[User.id],
+        set_={
+            "subscription_expires_at": func.greatest(
+                func.coalesce(User.subscription_expires_at, now), now
+            ) + timedelta(days=days),
+            "is_subscribed": True,
+            "updated_at": now,
+        },
+    ).returning(User.subscription_expires_at)
+
+
+async def extend_subscription(user_id: int, days: int) -> datetime:
+    """Продлевает подписку пользователя; возвращает новую дату окончания."""
+    async with async_session() as session:
+        expires_at = await session.scalar(extend_subscription_stmt(user_id, days))
+        await session.commit()
+        return expires_at
+
+
+async def expire_subscriptions(now: datetime | None = None) -> list[int]:
+    """
+    Один UPDATE ... RETURNING: снимает is_subscribed у всех, чья подписка закончилась к now
+    (включая пропущенные дни); возвращает их id.
+    """
+    now = now or datetime.now(timezone.utc)
+    stmt = (
+        update(User)
+        .where(User.is_subscribed, User.subscription_expires_at <= now)
+        .values(is_subscribed=False, updated_at=now)
+        .returning(User.id)
+    )
+    async with async_session() as session:
+        expired = list(await session.scalars(stmt))
+        await session.commit()
+    return expired
+
+
+async def pending_reminders(
+    remind_before: timedelta,
+    limit: int,
+    after: tuple[datetime, int] | None = None,
+    now: datetime | None = None,
+) -> list[tuple[int, datetime]]:
+    """
+    До limit пользователей (id, дата окончания), чья подписка закончится в ближайшие remind_before
+    и кому за текущий период ещё не напоминали — по возрастанию даты окончания.
+    after — (дата окончания, id) последнего из предыдущей страницы.
+    Отметка ставится только после отправки (mark_reminded): неотправленные выбираются снова.
+    """
+    now = now or datetime.now(timezone.utc)
+    stmt = (
+        select(User.id, User.subscription_expires_at)
+        .where(
+            User.is_subscribed,
+            User.subscription_expires_at > now,
+            User.subscription_expires_at <= now + remind_before,
+            # Одно напоминание на период подписки: после продления дата окончания сдвигается
+            (User.expiry_reminded_at.is_(None))
+            | (User.expiry_reminded_at < User.subscription_expires_at - remind_before),
+        )
+        .order_by(User.subscription_expires_at, User.id)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(User.subscription_expires_at, User.id) > tuple_(*after))
+    async with async_session() as session:
+        return [(row.id, row.subscription_expires_at) for row in await session.execute(stmt)]
+
+
+async def mark_reminded(user_ids: list[int], now: datetime | None = None) -> None:
+    """Отмечает напоминание отправленным — одним UPDATE на всю пачку."""
+    if not user_ids:
+        return
+    now = now or datetime.now(timezone.utc)
+    async with async_session() as session:
+        await session.execute(
+            update(User).where(User.id.in_(user_ids)).values(expiry_reminded_at=now)
+        )
+        await session.commit()
@@ -0,0 +1,38 @@
+"""
+Чтение и запись готовых обобщений статей (таблица summaries).
+"""
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.engine import async_session
+from database.models import Summary
+
+
+async def get_summary(url: str, content_hash: str, prompt_version: str) -> str | None:
+    """Обобщение по ключу (url, content_hash, prompt_version) или None."""
+    async with async_session() as session:
+        return await session.scalar(
+            select(Summary.summary).where(
+                Summary.url == url,
+                Summary.content_hash == content_hash,
+                Summary.prompt_version == prompt_version,
+            )
+        )
+
+
+async def save_summary(url: str, content_hash: str, prompt_version: str, summary: str, model: str) -> None:
+    """Сохраняет обобщение; если запись с таким ключом уже есть — ничего не делает."""
+    stmt = (
+        insert(Summary)
+        .values(
+            url=url,
+            content_hash=content_hash,
+            prompt_version=prompt_version,
+            summary=summary,
+            model=model,
+        )
+        .on_conflict_do_nothing(constraint="uq_summaries_key")
+    )
+    async with async_session() as session:
+        await session.execute(stmt)
+        await session.commit()
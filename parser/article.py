@@ -2,15 +2,24 @@
 Получение полного текста статьи и картинки со страницы, поиск фото в интернете.
 """
 import logging
-import re
-from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup
+from config import ARTICLE_CACHE_MAX_BYTES, ARTICLE_CACHE_TTL, ARTICLE_EXTRACTOR, PEXELS_API_URL
+from parser.executor import parse_executor
+from parser.extract import get_backend
+from utils import http_client
+from utils.cache import SingleFlight, TTLCache
+from utils.metrics import registry, span
+from utils.urls import normalize_url
 
 logger = logging.getLogger(__name__)
 
-HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Bot/1.0"}
+
+_backend = get_backend(ARTICLE_EXTRACTOR)
+
+
+def _extract_text_and_image(page_html: str, article_url: str) -> tuple[str, str | None]:
+    """Извлекает из HTML страницы полный текст и URL картинки выбранным бэкендом (см. parser/extract.py)."""
+    return _backend.extract(page_html, article_url)
 
 
 def fetch_article_full_text_and_image(article_url: str) -> tuple[str, str | None]:
@@ -18,48 +27,83 @@ def fetch_article_full_text_and_image(article_url: str) -> tuple[str, str | None
     Загружает страницу статьи, извлекает полный текст и URL картинки (og:image или первая в статье).
     Возвращает (full_text, image_url). image_url может быть None.
     """
-    full_text = ""
-    image_url = None
     try:
-        resp = requests.get(article_url, timeout=15, headers=HEADERS)
+        resp = http_client.get_sync_session().get(article_url, timeout=http_client.sync_timeout())
         resp.raise_for_status()
         resp.encoding = resp.apparent_encoding or "utf-8"
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # Картинка: og:image или первая в контенте
-        og = soup.find("meta", property="og:image")
-        if og and og.get("content"):
-            image_url = og["content"].strip()
-        if not image_url:
-            for img in soup.select("article img, .post__text img, .content img, .article__body img, [class*='article'] img, [class*='post'] img"):
-                src = img.get("src") or img.get("data-src")
-                if src and not any(x in src.lower() for x in ("pixel", "tracker", "1x1", "blank")):
-                    image_url = urljoin(article_url, src)
-                    break
-        if not image_url:
-            first_img = soup.find("img", src=True)
-            if first_img:
-                image_url = urljoin(article_url, first_img["src"])
-
-        # Полный текст: ищем основной контент
-        body = (
-            soup.select_one("article .post__text")
-            or soup.select_one(".post__text")
-            or soup.select_one("[class*='article__body']")
-            or soup.select_one("[class*='content'] article")
-            or soup.select_one("article")
-            or soup.select_one(".content")
-        )
-        if body:
-            for tag in body.select("script, style, nav, .ad, .ads, [class*='ad-']"):
-                tag.decompose()
-            full_text = body.get_text(separator="\n", strip=True)
-            full_text = re.sub(r"\n{3,}", "\n\n", full_text)
-        if not full_text and soup.find("article"):
-            full_text = soup.find("article").get_text(separator="\n", strip=True)
+        with span("article_parse"):
+            return _extract_text_and_image(resp.text, article_url)
     except Exception as e:
         logger.debug("fetch_article_full_text_and_image %s: %s", article_url, e)
-    return full_text or "", image_url
+    return "", None
+
+
+async def fetch_article_full_text_and_image_async(article_url: str) -> tuple[str, str | None]:
+    """
+    Асинхронная версия fetch_article_full_text_and_image — не блокирует цикл событий бота.
+    Возвращает (full_text, image_url). image_url может быть None.
+    """
+    try:
+        with span("article_fetch"):
+            async with http_client.get_session().get(article_url) as resp:
+                resp.raise_for_status()
+                page_html = await resp.text(errors="replace")
+        # Разбор HTML — в пуле разбора, чтобы не держать цикл событий
+        with span("article_parse"):
+            return await parse_executor.run(_extract_text_and_image, page_html, article_url)
+    except Exception as e:
+        logger.debug("fetch_article_full_text_and_image_async %s: %s", article_url, e)
+    return "", None
+
+
+def _article_size(value: tuple[str, str | None]) -> int:
+    """Примерный размер записи кэша статьи в байтах."""
+    full_text, image_url = value
+    return len(full_text.encode("utf-8")) + len((image_url or "").encode("utf-8")) + 64
+
+
+class ArticleCache:
+    """
+    Кэш (full_text, image_url) статей с TTL и лимитом по байтам.
+    Одновременные запросы одной статьи объединяются: страница скачивается и разбирается один раз.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int):
+        self._cache = TTLCache(ttl, max_bytes, _article_size)
+        self._flight = SingleFlight()
+
+    async def get(self, article_url: str) -> tuple[str, str | None]:
+        key = normalize_url(article_url)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        return await self._flight.do(key, lambda: self._load(key, article_url))
+
+    async def _load(self, key: str, article_url: str) -> tuple[str, str | None]:
+        result = await fetch_article_full_text_and_image_async(article_url)
+        # Пустой результат (ошибка загрузки) не кэшируем — попробуем снова при следующем запросе
+        if result[0]:
+            self._cache.set(key, result)
+        return result
+
+    def snapshot_stats(self) -> dict[str, int]:
+        """Счётчики: попадания, промахи, объединённые запросы, вытеснения и занятые байты."""
+        return {
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "coalesced": self._flight.coalesced,
+            "evictions": self._cache.evictions,
+            "bytes": self._cache.bytes,
+        }
+
+
+article_cache = ArticleCache(ttl=ARTICLE_CACHE_TTL, max_bytes=ARTICLE_CACHE_MAX_BYTES)
+registry.collect("article_cache", article_cache.snapshot_stats)
+
+
+async def get_article_cached(article_url: str) -> tuple[str, str | None]:
+    """(full_text, image_url) статьи через общий кэш с объединением одновременных загрузок."""
+    return await article_cache.get(article_url)
 
 
 def search_photo_by_query(query: str, api_key: str | None = None) -> str | None:
@@ -70,17 +114,39 @@ def search_photo_by_query(query: str, api_key: str | None = None) -> str | None:
     if not api_key:
         return None
     try:
-        resp = requests.get(
-            "https://api.pexels.com/v1/search",
-            params={"query": query[:100], "per_page": 1, "locale": "ru-RU"},
+        resp = http_client.get_sync_session().get(
+            f"{PEXELS_API_URL}/search",
+            params=_pexels_params(query),
             headers={"Authorization": api_key},
-            timeout=10,
+            timeout=http_client.sync_timeout(10),
         )
         resp.raise_for_status()
-        data = resp.json()
-        photos = data.get("photos") or []
-        if photos and photos[0].get("src", {}).get("large"):
-            return photos[0]["src"]["large"]
+        return _first_photo(resp.json())
     except Exception as e:
         logger.debug("search_photo_by_query %s: %s", query[:30], e)
     return None
+
+
+async def search_photo_by_query_async(query: str, api_key: str | None = None) -> str | None:
+    """Асинхронная версия search_photo_by_query. Ошибка запроса — исключение (ответ «не нашлось» — None)."""
+    if not api_key:
+        return None
+    async with http_client.get_session().get(
+        f"{PEXELS_API_URL}/search",
+        params=_pexels_params(query),
+        headers={"Authorization": api_key},
+    ) as resp:
+        resp.raise_for_status()
+        return _first_photo(await resp.json())
+
+
+def _pexels_params(query: str) -> dict[str, str | int]:
+    return {"query": query[:100], "per_page": 1, "locale": "ru-RU"}
+
+
+def _first_photo(data: dict) -> str | None:
+    """URL первой фотографии из ответа поиска Pexels."""
+    photos = data.get("photos") or []
+    if photos and photos[0].get("src", {}).get("large"):
+        return photos[0]["src"]["large"]
+    return None
@@ -2,8 +2,10 @@
 Базовый класс и общая логика для парсеров новостей с сайтов.
 Конкретные парсеры (по одному на сайт/источник) добавляйте в этой папке.
 """
+import asyncio
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 from typing import Any
 
 
@@ -16,6 +18,16 @@ class NewsItem:
     published_at: Any = None  # datetime или строка
     image_url: str | None = None  # ссылка на картинку из новости или поиска
     raw: dict[str, Any] | None = None
+    categories: set[str] = field(default_factory=set)  # виды спорта (parser/topics.py)
+    teams: set[str] = field(default_factory=set)  # команды (parser/topics.py)
+
+
+def published_key(item: NewsItem) -> datetime:
+    """Ключ сортировки по дате публикации; новости без разобранной даты — самые старые."""
+    if isinstance(item.published_at, datetime):
+        # Даты из RSS без часового пояса — сравниваем как есть
+        return item.published_at.replace(tzinfo=None)
+    return datetime.min
 
 
 class BaseParser(ABC):
@@ -28,3 +40,7 @@ class BaseParser(ABC):
     def fetch_news(self) -> list[NewsItem]:
         """Получить список новостей с источника. Реализация в наследниках."""
         pass
+
+    async def fetch_news_async(self) -> list[NewsItem]:
+        """Асинхронная загрузка; по умолчанию fetch_news() выполняется в отдельном потоке."""
+        return await asyncio.to_thread(self.fetch_news)
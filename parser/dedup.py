@@ -0,0 +1,73 @@
+"""
+Поиск одной и той же истории в разных источниках (почти-дубликаты по заголовку и описанию).
+Если championat.com, sports.ru и sportbox.ru пишут об одном трансфере, через загрузку статьи,
+Gemini и публикацию проходит только одна новость — представитель группы.
+Сравниваются множества основ слов (MinHash + LSH, utils/minhash.py); порог сходства
+настраивается (DEDUP_SIMILARITY), проверка порога на примерах — scripts/bench_dedup.py.
+"""
+import re
+
+from config import DEDUP_MAX_ITEMS, DEDUP_SIMILARITY
+from parser.base import NewsItem, published_key
+from utils.metrics import registry
+from utils.minhash import LSHIndex, MinHasher
+from utils.urls import url_hash
+
+NUM_PERM = 64
+# 32 полосы по 2 позиции: пара с мерой Жаккара 0.3 попадает в кандидаты с вероятностью ~0.95
+BANDS = 32
+# Длина основы слова: грубая замена стемминга, чтобы «трансфер», «трансфера», «трансферу» совпадали
+STEM_LENGTH = 6
+
+_WORD_RE = re.compile(r"\w{3,}")
+_STOP_WORDS = frozenset((
+    "что", "как", "это", "для", "при", "после", "перед", "его", "она", "они", "был", "была", "были",
+    "будет", "уже", "или", "так", "также", "который", "которая", "the", "and", "for", "with",
+))
+
+
+def tokens(item: NewsItem) -> set[str]:
+    """Основы значимых слов заголовка и описания."""
+    words = _WORD_RE.findall(f"{item.title} {item.summary}".lower())
+    return {w[:STEM_LENGTH] for w in words if w not in _STOP_WORDS and not w.isdigit()}
+
+
+class StoryIndex:
+    """
+    Последние истории: представитель каждой группы почти-дубликатов и его подпись.
+    Новая новость, похожая на уже известную историю, сводится к её представителю.
+    """
+
+    def __init__(self, threshold: float, max_items: int):
+        self._hasher = MinHasher(NUM_PERM)
+        self._lsh = LSHIndex(NUM_PERM, BANDS, threshold, max_items)
+        self._items: dict[int, NewsItem] = {}
+        self.stats = {"items": 0, "duplicates": 0}
+
+    def representative(self, item: NewsItem) -> NewsItem:
+        """Представитель истории, к которой относится item (сам item, если история новая)."""
+        self.stats["items"] += 1
+        h = url_hash(item.url)
+        if h in self._items:
+            return self._items[h]
+        sig = self._hasher.signature(tokens(item))
+        for key, _ in self._lsh.query(sig):
+            known = self._items.get(key)
+            if known is not None:
+                self.stats["duplicates"] += 1
+                return known
+        self._items[h] = item
+        for evicted in self._lsh.add(h, sig):
+            self._items.pop(evicted, None)
+        return item
+
+    def cluster(self, items: list[NewsItem]) -> dict[int, NewsItem]:
+        """
+        url_hash каждой новости → представитель её истории.
+        Новости обрабатываются от старых к новым: представитель — первая опубликованная версия.
+        """
+        return {url_hash(item.url): self.representative(item) for item in sorted(items, key=published_key)}
+
+
+story_index = StoryIndex(DEDUP_SIMILARITY, DEDUP_MAX_ITEMS)
+registry.collect("story_index", lambda: story_index.stats)
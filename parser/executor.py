@@ -0,0 +1,151 @@
+"""
+Исполнитель разбора HTML статей и RSS-лент вне цикла событий.
+Разбор — чистая работа процессора: в цикле событий он держит GIL и задерживает ответы по кнопке.
+process — пул процессов (разбор идёт параллельно и не мешает циклу), thread — пул потоков
+(дешевле, но делит GIL с циклом), inline — прямо в цикле событий.
+Очередь ограничена (PARSE_QUEUE_MAX): когда места нет, run() ждёт — загрузки не копят страницы в памяти.
+Задачи автопостинга идут с фоновым приоритетом (background_parsing): свободный воркер
+сначала берёт разбор для ответа пользователю, и часть мест в очереди зарезервирована за ним.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from config import PARSE_EXECUTOR, PARSE_QUEUE_MAX, PARSE_WORKERS
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше — раньше
+INTERACTIVE = 0
+BACKGROUND = 1
+
+KINDS = ("process", "thread", "inline")
+
+_priority: ContextVar[int] = ContextVar("parse_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_parsing() -> Iterator[None]:
+    """Разбор внутри блока (и в задачах, созданных в нём) идёт с фоновым приоритетом."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    """Приоритет текущей задачи: BACKGROUND внутри background_parsing(), иначе INTERACTIVE."""
+    return _priority.get()
+
+
+class ParseExecutor:
+    """Пул разбора с ограниченной очередью и приоритетами; run(fn, *args) — результат fn(*args)."""
+
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        if kind not in KINDS:
+            raise ValueError(f"Неизвестный исполнитель разбора: {kind!r} (варианты: {', '.join(KINDS)})")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._pool: Executor | None = None
+        # Очередь и места привязаны к циклу событий: пересоздаём, если цикл сменился (планировщик)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: dict[int, asyncio.Semaphore] = {}
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self.stats = {"tasks": 0, "queued": 0, "backpressure": 0, "pool_restarts": 0}
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="parse")
+        return self._pool
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Часть мест зарезервирована за разбором для ответов пользователям
+            reserved = max(1, self.max_pending // 4)
+            self._slots = {
+                INTERACTIVE: asyncio.Semaphore(reserved),
+                BACKGROUND: asyncio.Semaphore(self.max_pending - reserved),
+            }
+            self._waiting = []
+            self._running = 0
+            self._loop = loop
+        return loop
+
+    async def _acquire_worker(self, loop: asyncio.AbstractEventLoop, priority: int) -> None:
+        if self._running < self.workers:
+            self._running += 1
+            return
+        self.stats["queued"] += 1
+        waiter = loop.create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Воркер успели передать, а задача отменена — отдаём его следующему
+            if waiter.done() and not waiter.cancelled():
+                self._release_worker()
+            raise
+
+    def _release_worker(self) -> None:
+        """Передаёт воркер ждущей задаче с наивысшим приоритетом или освобождает его."""
+        while self._waiting:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        fn(*args) в пуле разбора. Для пула процессов fn и аргументы должны сериализоваться (pickle):
+        функции уровня модуля, bytes/str и dataclass-объекты.
+        """
+        self.stats["tasks"] += 1
+        if self.kind == "inline":
+            return fn(*args)
+        loop = self._bind()
+        priority = current_priority()
+        slots = self._slots[priority]
+        if slots.locked():
+            self.stats["backpressure"] += 1
+        async with slots:
+            await self._acquire_worker(loop, priority)
+            try:
+                return await loop.run_in_executor(self._executor(), fn, *args)
+            except BrokenProcessPool:
+                # Процесс пула упал (например, нехватка памяти) — следующий вызов создаст новый пул
+                logger.warning("Пул разбора сломан, пересоздаём")
+                self.stats["pool_restarts"] += 1
+                self._pool = None
+                raise
+            finally:
+                self._release_worker()
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {**self.stats, "running": self._running, "waiting": len(self._waiting)}
+
+    def shutdown(self) -> None:
+        """Останавливает пул (вызывать при остановке процесса)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+
+parse_executor = ParseExecutor(PARSE_EXECUTOR, PARSE_WORKERS, PARSE_QUEUE_MAX)
+registry.collect("parse_executor", parse_executor.snapshot_stats)
@@ -0,0 +1,157 @@
+"""
+Бэкенды извлечения текста статьи и картинки из HTML.
+bs4 — эталонная реализация на BeautifulSoup (html.parser), selectolax — быстрый путь
+на C-парсере lexbor: из дерева берутся только og:image, картинки и блок основного текста.
+"""
+import logging
+import re
+from abc import ABC, abstractmethod
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax не установлен — доступен только bs4
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+# Картинки внутри контента статьи
+IMAGE_SELECTOR = "article img, .post__text img, .content img, .article__body img, [class*='article'] img, [class*='post'] img"
+# Блок основного текста — по приоритету
+BODY_SELECTORS = (
+    "article .post__text",
+    ".post__text",
+    "[class*='article__body']",
+    "[class*='content'] article",
+    "article",
+    ".content",
+)
+# Что вырезать из блока текста
+JUNK_SELECTOR = "script, style, nav, .ad, .ads, [class*='ad-']"
+# Признаки счётчиков и заглушек вместо настоящих картинок
+_IMAGE_STOP_WORDS = ("pixel", "tracker", "1x1", "blank")
+
+
+class ExtractionBackend(ABC):
+    """Извлекает из HTML страницы (full_text, image_url)."""
+
+    name: str = ""
+
+    @abstractmethod
+    def extract(self, page_html: str, article_url: str) -> tuple[str, str | None]:
+        pass
+
+
+class Bs4Backend(ExtractionBackend):
+    """Эталон: полное дерево BeautifulSoup (html.parser)."""
+
+    name = "bs4"
+
+    def extract(self, page_html: str, article_url: str) -> tuple[str, str | None]:
+        full_text = ""
+        image_url = None
+        soup = BeautifulSoup(page_html, "html.parser")
+
+        # Картинка: og:image или первая в контенте
+        og = soup.find("meta", property="og:image")
+        if og and og.get("content"):
+            image_url = og["content"].strip()
+        if not image_url:
+            for img in soup.select(IMAGE_SELECTOR):
+                src = img.get("src") or img.get("data-src")
+                if src and not any(x in src.lower() for x in _IMAGE_STOP_WORDS):
+                    image_url = urljoin(article_url, src)
+                    break
+        if not image_url:
+            first_img = soup.find("img", src=True)
+            if first_img:
+                image_url = urljoin(article_url, first_img["src"])
+
+        # Полный текст: ищем основной контент
+        body = None
+        for selector in BODY_SELECTORS:
+            body = soup.select_one(selector)
+            if body:
+                break
+        if body:
+            for tag in body.select(JUNK_SELECTOR):
+                tag.decompose()
+            full_text = body.get_text(separator="\n", strip=True)
+            full_text = re.sub(r"\n{3,}", "\n\n", full_text)
+        if not full_text and soup.find("article"):
+            full_text = soup.find("article").get_text(separator="\n", strip=True)
+        return full_text or "", image_url
+
+
+def _lexbor_text(node) -> str:
+    """Текст узла как у bs4 get_text(separator="\\n", strip=True): непустые текстовые узлы через перевод строки."""
+    parts = []
+    for child in node.traverse(include_text=True):
+        if child.tag == "-text":
+            text = (child.text_content or "").strip()
+            if text:
+                parts.append(text)
+    return "\n".join(parts)
+
+
+class SelectolaxBackend(ExtractionBackend):
+    """Быстрый путь: lexbor через selectolax, выборка только нужных узлов."""
+
+    name = "selectolax"
+
+    def extract(self, page_html: str, article_url: str) -> tuple[str, str | None]:
+        full_text = ""
+        image_url = None
+        tree = LexborHTMLParser(page_html)
+
+        og = tree.css_first('meta[property="og:image"]')
+        if og is not None and og.attributes.get("content"):
+            image_url = og.attributes["content"].strip()
+        if not image_url:
+            for img in tree.css(IMAGE_SELECTOR):
+                src = img.attributes.get("src") or img.attributes.get("data-src")
+                if src and not any(x in src.lower() for x in _IMAGE_STOP_WORDS):
+                    image_url = urljoin(article_url, src)
+                    break
+        if not image_url:
+            first_img = tree.css_first("img[src]")
+            if first_img is not None:
+                image_url = urljoin(article_url, first_img.attributes.get("src") or "")
+
+        body = None
+        for selector in BODY_SELECTORS:
+            body = tree.css_first(selector)
+            if body is not None:
+                break
+        if body is not None:
+            for tag in body.css(JUNK_SELECTOR):
+                tag.decompose()
+            full_text = re.sub(r"\n{3,}", "\n\n", _lexbor_text(body))
+        if not full_text:
+            article = tree.css_first("article")
+            if article is not None:
+                full_text = _lexbor_text(article)
+        return full_text or "", image_url
+
+
+BACKENDS: dict[str, type[ExtractionBackend]] = {
+    Bs4Backend.name: Bs4Backend,
+    SelectolaxBackend.name: SelectolaxBackend,
+}
+
+
+def get_backend(name: str = "auto") -> ExtractionBackend:
+    """
+    Бэкенд по имени: "bs4", "selectolax" или "auto" (selectolax, если установлен, иначе bs4).
+    """
+    if name == "auto":
+        name = SelectolaxBackend.name if LexborHTMLParser is not None else Bs4Backend.name
+    if name == SelectolaxBackend.name and LexborHTMLParser is None:
+        logger.warning("selectolax не установлен, используется bs4")
+        name = Bs4Backend.name
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Неизвестный бэкенд извлечения: {name}") from None
@@ -0,0 +1,99 @@
+"""
+Кэш RSS-лент по URL: TTL, отдача устаревшей копии с фоновым обновлением (stale-while-revalidate)
+и условные запросы ETag / If-Modified-Since — ответ 304 не разбирается заново.
+Одновременные промахи по одной ленте объединяются в один запрос.
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from parser.base import NewsItem
+from parser.executor import parse_executor
+from utils import http_client
+from utils.cache import SingleFlight
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _FeedEntry:
+    """Закэшированная лента и валидаторы для условного запроса."""
+    items: list[NewsItem]
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+class FeedCache:
+    """
+    Кэш лент. parse — функция разбора содержимого RSS: (bytes, прежние новости ленты) → list[NewsItem];
+    прежние новости передаются, чтобы не разбирать заново уже известные записи.
+    parse выполняется в пуле разбора (parser/executor.py), поэтому должна быть функцией уровня модуля.
+    ttl — сколько секунд лента свежая; stale_ttl — сколько ещё секунд после этого
+    отдаём старую копию, обновляя её в фоне.
+    """
+
+    def __init__(self, parse: Callable[[bytes, list[NewsItem]], list[NewsItem]], ttl: float, stale_ttl: float):
+        self._parse = parse
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: dict[str, _FeedEntry] = {}
+        self._flight = SingleFlight()
+        self._background: set[asyncio.Task] = set()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "not_modified": 0, "fetches": 0}
+
+    async def get(self, url: str) -> list[NewsItem]:
+        """Новости ленты: из кэша, из устаревшей копии (с фоновым обновлением) или загрузкой."""
+        entry = self._entries.get(url)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return list(entry.items)
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                if not self._flight.in_flight(url):
+                    task = asyncio.create_task(self._flight.do(url, lambda: self._revalidate(url)))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return list(entry.items)
+        self.stats["misses"] += 1
+        items = await self._flight.do(url, lambda: self._revalidate(url))
+        return list(items)
+
+    async def _revalidate(self, url: str) -> list[NewsItem]:
+        """Условный запрос ленты; при 304 только продлевает срок жизни записи."""
+        entry = self._entries.get(url)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        self.stats["fetches"] += 1
+        try:
+            with span("feed_fetch"):
+                async with http_client.get_session().get(url, headers=headers) as resp:
+                    if resp.status == 304 and entry is not None:
+                        self.stats["not_modified"] += 1
+                        entry.fetched_at = time.monotonic()
+                        return entry.items
+                    resp.raise_for_status()
+                    content = await resp.read()
+                    etag = resp.headers.get("ETag")
+                    last_modified = resp.headers.get("Last-Modified")
+        except Exception as e:
+            logger.debug("FeedCache %s: %s", url, e)
+            # При ошибке отдаём то, что есть (пусть и устаревшее)
+            return entry.items if entry is not None else []
+        with span("feed_parse"):
+            items = await parse_executor.run(self._parse, content, entry.items if entry is not None else [])
+        self._entries[url] = _FeedEntry(items, etag, last_modified, time.monotonic())
+        return items
+
+    def snapshot_stats(self) -> dict[str, int]:
+        """Счётчики кэша, включая число объединённых одновременных запросов."""
+        return {**self.stats, "coalesced": self._flight.coalesced}
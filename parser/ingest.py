@@ -0,0 +1,91 @@
+"""
+Инкрементальный приём RSS-лент для автопостинга: при каждой загрузке — только записи,
+появившиеся после прошлой обработки (по отметке уровня, см. parser/rss.HighWaterMark).
+Отметки хранятся в БД (feed_marks), поэтому после перезапуска лента не разбирается
+и не публикуется заново. Новая отметка сохраняется только после commit() — если цикл
+автопостинга оборвался, те же записи придут снова (повторную публикацию отсекает posted_news).
+Ленты, часть записей которых опубликовать не удалось, commit() оставляет на прежней отметке.
+"""
+import logging
+from collections.abc import Collection
+
+from database.feed_marks import load_mark, save_marks
+from parser.base import NewsItem
+from parser.executor import parse_executor
+from parser.rss import HighWaterMark, _parse_feed_since
+from utils import http_client
+from utils.cache import SingleFlight
+from utils.metrics import registry, span
+
+logger = logging.getLogger(__name__)
+
+
+class FeedIngest:
+    """Загрузка новых записей лент с отметками уровня и условными запросами (ETag / If-Modified-Since)."""
+
+    def __init__(self) -> None:
+        self._marks: dict[str, HighWaterMark] = {}
+        # Отметки и валидаторы загруженных, но ещё не обработанных лент
+        self._pending: dict[str, tuple[HighWaterMark, tuple[str | None, str | None]]] = {}
+        self._validators: dict[str, tuple[str | None, str | None]] = {}
+        self._flight = SingleFlight()
+        self.stats = {"fetches": 0, "not_modified": 0, "new_items": 0}
+
+    async def _mark(self, url: str) -> HighWaterMark:
+        mark = self._marks.get(url)
+        if mark is None:
+            row = await load_mark(url)
+            mark = HighWaterMark(row[0], frozenset(row[1])) if row else HighWaterMark()
+            self._marks[url] = mark
+        return mark
+
+    async def fetch_new(self, url: str) -> list[NewsItem]:
+        """Записи ленты, которых не было при прошлой обработке (с учётом сохранённой в БД отметки)."""
+        return await self._flight.do(url, lambda: self._fetch_new(url))
+
+    async def _fetch_new(self, url: str) -> list[NewsItem]:
+        mark = await self._mark(url)
+        headers = {}
+        etag, last_modified = self._validators.get(url, (None, None))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        self.stats["fetches"] += 1
+        with span("feed_fetch"):
+            async with http_client.get_session().get(url, headers=headers) as resp:
+                if resp.status == 304:
+                    self.stats["not_modified"] += 1
+                    return []
+                resp.raise_for_status()
+                content = await resp.read()
+                validators = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        with span("feed_parse"):
+            items, new_mark = await parse_executor.run(_parse_feed_since, content, mark)
+        if new_mark != mark:
+            # До commit() ответ 304 вернул бы пустой список вместо необработанных записей
+            self._pending[url] = (new_mark, validators)
+        else:
+            self._validators[url] = validators
+        self.stats["new_items"] += len(items)
+        logger.debug("Лента %s: новых записей %d", url, len(items))
+        return items
+
+    async def commit(self, retry: Collection[str] = ()) -> None:
+        """
+        Сохраняет отметки лент, загруженных с прошлого commit(), — их записи обработаны.
+        Ленты из retry остаются на прежней отметке: их записи придут снова при следующей загрузке.
+        """
+        pending, self._pending = self._pending, {}
+        for url in retry:
+            pending.pop(url, None)
+        if not pending:
+            return
+        await save_marks([(url, mark.published_at, sorted(mark.urls)) for url, (mark, _) in pending.items()])
+        for url, (mark, validators) in pending.items():
+            self._marks[url] = mark
+            self._validators[url] = validators
+
+
+feed_ingest = FeedIngest()
+registry.collect("feed_ingest", lambda: feed_ingest.stats)
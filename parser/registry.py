@@ -0,0 +1,74 @@
+"""
+Реестр парсеров: каждому источнику из config.SUPPORTED_SOURCES — своя реализация BaseParser.
+fetch_all() загружает все источники одновременно, каждый со своим таймаутом,
+и сливает результат в один список: общее время — как у самого медленного источника, а не сумма.
+"""
+import asyncio
+import logging
+from collections.abc import Callable, Iterable
+from functools import partial
+
+from config import SOURCE_FETCH_TIMEOUT, SUPPORTED_SOURCES
+from parser.base import BaseParser, NewsItem, published_key
+from parser.rss import RssParser
+from parser.sports_ru import SPORTS_RU_FOOTBALL_RSS
+from utils.urls import url_hash
+
+logger = logging.getLogger(__name__)
+
+# RSS-ленты источников (ключ — домен без www, как в SUPPORTED_SOURCES)
+SOURCE_FEEDS = {
+    "sports.ru": SPORTS_RU_FOOTBALL_RSS,
+    "championat.com": "https://www.championat.com/rss/news/",
+    "sportbox.ru": "https://news.sportbox.ru/rss/",
+}
+
+# Источник → фабрика парсера; сайты без RSS регистрируют свой парсер через register_parser()
+PARSERS: dict[str, Callable[[], BaseParser]] = {
+    source: partial(RssParser, f"https://{source}/", feed_url) for source, feed_url in SOURCE_FEEDS.items()
+}
+
+
+def register_parser(source: str, factory: Callable[[], BaseParser]) -> None:
+    """Регистрирует (или заменяет) парсер источника."""
+    PARSERS[source] = factory
+
+
+def get_parsers(sources: Iterable[str] = SUPPORTED_SOURCES) -> dict[str, BaseParser]:
+    """Парсеры для указанных источников; источники без парсера пропускаются с предупреждением."""
+    parsers = {}
+    for source in sources:
+        factory = PARSERS.get(source)
+        if factory is None:
+            logger.warning("Нет парсера для источника %s", source)
+            continue
+        parsers[source] = factory()
+    return parsers
+
+
+async def _fetch_source(source: str, parser: BaseParser, timeout: float) -> list[NewsItem]:
+    try:
+        return await asyncio.wait_for(parser.fetch_news_async(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Источник %s не ответил за %g с", source, timeout)
+    except Exception:
+        logger.exception("Не удалось загрузить источник %s", source)
+    return []
+
+
+async def fetch_all(
+    sources: Iterable[str] = SUPPORTED_SOURCES,
+    timeout: float = SOURCE_FETCH_TIMEOUT,
+) -> list[NewsItem]:
+    """
+    Новости всех источников одним списком, от новых к старым.
+    Упавший или не уложившийся в timeout источник просто не попадает в результат.
+    Одна и та же статья из нескольких источников остаётся один раз.
+    """
+    parsers = get_parsers(sources)
+    results = await asyncio.gather(*(_fetch_source(source, parser, timeout) for source, parser in parsers.items()))
+    merged: dict[int, NewsItem] = {}
+    for items in results:
+        for item in items:
+            merged.setdefault(url_hash(item.url), item)
+    return sorted(merged.values(), key=published_key, reverse=True)
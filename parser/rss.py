@@ -0,0 +1,187 @@
+"""
+Разбор RSS-лент и общий парсер для источников с RSS.
+Ленты загружаются через общий кэш лент (parser/feed_cache.py).
+Разбор записи (_parse_entry) — самая дорогая часть, поэтому уже известные записи не разбираются:
+кэш лент переиспользует прежние новости, а для автопостинга есть отметка уровня (HighWaterMark).
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+import feedparser
+
+from config import FEED_CACHE_STALE_TTL, FEED_CACHE_TTL
+from parser.base import BaseParser, NewsItem
+from parser.feed_cache import FeedCache
+from parser.topics import classifier
+from utils import http_client
+from utils.metrics import registry
+
+
+def _image_from_entry(entry: Any) -> str | None:
+    """Извлекает URL картинки из элемента RSS (enclosure, media_content, первый img в summary)."""
+    # Enclosure (тип image)
+    for enc in getattr(entry, "enclosures", []) or []:
+        href = enc.get("href") or enc.get("url")
+        if href and (enc.get("type") or "").startswith("image"):
+            return href
+    # media_content (MediaRSS)
+    media_list = getattr(entry, "media_content", None) or getattr(entry, "media_thumbnail", None) or []
+    for media in media_list if isinstance(media_list, list) else []:
+        m = media if isinstance(media, dict) else getattr(media, "__dict__", {})
+        if (m.get("type") or "").startswith("image") or "url" in m:
+            url = m.get("url") or m.get("href")
+            if url:
+                return url
+    # Первая картинка в summary/description
+    raw = getattr(entry, "summary", None) or getattr(entry, "description", None) or ""
+    match = re.search(r'<img[^>]+src=["\']([^"\']+)["\']', raw, re.I)
+    if match:
+        return match.group(1).strip()
+    return None
+
+
+def _parse_entry(entry: Any) -> NewsItem | None:
+    """Преобразует элемент RSS в NewsItem."""
+    title = getattr(entry, "title", None) or ""
+    link = getattr(entry, "link", None) or ""
+    if not link:
+        return None
+    summary = ""
+    if hasattr(entry, "summary"):
+        summary = entry.summary
+    elif hasattr(entry, "description"):
+        summary = entry.description
+    if hasattr(summary, "replace"):
+        for tag in ("<br>", "<br/>", "<p>", "</p>", "<div>", "</div>"):
+            summary = summary.replace(tag, " ")
+    else:
+        summary = str(summary)
+    # Убираем теги для чистого текста, но оставляем длину полной
+    summary_clean = re.sub(r"<[^>]+>", " ", summary)
+    summary_clean = " ".join(summary_clean.split())
+    published: Any = None
+    if hasattr(entry, "published_parsed") and entry.published_parsed:
+        try:
+            published = datetime(*entry.published_parsed[:6])
+        except (TypeError, IndexError):
+            published = getattr(entry, "published", None)
+    else:
+        published = getattr(entry, "published", None)
+    image_url = _image_from_entry(entry)
+    return NewsItem(
+        title=title,
+        url=link,
+        summary=summary_clean,
+        published_at=published,
+        image_url=image_url,
+        raw=None,
+    )
+
+
+def _entry_link(entry: Any) -> str:
+    return getattr(entry, "link", None) or ""
+
+
+def _entry_time(entry: Any) -> datetime | None:
+    """Время публикации записи в UTC (без разбора остального содержимого)."""
+    parsed = getattr(entry, "published_parsed", None)
+    if not parsed:
+        return None
+    try:
+        return datetime(*parsed[:6], tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_feed(content: bytes, previous: list[NewsItem] | None = None) -> list[NewsItem]:
+    """
+    Разбирает содержимое RSS и возвращает список NewsItem с уже определёнными темами.
+    Записи, которые уже есть в previous (по ссылке), не разбираются заново.
+    """
+    known = {item.url: item for item in previous or ()}
+    feed = feedparser.parse(content)
+    items: list[NewsItem] = []
+    for entry in feed.entries:
+        item = known.get(_entry_link(entry))
+        if item is None:
+            item = _parse_entry(entry)
+            if item:
+                classifier.tag(item)
+        if item:
+            items.append(item)
+    return items
+
+
+@dataclass(frozen=True)
+class HighWaterMark:
+    """
+    Докуда лента уже обработана: время самой свежей записи и ссылки записей с этим временем
+    (записи с одинаковым временем и записи без даты различаются по ссылке).
+    """
+    published_at: datetime | None = None
+    urls: frozenset[str] = field(default_factory=frozenset)
+
+    def is_new(self, link: str, published_at: datetime | None) -> bool:
+        if published_at is not None and self.published_at is not None and published_at != self.published_at:
+            return published_at > self.published_at
+        return link not in self.urls
+
+    def advance(self, entries: list[tuple[str, datetime | None]]) -> "HighWaterMark":
+        """Новая отметка после обработки ленты с записями (ссылка, время)."""
+        times = [t for _, t in entries if t is not None]
+        latest = max([*times, *([self.published_at] if self.published_at else [])], default=None)
+        urls = {link for link, t in entries if t is None or t == latest}
+        if latest is not None and latest == self.published_at:
+            # Отметка не сдвинулась: прежние записи на ней остаются известными, даже если ушли из ленты
+            urls |= self.urls
+        return HighWaterMark(latest, frozenset(urls))
+
+
+def _parse_feed_since(content: bytes, mark: HighWaterMark) -> tuple[list[NewsItem], HighWaterMark]:
+    """
+    Только новые относительно mark записи ленты и сдвинутая отметка.
+    Старые записи отсеиваются по ссылке и времени до разбора (_parse_entry не вызывается).
+    """
+    feed = feedparser.parse(content)
+    items: list[NewsItem] = []
+    seen: list[tuple[str, datetime | None]] = []
+    for entry in feed.entries:
+        link = _entry_link(entry)
+        if not link:
+            continue
+        published_at = _entry_time(entry)
+        seen.append((link, published_at))
+        if not mark.is_new(link, published_at):
+            continue
+        item = _parse_entry(entry)
+        if item:
+            items.append(classifier.tag(item))
+    return items, mark.advance(seen)
+
+
+# Общий кэш лент: при нагрузке число запросов к источникам зависит от времени, а не от числа нажатий
+feed_cache = FeedCache(_parse_feed, ttl=FEED_CACHE_TTL, stale_ttl=FEED_CACHE_STALE_TTL)
+registry.collect("feed_cache", feed_cache.snapshot_stats)
+
+
+class RssParser(BaseParser):
+    """
+    Парсер источника, у которого есть RSS-лента.
+    source_url — адрес сайта, feed_url — его лента.
+    """
+
+    def __init__(self, source_url: str, feed_url: str):
+        super().__init__(source_url)
+        self.feed_url = feed_url
+
+    def fetch_news(self) -> list[NewsItem]:
+        """Загружает ленту синхронно (без кэша лент)."""
+        resp = http_client.get_sync_session().get(self.feed_url, timeout=http_client.sync_timeout())
+        resp.raise_for_status()
+        return _parse_feed(resp.content)
+
+    async def fetch_news_async(self) -> list[NewsItem]:
+        """Новости ленты через общий кэш лент."""
+        return await feed_cache.get(self.feed_url)
@@ -0,0 +1,86 @@
+"""
+Определение тем новости (виды спорта из config.SPORTS_CATEGORIES и команды) по ключевым словам.
+Все ключевые слова всех тем собраны в одно регулярное выражение: текст просматривается
+один раз, сколько бы тем ни было. Ключевое слово совпадает только с целым словом
+(«гол» не находится в «голосовании»); слово со звёздочкой на конце — основа,
+за которой могут идти окончания («футбол*» → «футболист», «футбольный»).
+"""
+import re
+from collections.abc import Iterable
+
+from parser.base import NewsItem
+
+# Виды спорта: ключи совпадают с config.SPORTS_CATEGORIES
+CATEGORY_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "football": (
+        "футбол*", "голкипер*", "гол", "гола", "голы", "голом", "голов", "голами", "голев*",
+        "апл", "рпл", "лига чемпионов", "лиги чемпионов", "лигу чемпионов", "лиге чемпионов",
+        "лига европы", "лиги европы", "премьер-лиг*", "бундеслиг*", "серия а", "серии а", "ла лига",
+        "трансфер*", "football", "soccer", "goal", "goals", "premier league", "champions league",
+    ),
+    "hockey": ("хоккей*", "хоккеист*", "кхл", "нхл", "шайб*", "hockey", "nhl", "khl"),
+    "basketball": ("баскетбол*", "нба", "евролиг*", "basketball", "nba", "euroleague"),
+    "volleyball": ("волейбол*", "volleyball"),
+    "tennis": ("теннис*", "атп", "wta", "atp", "уимблдон*", "ролан гаррос", "wimbledon"),
+}
+
+# Команды
+TEAM_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "man_city": (
+        "манчестер сити", "ман сити", "manchester city", "man city", "сити",
+        "гвардиол*", "guardiola", "холанд*", "haaland", "де брюйне", "de bruyne",
+    ),
+}
+
+
+def _pattern(keyword: str) -> str:
+    """Ключевое слово → регулярное выражение; пробелы внутри фразы — любые пробельные символы."""
+    return r"\s+".join(re.escape(word) for word in keyword.rstrip("*").split())
+
+
+class TopicClassifier:
+    """
+    Классификатор по словарям тем: {тема: ключевые слова}.
+    Совпадение ищется в одном проходе по тексту; на каждое найденное слово — поиск темы в словаре.
+    """
+
+    def __init__(self, categories: dict[str, Iterable[str]], teams: dict[str, Iterable[str]]):
+        self._topics: dict[str, set[str]] = {}
+        self._stems: dict[str, set[str]] = {}
+        self._teams = set(teams)
+        for topics in (categories, teams):
+            for topic, keywords in topics.items():
+                for keyword in keywords:
+                    keyword = " ".join(keyword.lower().split())
+                    if keyword.endswith("*"):
+                        self._stems.setdefault(keyword[:-1], set()).add(topic)
+                    else:
+                        self._topics.setdefault(keyword, set()).add(topic)
+        # Длинные варианты раньше коротких: «лига чемпионов» целиком, а не «лига»
+        words = "|".join(_pattern(k) for k in sorted(self._topics, key=len, reverse=True))
+        stems = "|".join(_pattern(k) for k in sorted(self._stems, key=len, reverse=True))
+        # Проверка первой буквы до начала слова отсекает большинство позиций без разбора альтернатив;
+        # текст приводится к нижнему регистру заранее — это быстрее, чем re.IGNORECASE
+        first = re.escape("".join(sorted({k[0] for k in (*self._topics, *self._stems)})))
+        self._regex = re.compile(rf"(?=[{first}])(?<!\w)(?:({words})(?!\w)|({stems})\w*)")
+
+    def classify(self, text: str) -> set[str]:
+        """Все темы, ключевые слова которых встречаются в тексте."""
+        found: set[str] = set()
+        for match in self._regex.finditer((text or "").lower()):
+            word, stem = match.group(1, 2)
+            if word is not None:
+                found |= self._topics[" ".join(word.split())]
+            else:
+                found |= self._stems[" ".join(stem.split())]
+        return found
+
+    def tag(self, item: NewsItem) -> NewsItem:
+        """Заполняет item.categories и item.teams по заголовку и описанию новости."""
+        found = self.classify(f"{item.title}\n{item.summary}")
+        item.teams = found & self._teams
+        item.categories = found - self._teams
+        return item
+
+
+classifier = TopicClassifier(CATEGORY_KEYWORDS, TEAM_KEYWORDS)
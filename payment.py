@@ -1,3 +1,8 @@
+from config import SUBSCRIPTION_DAYS
+from database import get_session
+from database.subscriptions import extend_subscription_stmt
+
+
 def handle_telegram_stars_payment(user_id, amount):
     # Check if the amount matches the required subscription price
     if amount != 100:
@@ -20,5 +25,8 @@ def verify_payment(trans_id):
 
 def subscribe_user(user_id):
     # Function to subscribe the user for 30 days
-    # Example logic to save subscription data in the database
-    pass
\ No newline at end of file
+    # Extends from the current expiry date if the subscription is still active
+    with get_session() as session:
+        expires_at = session.scalar(extend_subscription_stmt(user_id, SUBSCRIPTION_DAYS))
+        session.commit()
+    return expires_at
\ No newline at end of file
@@ -1,17 +1,41 @@
+import asyncio  # Import asyncio to run the async autoposting cycle
 import schedule  # Import a task scheduling library
 import time   # Import time for sleep functionality
 import logging  # Import logging for error handling
 
+from telegram import Bot
+
+from bot.autopost import run_autopost_cycle
+from bot.send_queue import close_send_queue
+from bot.subscriptions import run_subscription_cycle, send_notifications
+from config import BOT_TOKEN, NEWS_CHECK_INTERVAL, SUBSCRIPTION_NOTIFY_INTERVAL, TELEGRAM_API_URL
+from database import close_async_engine
+from utils import http_client
+from utils.state import state_backend
+
 # Setup logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Run one async cycle (autoposting, subscriptions) with a fresh Bot instance
+
+async def _run_with_bot(cycle):
+    try:
+        async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+            return await cycle(bot)
+    finally:
+        # The send queue, shared HTTP session, DB pool and state connections are bound to this event loop
+        await close_send_queue()
+        await http_client.close()
+        await close_async_engine()
+        await state_backend.close()
+
 # Define the news checking task
 
 def check_news():
     try:
-        # Placeholder for news checking logic
         logging.info("Checking for news...")
-        # ... add news checking logic here ...
+        stats = asyncio.run(_run_with_bot(run_autopost_cycle))
+        logging.info(f"Autopost cycle finished: {stats}")
     except Exception as e:
         logging.error(f'Error while checking news: {str(e)}')
 
@@ -19,18 +43,30 @@ def check_news():
 
 def update_subscriptions():
     try:
-        # Placeholder for subscription updating logic
         logging.info("Updating subscriptions...")
-        # ... add subscription updating logic here ...
+        stats = asyncio.run(_run_with_bot(run_subscription_cycle))
+        logging.info(f"Subscriptions updated: {stats}")
     except Exception as e:
         logging.error(f'Error while updating subscriptions: {str(e)}')
 
+# Define the subscription notification task (a bounded portion per run, so news checks are not held up)
+
+def notify_subscribers():
+    try:
+        stats = asyncio.run(_run_with_bot(send_notifications))
+        if stats["notified"] or stats["reminded"] or stats["failed"]:
+            logging.info(f"Subscription notifications sent: {stats}")
+    except Exception as e:
+        logging.error(f'Error while sending subscription notifications: {str(e)}')
+
 # Schedule tasks
-schedule.every(30).minutes.do(check_news)  # Schedule news checks every 30 minutes
+schedule.every(NEWS_CHECK_INTERVAL).minutes.do(check_news)  # Schedule news checks every NEWS_CHECK_INTERVAL minutes
 schedule.every().day.at("00:00").do(update_subscriptions)  # Schedule updates at midnight
+schedule.every(SUBSCRIPTION_NOTIFY_INTERVAL).minutes.do(notify_subscribers)  # Send pending notifications
 
 # Keep the script running
 if __name__ == '__main__':
+    update_subscriptions()  # Catch up on expirations missed while the scheduler was down
     while True:
         schedule.run_pending()  # Run pending scheduled tasks
         time.sleep(1)  # Sleep for 1 second to prevent high CPU usage
@@ -0,0 +1,121 @@
+"""
+Подбор порога сходства для поиска почти-дубликатов (parser/dedup.py) на размеченных примерах:
+для каждого порога — точность и полнота по парам «та же история / разные истории».
+Запуск из корня проекта: python -m scripts.bench_dedup
+"""
+import itertools
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import DEDUP_SIMILARITY
+from parser.base import NewsItem
+from parser.dedup import NUM_PERM, StoryIndex, tokens
+from utils.minhash import MinHasher, similarity
+
+THRESHOLDS = (0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8)
+
+# Группы: одна и та же история в разных источниках. Соседние группы нарочно об одних командах,
+# чтобы проверить, что разные новости про один клуб не склеиваются
+STORIES = [
+    [
+        ("«Манчестер Сити» объявил о трансфере Савиньо из «Жироны»",
+         "Английский клуб подписал с 20-летним вингером контракт до 2029 года. Сумма трансфера — около 30 млн евро."),
+        ("Савиньо перешёл в «Манчестер Сити»",
+         "Вингер «Жироны» Савиньо подписал контракт с «Манчестер Сити» до 2029 года, сумма трансфера около 30 млн евро."),
+        ("Официально: Савиньо — игрок «Ман Сити»",
+         "«Манчестер Сити» подписал вингера Савиньо. Контракт рассчитан до 2029 года, трансфер обошёлся в 30 млн евро."),
+    ],
+    [
+        ("Гвардиола продлил контракт с «Манчестер Сити» до 2027 года",
+         "Главный тренер «Манчестер Сити» Пеп Гвардиола подписал новый контракт с клубом до лета 2027 года."),
+        ("Пеп Гвардиола подписал новый контракт с «Сити»",
+         "Испанский тренер Пеп Гвардиола продлил соглашение с «Манчестер Сити» до 2027 года."),
+    ],
+    [
+        ("Холанд сделал хет-трик в матче с «Ипсвичем»",
+         "Нападающий «Манчестер Сити» Эрлинг Холанд забил три гола в ворота «Ипсвича» в матче АПЛ, «Сити» победил 4:1."),
+        ("Хет-трик Холанда принёс «Манчестер Сити» победу над «Ипсвичем»",
+         "«Манчестер Сити» обыграл «Ипсвич» со счётом 4:1 в матче АПЛ, Эрлинг Холанд забил три гола."),
+        ("Эрлинг Холанд оформил хет-трик, «Сити» разгромил «Ипсвич»",
+         "В матче АПЛ «Манчестер Сити» победил «Ипсвич» 4:1, хет-трик сделал нападающий Эрлинг Холанд."),
+    ],
+    [
+        ("Родри получил травму крестообразных связок",
+         "Полузащитник «Манчестер Сити» Родри порвал крестообразные связки колена и пропустит остаток сезона."),
+        ("Родри выбыл до конца сезона из-за разрыва связок",
+         "У полузащитника «Манчестер Сити» Родри диагностирован разрыв крестообразных связок колена, он пропустит остаток сезона."),
+    ],
+    [
+        ("«Спартак» уволил главного тренера",
+         "Московский «Спартак» расторг контракт с главным тренером после поражения в дерби с ЦСКА."),
+        ("Главный тренер «Спартака» отправлен в отставку",
+         "«Спартак» расторг контракт с главным тренером после проигрыша ЦСКА в московском дерби."),
+    ],
+    [
+        ("ЦСКА обыграл «Спартак» в дерби РПЛ",
+         "ЦСКА победил «Спартак» со счётом 2:0 в матче РПЛ, голы забили в первом тайме."),
+    ],
+    [
+        ("«Ак Барс» победил СКА в овертайме",
+         "Казанский «Ак Барс» обыграл СКА 3:2 в овертайме матча КХЛ, победную шайбу забросил Дмитрий Кагарлицкий."),
+        ("КХЛ: «Ак Барс» вырвал победу у СКА в овертайме",
+         "«Ак Барс» победил СКА со счётом 3:2 в овертайме, победную шайбу забросил Кагарлицкий."),
+    ],
+    [
+        ("Медведев вышел в четвертьфинал Уимблдона",
+         "Даниил Медведев обыграл соперника в четырёх сетах и вышел в четвертьфинал Уимблдона."),
+        ("Даниил Медведев пробился в 1/4 финала Уимблдона",
+         "Российский теннисист Даниил Медведев в четырёх сетах выиграл матч и вышел в четвертьфинал Уимблдона."),
+    ],
+    [
+        ("Медведев снялся с турнира в Торонто из-за травмы",
+         "Даниил Медведев отказался от участия в турнире в Торонто из-за травмы спины."),
+    ],
+    [
+        ("«Манчестер Сити» проиграл «Тоттенхэму» в Кубке лиги",
+         "«Манчестер Сити» уступил «Тоттенхэму» со счётом 1:2 и вылетел из Кубка английской лиги."),
+    ],
+]
+
+
+def main() -> None:
+    hasher = MinHasher(NUM_PERM)
+    items = [
+        (group, NewsItem(title, f"https://example.com/{group}/{i}", summary))
+        for group, variants in enumerate(STORIES)
+        for i, (title, summary) in enumerate(variants)
+    ]
+    sigs = [(group, tokens(item), hasher.signature(tokens(item))) for group, item in items]
+    pairs = [
+        (a[0] == b[0], len(a[1] & b[1]) / len(a[1] | b[1]), similarity(a[2], b[2]))
+        for a, b in itertools.combinations(sigs, 2)
+    ]
+    same = sum(1 for is_same, _, _ in pairs if is_same)
+    print(f"Новостей: {len(items)}, пар: {len(pairs)}, из них одна история: {same}")
+    print(f"{'порог':>6} {'точность':>9} {'полнота':>8} {'ложные':>7}")
+    for threshold in THRESHOLDS:
+        predicted = [is_same for is_same, _, estimate in pairs if estimate >= threshold]
+        true_positive = sum(predicted)
+        precision = true_positive / len(predicted) if predicted else 1.0
+        print(f"{threshold:>6.1f} {precision:>9.2f} {true_positive / same:>8.2f} {len(predicted) - true_positive:>7}")
+
+    closest_other = max((exact for is_same, exact, _ in pairs if not is_same), default=0)
+    farthest_same = min((exact for is_same, exact, _ in pairs if is_same), default=0)
+    # Сквозная проверка с LSH-индексом при текущем пороге из config
+    index = StoryIndex(DEDUP_SIMILARITY, max_items=len(items))
+    groups_of = {}
+    for group, item in items:
+        groups_of.setdefault(index.representative(item).url, set()).add(group)
+    mixed = sum(1 for groups in groups_of.values() if len(groups) > 1)
+    print(f"Индекс при пороге {DEDUP_SIMILARITY}: историй {len(groups_of)} из {len(STORIES)}, смешанных групп {mixed}")
+
+    print(f"Точная мера Жаккара: самая далёкая пара одной истории {farthest_same:.2f}, "
+          f"самая близкая пара разных историй {closest_other:.2f}")
+
+
+if __name__ == "__main__":
+    main()
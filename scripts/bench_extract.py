@@ -0,0 +1,66 @@
+"""
+Сравнение бэкендов извлечения текста статьи (parser/extract.py) по времени разбора.
+Совпадение результатов на страницах из scripts/fixtures проверяет tests/test_extract.py.
+Запуск из корня проекта: python -m scripts.bench_extract [page.html ...]
+Без аргументов использует синтетическую «большую» страницу в духе sports.ru.
+"""
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from parser.extract import BACKENDS, get_backend
+
+ROUNDS = 20
+
+
+def _synthetic_page() -> str:
+    """Страница с тяжёлой обвязкой (меню, комментарии, скрипты) и статьёй в .post__text."""
+    chrome = "".join(
+        f'<div class="sidebar-item"><a href="/news/{i}/">Новость {i}</a><img src="/i/{i}.jpg"></div>'
+        for i in range(3000)
+    )
+    scripts = "".join(f"<script>window.__data_{i} = {{a: {i}}};</script>" for i in range(200))
+    paragraphs = "".join(f"<p>Абзац {i}: Гвардиола прокомментировал матч, <b>Холанд</b> забил гол.</p>" for i in range(60))
+    return (
+        '<html><head><meta property="og:image" content="https://s.sports.ru/og.jpg">'
+        f"{scripts}</head><body><nav>{chrome}</nav>"
+        f'<div class="content"><article><div class="post__text">{paragraphs}'
+        '<div class="ad-block">реклама</div></div></article></div>'
+        f"<footer>{chrome}</footer></body></html>"
+    )
+
+
+def _bench(name: str, page_html: str) -> tuple[tuple[str, str | None], float]:
+    backend = get_backend(name)
+    result = backend.extract(page_html, "https://www.sports.ru/")
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        backend.extract(page_html, "https://www.sports.ru/")
+    return result, (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def main() -> None:
+    pages = [(p, Path(p).read_text(encoding="utf-8", errors="replace")) for p in sys.argv[1:]]
+    if not pages:
+        pages = [("synthetic", _synthetic_page())]
+    for label, page_html in pages:
+        print(f"{label}: {len(page_html) / 1024:.0f} КБ")
+        results = {}
+        for name in BACKENDS:
+            try:
+                results[name], ms = _bench(name, page_html)
+            except Exception as e:
+                print(f"  {name:<11} недоступен: {e}")
+                continue
+            print(f"  {name:<11} {ms:8.2f} мс/страница, текст {len(results[name][0])} символов")
+        if len(results) > 1:
+            same = len({r for r in results.values()}) == 1
+            print(f"  результаты {'совпадают' if same else 'РАЗЛИЧАЮТСЯ'}")
+
+
+if __name__ == "__main__":
+    main()
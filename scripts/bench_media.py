@@ -0,0 +1,169 @@
+"""
+Картинки к новостям (bot/media.py): сколько раз картинки скачиваются и загружаются при отправке
+одних и тех же новостей многим пользователям и в канал.
+Пользователи нажимают «Получить новость» по --presses раз, каждая новость приходит всем и один раз
+публикуется в канал. Первый прогон — картинки статей (og:image); часть картинок сайт не отдаёт Telegram
+(защита от хотлинков), их бот скачивает и загружает сам. Второй — у новостей нет картинок,
+фото ищется на Pexels по заголовку.
+Выводится, сколько фото отправлено по file_id, по ссылке и загрузкой файла, сколько раз картинки
+скачивали Telegram и бот, сколько было запросов к Pexels, и задержка ответа по кнопке.
+Без повторного использования file_id каждое фото скачивалось бы заново, а каждая отправка без картинки
+в статье искала бы фото на Pexels.
+Сервисы — локальные замены из scripts/fake_services.py; БД не нужна (file_id хранятся в памяти).
+Запуск из корня проекта: python -m scripts.bench_media [--users 10] [--presses 3] [--hotlink-every 3]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.fake_services import FakeGemini, FakeNewsSite, FakePexels, FakeTelegram, free_port, start  # noqa: E402
+
+PERCENTILES = (50, 95)
+CHANNEL = "bench_media"
+
+arg_parser = argparse.ArgumentParser(description="Картинки к новостям: file_id и кэш Pexels")
+arg_parser.add_argument("--users", type=int, default=10, help="пользователей")
+arg_parser.add_argument("--presses", type=int, default=3, help="нажатий на пользователя")
+arg_parser.add_argument("--think", type=float, default=1.0, help="пауза между нажатиями, с")
+arg_parser.add_argument("--hotlink-every", type=int, default=3, help="картинку каждой такой новости сайт не отдаёт Telegram")
+args = arg_parser.parse_args()
+
+SITE_PORT, PLAIN_SITE_PORT, GEMINI_PORT, TELEGRAM_PORT, PEXELS_PORT = (free_port() for _ in range(5))
+# Адреса сервисов и настройки задаются до импорта config
+os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{GEMINI_PORT}/v1beta"
+os.environ["GEMINI_API_KEY"] = "bench-key"
+os.environ["GEMINI_RPM"] = "1000000"
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{TELEGRAM_PORT}/bot"
+os.environ["TELEGRAM_GLOBAL_RATE"] = "100000"
+os.environ["PEXELS_API_URL"] = f"http://127.0.0.1:{PEXELS_PORT}/v1"
+os.environ["PEXELS_API_KEY"] = "bench-key"
+os.environ["CHANNEL_USERNAME"] = CHANNEL
+os.environ["PREFETCH_PER_MINUTE"] = "0"
+os.environ["METRICS_PORT"] = "0"
+os.environ["MEDIA_ENABLED"] = "1"
+
+from telegram import Bot, Update  # noqa: E402
+
+import parser.sports_ru as sports_ru  # noqa: E402
+from bot.handlers import button_news_man_city  # noqa: E402
+from bot.media import media_pipeline  # noqa: E402
+from bot.send_queue import close_send_queue  # noqa: E402
+from config import TELEGRAM_API_URL  # noqa: E402
+from parser.executor import parse_executor  # noqa: E402
+from utils import http_client  # noqa: E402
+
+
+def _percentile(values: list[float], p: float) -> float:
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def _latency(latencies: list[float]) -> str:
+    values = sorted(latencies)
+    return ", ".join(f"p{p} {_percentile(values, p) * 1000:.0f} мс" for p in PERCENTILES)
+
+
+async def _press(bot: Bot, telegram: FakeTelegram, user_id: int, number: int) -> float:
+    """Нажатие кнопки; возвращает время до ответа пользователю."""
+    update = Update.de_json(
+        {
+            "update_id": user_id * 1000 + number,
+            "callback_query": {
+                "id": f"{user_id}-{number}",
+                "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+                "chat_instance": str(user_id),
+                "data": "news_man_city",
+                "message": {"message_id": 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}},
+            },
+        },
+        bot,
+    )
+    start_at = time.perf_counter()
+    await button_news_man_city(update, SimpleNamespace(bot=bot))
+    replies = [received_at for chat_id, _, received_at in telegram.messages if chat_id == str(user_id)]
+    return (replies[-1] if replies else time.perf_counter()) - start_at
+
+
+async def _run(label: str, bot: Bot, telegram: FakeTelegram, images: Counter, feed_url: str, first_user: int) -> None:
+    """Прогон на ленте feed_url; images — счётчики запросов сервиса, отдающего картинки."""
+    sports_ru.SPORTS_RU_FOOTBALL_RSS = feed_url
+    photos_before = telegram.photos.copy()
+    images_before = images.copy()
+    messages_before = len(telegram.messages)
+    latencies: list[float] = []
+
+    async def user(user_id: int) -> None:
+        for number in range(args.presses):
+            latencies.append(await _press(bot, telegram, user_id, number))
+            await asyncio.sleep(args.think)
+
+    await asyncio.gather(*(user(user_id) for user_id in range(first_user, first_user + args.users)))
+    photos = telegram.photos - photos_before
+    downloads = images - images_before
+    messages = telegram.messages[messages_before:]
+    channel_posts = sum(1 for chat_id, _, _ in messages if chat_id == f"@{CHANNEL}")
+    print(f"{label}: {args.users} пользователей по {args.presses} нажатий, публикаций в канал {channel_posts}")
+    print(
+        f"  сообщений {len(messages)}; фото по file_id {photos['by_file_id']}, по ссылке {photos['by_url']}, "
+        f"загружено файлом {photos['uploaded']}"
+    )
+    print(
+        f"  картинки скачал Telegram {downloads['image_telegram']} раз, бот {downloads['image']} раз "
+        f"(без file_id Telegram скачивал бы картинку для каждого сообщения — {len(messages)} раз)"
+    )
+    print(f"  ответ по кнопке: {_latency(latencies)}")
+
+
+async def _main() -> None:
+    site = FakeNewsSite(0.02, hotlink_every=args.hotlink_every)
+    plain_site = FakeNewsSite(0.02, images=False)
+    pexels = FakePexels(0.1)
+    telegram = FakeTelegram(0.03)
+    runners = [
+        await start(site.app(), SITE_PORT),
+        await start(plain_site.app(), PLAIN_SITE_PORT),
+        await start(FakeGemini(0.2).app(), GEMINI_PORT),
+        await start(telegram.app(), TELEGRAM_PORT),
+        await start(pexels.app(), PEXELS_PORT),
+    ]
+    try:
+        async with Bot("123456:bench", base_url=TELEGRAM_API_URL) as bot:
+            await _run("картинки статей", bot, telegram, site.requests, f"http://127.0.0.1:{SITE_PORT}/media/rss/", 1)
+            await _run(
+                "картинки с Pexels",
+                bot,
+                telegram,
+                pexels.requests,
+                f"http://127.0.0.1:{PLAIN_SITE_PORT}/plain/rss/",
+                args.users + 1,
+            )
+            print(f"  запросов к Pexels {pexels.requests['search']} (по одному на новость, остальное — из кэша)")
+        print(f"bot/media.py: {media_pipeline.snapshot_stats()}")
+    finally:
+        await close_send_queue()
+        await http_client.close()
+        parse_executor.shutdown()
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
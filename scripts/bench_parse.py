@@ -0,0 +1,181 @@
+"""
+Задержка ответа по кнопке, пока разбирается большая пачка автопостинга, при разных исполнителях
+разбора (parser/executor.py): inline — разбор в цикле событий, thread — пул потоков, process — пул процессов.
+Для каждого исполнителя: нажатия кнопки «Получить новость» без нагрузки, затем те же нажатия,
+пока в фоне (с приоритетом автопостинга) загружаются и разбираются статьи и ленты пачки.
+Выводятся p50/p95/p99 ответа по кнопке, наибольшая задержка цикла событий, время пачки и сколько
+её статей и лент разобрано (при разборе в цикле событий загрузки упираются в таймауты соединения).
+Сервисы — локальные замены из scripts/fake_services.py; страницы дополнены до --page-kb килобайт,
+разбор — BeautifulSoup (ARTICLE_EXTRACTOR=bs4, можно переопределить в окружении).
+Каждый исполнитель запускается в отдельном процессе (PARSE_EXECUTOR читается из окружения при импорте).
+Запуск из корня проекта: python -m scripts.bench_parse [--articles 100] [--feeds 50] [--page-kb 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.fake_services import FakeGemini, FakeNewsSite, FakeTelegram, free_port, start  # noqa: E402
+
+EXECUTORS = ("inline", "thread", "process")
+# Пауза между нажатиями кнопки и период проверки задержки цикла событий, секунды
+PRESS_INTERVAL = 0.05
+LAG_TICK = 0.01
+IDLE_PRESSES = 30
+PERCENTILES = (50, 95, 99)
+
+arg_parser = argparse.ArgumentParser(description="Задержка кнопки при разборе пачки автопостинга")
+arg_parser.add_argument("--executor", choices=EXECUTORS, help="прогон одного исполнителя (внутренний режим)")
+arg_parser.add_argument("--articles", type=int, default=100, help="статей в пачке")
+arg_parser.add_argument("--feeds", type=int, default=50, help="лент в пачке")
+arg_parser.add_argument("--page-kb", type=int, default=200, help="размер страницы статьи, КБ")
+args = arg_parser.parse_args()
+
+
+def _percentile(values: list[float], p: float) -> float:
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def _summary(label: str, latencies: list[float]) -> str:
+    values = sorted(latencies)
+    cells = ", ".join(f"p{p} {_percentile(values, p) * 1000:.0f} мс" for p in PERCENTILES)
+    return f"  {label:<22} нажатий {len(values):>3}: {cells}"
+
+
+async def _run_executor() -> None:
+    site_port, gemini_port, telegram_port = free_port(), free_port(), free_port()
+    # Адреса сервисов задаются до импорта config
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{gemini_port}/v1beta"
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{telegram_port}/bot"
+    os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+    os.environ.setdefault("ARTICLE_EXTRACTOR", "bs4")
+    os.environ["CHANNEL_USERNAME"] = ""
+    os.environ["METRICS_PORT"] = "0"
+
+    from telegram import Bot, Update
+
+    import parser.sports_ru as sports_ru
+    from bot.handlers import button_news_man_city
+    from bot.send_queue import close_send_queue
+    from config import TELEGRAM_API_URL
+    from parser.article import get_article_cached
+    from parser.executor import background_parsing, parse_executor
+    from parser.rss import feed_cache
+    from utils import http_client
+
+    site = FakeNewsSite(0.01, padding_kb=args.page_kb)
+    runners = [
+        await start(site.app(), site_port),
+        await start(FakeGemini(0.2).app(), gemini_port),
+        await start(FakeTelegram(0.01).app(), telegram_port),
+    ]
+    base = f"http://127.0.0.1:{site_port}"
+    sports_ru.SPORTS_RU_FOOTBALL_RSS = f"{base}/button/rss/"
+    lags: list[float] = []
+
+    async def watch_loop() -> None:
+        """Насколько позже положенного просыпается цикл событий."""
+        while True:
+            start_at = time.perf_counter()
+            await asyncio.sleep(LAG_TICK)
+            lags.append(time.perf_counter() - start_at - LAG_TICK)
+
+    async def press(bot: Bot, user_id: int) -> float:
+        update = Update.de_json(
+            {
+                "update_id": user_id,
+                "callback_query": {
+                    "id": str(user_id),
+                    "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+                    "chat_instance": str(user_id),
+                    "data": "news_man_city",
+                    "message": {"message_id": 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}},
+                },
+            },
+            bot,
+        )
+        start_at = time.perf_counter()
+        await button_news_man_city(update, SimpleNamespace(bot=bot))
+        return time.perf_counter() - start_at
+
+    async def batch() -> tuple[float, int, int]:
+        """Пачка автопостинга: статьи и ленты с фоновым приоритетом разбора; (время, статей, лент разобрано)."""
+        articles = [f"{base}/batch-{k // 20}/news/{1114852345 - (k % 20) * 913}.html" for k in range(args.articles)]
+        feeds = [f"{base}/feed-{k}/rss/" for k in range(args.feeds)]
+        start_at = time.perf_counter()
+        with background_parsing():
+            results = await asyncio.gather(
+                *(get_article_cached(url) for url in articles),
+                *(feed_cache.get(url) for url in feeds),
+            )
+        parsed_articles = sum(1 for full_text, _ in results[:len(articles)] if full_text)
+        parsed_feeds = sum(1 for items in results[len(articles):] if items)
+        return time.perf_counter() - start_at, parsed_articles, parsed_feeds
+
+    watcher = asyncio.create_task(watch_loop())
+    user_ids = iter(range(1, 1_000_000))
+    try:
+        async with Bot("123456:bench", base_url=TELEGRAM_API_URL) as bot:
+            # Прогрев: лента, статья и обобщение для кнопки уже в кэшах, пул разбора запущен
+            await press(bot, next(user_ids))
+            lags.clear()
+            idle = []
+            for _ in range(IDLE_PRESSES):
+                idle.append(await press(bot, next(user_ids)))
+                await asyncio.sleep(PRESS_INTERVAL)
+            idle_lag = max(lags, default=0.0)
+
+            lags.clear()
+            batch_task = asyncio.create_task(batch())
+            loaded = []
+            while not batch_task.done():
+                loaded.append(await press(bot, next(user_ids)))
+                await asyncio.sleep(PRESS_INTERVAL)
+            batch_time, parsed_articles, parsed_feeds = await batch_task
+            load_lag = max(lags, default=0.0)
+    finally:
+        watcher.cancel()
+        await close_send_queue()
+        await http_client.close()
+        parse_executor.shutdown()
+        for runner in runners:
+            await runner.cleanup()
+
+    print(f"{args.executor}: {parse_executor.workers} воркеров, очередь {parse_executor.max_pending}")
+    print(_summary("без нагрузки", idle) + f", задержка цикла до {idle_lag * 1000:.0f} мс")
+    print(_summary("во время пачки", loaded) + f", задержка цикла до {load_lag * 1000:.0f} мс")
+    print(
+        f"  пачка за {batch_time:.2f} с: разобрано статей {parsed_articles}/{args.articles}, "
+        f"лент {parsed_feeds}/{args.feeds}, статистика {parse_executor.snapshot_stats()}"
+    )
+
+
+def main() -> None:
+    if args.executor:
+        os.environ["PARSE_EXECUTOR"] = args.executor
+        logging.basicConfig(level=logging.ERROR)
+        asyncio.run(_run_executor())
+        return
+    for executor in EXECUTORS:
+        subprocess.run(
+            [sys.executable, "-m", "scripts.bench_parse", "--executor", executor, *sys.argv[1:]],
+            cwd=project_root,
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Задержка ответа по кнопке без предзагрузки и с ней (bot/prefetch.py).
+Пользователи нажимают «Получить новость» по --presses раз с паузой --think секунд (читают новость),
+затем уходят; прогон длится ещё --idle секунд, чтобы было видно, тратят ли ушедшие квоту Gemini.
+Выводятся p50/p95/p99 ответа по кнопке, первое нажатие отдельно (ему нечего было готовить),
+сколько запросов получил Gemini и статистика предзагрузки.
+Сервисы — локальные замены из scripts/fake_services.py. Каждый режим запускается в отдельном процессе
+(настройки предзагрузки читаются из окружения при импорте).
+Запуск из корня проекта: python -m scripts.bench_prefetch [--users 8] [--presses 5] [--think 2]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.fake_services import FakeGemini, FakeNewsSite, FakeTelegram, free_port, start  # noqa: E402
+
+# Режим → бюджет предзагрузки в минуту (0 — выключена)
+MODES = {"без предзагрузки": "0", "с предзагрузкой": "120"}
+PERCENTILES = (50, 95, 99)
+
+arg_parser = argparse.ArgumentParser(description="Задержка кнопки без предзагрузки и с ней")
+arg_parser.add_argument("--mode", choices=list(MODES), help="прогон одного режима (внутренний режим)")
+arg_parser.add_argument("--users", type=int, default=8, help="одновременных пользователей")
+arg_parser.add_argument("--presses", type=int, default=5, help="нажатий на пользователя")
+arg_parser.add_argument("--think", type=float, default=2.0, help="пауза между нажатиями, с")
+arg_parser.add_argument("--idle", type=float, default=5.0, help="сколько ждать после ухода пользователей, с")
+arg_parser.add_argument("--gemini-latency", type=float, default=1.5, help="задержка Gemini, с")
+args = arg_parser.parse_args()
+
+
+def _percentile(values: list[float], p: float) -> float:
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def _summary(label: str, latencies: list[float]) -> str:
+    values = sorted(latencies)
+    cells = ", ".join(f"p{p} {_percentile(values, p) * 1000:.0f} мс" for p in PERCENTILES)
+    return f"  {label:<22} нажатий {len(values):>3}: {cells}"
+
+
+async def _run_mode() -> None:
+    site_port, gemini_port, telegram_port = free_port(), free_port(), free_port()
+    # Адреса сервисов и настройки задаются до импорта config
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{gemini_port}/v1beta"
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{telegram_port}/bot"
+    os.environ.setdefault("GEMINI_API_KEY", "bench-key")
+    os.environ.setdefault("GEMINI_RPM", "1000000")
+    os.environ["PREFETCH_PER_MINUTE"] = MODES[args.mode]
+    # Перепроверка ленты чаще обычного, чтобы за прогон было видно, что ушедшие не тратят квоту
+    os.environ.setdefault("PREFETCH_INTERVAL", "1")
+    os.environ["CHANNEL_USERNAME"] = ""
+    os.environ["METRICS_PORT"] = "0"
+
+    from telegram import Bot, Update
+
+    import parser.sports_ru as sports_ru
+    from bot.handlers import button_news_man_city
+    from bot.prefetch import news_prefetcher
+    from bot.send_queue import close_send_queue
+    from config import TELEGRAM_API_URL
+    from parser.executor import parse_executor
+    from utils import http_client
+
+    gemini = FakeGemini(args.gemini_latency)
+    runners = [
+        await start(FakeNewsSite(0.05).app(), site_port),
+        await start(gemini.app(), gemini_port),
+        await start(FakeTelegram(0.03).app(), telegram_port),
+    ]
+    sports_ru.SPORTS_RU_FOOTBALL_RSS = f"http://127.0.0.1:{site_port}/prefetch/rss/"
+    first: list[float] = []
+    later: list[float] = []
+
+    async def press(bot: Bot, user_id: int, number: int) -> float:
+        update = Update.de_json(
+            {
+                "update_id": user_id * 1000 + number,
+                "callback_query": {
+                    "id": f"{user_id}-{number}",
+                    "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+                    "chat_instance": str(user_id),
+                    "data": "news_man_city",
+                    "message": {"message_id": 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}},
+                },
+            },
+            bot,
+        )
+        start_at = time.perf_counter()
+        await button_news_man_city(update, SimpleNamespace(bot=bot))
+        return time.perf_counter() - start_at
+
+    async def user(bot: Bot, user_id: int) -> None:
+        for number in range(args.presses):
+            (later if number else first).append(await press(bot, user_id, number))
+            await asyncio.sleep(args.think)
+
+    try:
+        async with Bot("123456:bench", base_url=TELEGRAM_API_URL) as bot:
+            news_prefetcher.start()
+            await asyncio.gather(*(user(bot, user_id) for user_id in range(1, args.users + 1)))
+            requests_active = gemini.requests
+            await asyncio.sleep(args.idle)
+    finally:
+        await news_prefetcher.close()
+        await close_send_queue()
+        await http_client.close()
+        parse_executor.shutdown()
+        for runner in runners:
+            await runner.cleanup()
+
+    print(f"{args.mode}: {args.users} пользователей по {args.presses} нажатий, пауза {args.think} с")
+    print(_summary("первое нажатие", first))
+    print(_summary("следующие нажатия", later))
+    print(
+        f"  запросов к Gemini: {requests_active} за время нажатий, "
+        f"{gemini.requests - requests_active} после ухода пользователей"
+    )
+    print(f"  предзагрузка: {news_prefetcher.snapshot_stats()}")
+
+
+def main() -> None:
+    if args.mode:
+        logging.basicConfig(level=logging.ERROR)
+        asyncio.run(_run_mode())
+        return
+    for mode in MODES:
+        subprocess.run(
+            [sys.executable, "-m", "scripts.bench_prefetch", "--mode", mode, *sys.argv[1:]],
+            cwd=project_root,
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
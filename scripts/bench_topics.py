@@ -0,0 +1,77 @@
+"""
+Сравнение определения тем новостей: по одной проверке подстрок на тему (как раньше)
+и один проход скомпилированного классификатора (parser/topics.py).
+Запуск из корня проекта: python -m scripts.bench_topics [число новостей]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from parser.base import NewsItem
+from parser.topics import CATEGORY_KEYWORDS, TEAM_KEYWORDS, classifier
+
+DEFAULT_ITEMS = 5000
+
+TITLES = (
+    "Холанд забил два гола, Гвардиола доволен игрой Манчестер Сити",
+    "Голосование: лучший игрок тура в РПЛ",
+    "КХЛ: «Ак Барс» забросил три шайбы в третьем периоде",
+    "Головин пропустит матч сборной из-за травмы",
+    "Теннисистка вышла в полуфинал Уимблдона",
+    "НБА: «Лейкерс» обыграли «Бостон» в овертайме",
+    "Волейбольный клуб сменил главного тренера",
+    "Голландский журналист рассказал о трансфере полузащитника",
+    "Биатлон: гонка преследования перенесена из-за погоды",
+    "Де Брюйне вернулся к тренировкам",
+)
+SUMMARY = (
+    "Подробности — в материале. Команда провела собрание, главный тренер ответил на вопросы журналистов. "
+    "Матч пройдёт в субботу, начало в 19:00 по московскому времени. "
+)
+
+
+def _substring_topics(item: NewsItem) -> set[str]:
+    """Старый способ: для каждой темы отдельная проверка подстрок в заголовке и в описании."""
+    found = set()
+    for topics in (CATEGORY_KEYWORDS, TEAM_KEYWORDS):
+        for topic, keywords in topics.items():
+            keywords = [k.rstrip("*") for k in keywords]
+            for text in (item.title, item.summary):
+                lower = text.lower()
+                if any(k in lower for k in keywords):
+                    found.add(topic)
+                    break
+    return found
+
+
+def _timed(fn, items: list[NewsItem]) -> tuple[list[set[str]], float]:
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return results, (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITEMS
+    rnd = random.Random(1)
+    items = [NewsItem(rnd.choice(TITLES), f"https://example.com/{i}", SUMMARY * rnd.randint(1, 4)) for i in range(n)]
+
+    old, old_ms = _timed(_substring_topics, items)
+    new, new_ms = _timed(lambda item: (classifier.tag(item).categories | item.teams), items)
+    print(f"{n} новостей, тем: {len(CATEGORY_KEYWORDS) + len(TEAM_KEYWORDS)}")
+    print(f"  подстроки по темам: {old_ms:8.1f} мс")
+    print(f"  один проход:        {new_ms:8.1f} мс")
+
+    shown = set()
+    for item, before, after in zip(items, old, new):
+        if before != after and item.title not in shown:
+            shown.add(item.title)
+            print(f"  «{item.title}»: было {sorted(before)}, стало {sorted(after)}")
+
+
+if __name__ == "__main__":
+    main()
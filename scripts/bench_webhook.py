@@ -0,0 +1,203 @@
+"""
+Задержка «обновление → ответ» в режимах long polling и webhook (bot/webhook.py) на локальной замене
+Telegram Bot API (scripts/fake_services.py). Обработчик — /start (cmd_start): ответ без обращения
+к сайтам и Gemini, так что измеряется доставка обновления и отправка ответа.
+polling — обновление ставится в очередь getUpdates замены, бот забирает его long polling;
+webhook — «Telegram» присылает обновление POST-запросом на сервер webhook бота.
+У каждого запроса к замене и у доставки webhook — задержка --latency (сеть до Telegram).
+Сценарии: обновления по одному (следующее после ответа на предыдущее) и поток с постоянной частотой
+(--rate в секунду): при polling обновление, пришедшее, пока ответ getUpdates в пути, ждёт следующего опроса.
+Webhook доставляет не больше WEBHOOK_MAX_CONNECTIONS обновлений одновременно, как Telegram.
+Одновременные сотни ответов на одном процессоре упираются в процессор, а не в способ приёма, — поэтому
+частота потока выбрана ниже пропускной способности.
+Запуск из корня проекта: python -m scripts.bench_webhook [--single 20] [--stream 300] [--rate 50] [--latency 0.1]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.fake_services import FakeTelegram, free_port, start  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+WEBHOOK_PATH = "/telegram/webhook"
+SECRET = "bench-secret"
+# Сколько ждать ответов на пачку, секунды
+REPLY_TIMEOUT = 60
+
+arg_parser = argparse.ArgumentParser(description="Задержка ответа: long polling и webhook")
+arg_parser.add_argument("--single", type=int, default=20, help="обновлений по одному")
+arg_parser.add_argument("--stream", type=int, default=300, help="обновлений в потоке")
+arg_parser.add_argument("--rate", type=float, default=50, help="обновлений в секунду в потоке")
+arg_parser.add_argument("--latency", type=float, default=0.1, help="задержка сети до Telegram, с")
+args = arg_parser.parse_args()
+
+TELEGRAM_PORT = free_port()
+# Адрес Bot API задаётся до импорта config
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{TELEGRAM_PORT}/bot"
+os.environ["METRICS_PORT"] = "0"
+
+import aiohttp  # noqa: E402
+from telegram.ext import Application, CommandHandler  # noqa: E402
+
+from bot.handlers import cmd_start  # noqa: E402
+from bot.webhook import SECRET_HEADER, start_webhook_server  # noqa: E402
+from config import CONCURRENT_UPDATES, TELEGRAM_API_URL, WEBHOOK_MAX_CONNECTIONS  # noqa: E402
+
+
+def _percentile(values: list[float], p: float) -> float:
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def _summary(label: str, latencies: list[float]) -> str:
+    values = sorted(latencies)
+    cells = ", ".join(f"p{p} {_percentile(values, p) * 1000:.0f} мс" for p in PERCENTILES)
+    return f"  {label:<12} обновлений {len(values):>4}: {cells}"
+
+
+def _start_update(chat_id: int) -> dict:
+    return {
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        }
+    }
+
+
+class Mode:
+    """Режим приёма обновлений: запуск приложения, доставка обновления, остановка."""
+
+    def __init__(self, name: str, telegram: FakeTelegram):
+        self.name = name
+        self.telegram = telegram
+        self.app = (
+            Application.builder()
+            .token("123456:bench")
+            .base_url(TELEGRAM_API_URL)
+            .concurrent_updates(CONCURRENT_UPDATES)
+            .build()
+        )
+        self.app.add_handler(CommandHandler("start", cmd_start))
+        self._runner = None
+        self._session: aiohttp.ClientSession | None = None
+        self._url = ""
+
+    async def start(self) -> None:
+        await self.app.initialize()
+        if self.name == "polling":
+            await self.app.updater.start_polling(poll_interval=0, timeout=10, allowed_updates=["message"])
+        else:
+            port = free_port()
+            self._runner = await start_webhook_server(self.app, "127.0.0.1", port, WEBHOOK_PATH, SECRET)
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=WEBHOOK_MAX_CONNECTIONS))
+            self._url = f"http://127.0.0.1:{port}{WEBHOOK_PATH}"
+        await self.app.start()
+
+    async def deliver(self, update: dict) -> None:
+        if self.name == "polling":
+            self.telegram.push_update(update)
+            return
+        # Доставка от Telegram до сервера webhook — через ту же сеть
+        await asyncio.sleep(args.latency)
+        async with self._session.post(self._url, json={**update, "update_id": 1}, headers={SECRET_HEADER: SECRET}) as resp:
+            resp.raise_for_status()
+
+    async def rejects_without_secret(self) -> bool:
+        async with self._session.post(self._url, json={**_start_update(1), "update_id": 1}) as resp:
+            return resp.status == 403
+
+    async def stop(self) -> None:
+        if self.name == "polling":
+            await self.app.updater.stop()
+        await self.app.stop()
+        if self._runner is not None:
+            await self._runner.cleanup()
+        if self._session is not None:
+            await self._session.close()
+        await self.app.shutdown()
+
+
+async def _replies(telegram: FakeTelegram, sent_at: dict[str, float]) -> list[float]:
+    """Ждёт ответы во все чаты sent_at; возвращает задержки от отправки обновления до ответа."""
+    deadline = time.perf_counter() + REPLY_TIMEOUT
+    latencies: dict[str, float] = {}
+    seen = 0
+    while len(latencies) < len(sent_at) and time.perf_counter() < deadline:
+        for chat_id, _, received_at in telegram.messages[seen:]:
+            if chat_id in sent_at and chat_id not in latencies:
+                latencies[chat_id] = received_at - sent_at[chat_id]
+        seen = len(telegram.messages)
+        await asyncio.sleep(0.001)
+    return list(latencies.values())
+
+
+async def _bench(mode: Mode, first_chat: int) -> None:
+    telegram = mode.telegram
+    await mode.start()
+    try:
+        chat_ids = iter(range(first_chat, first_chat + args.single + args.stream + 1))
+        # Прогрев: первое обновление проходит через запуск обработчиков
+        chat = next(chat_ids)
+        await mode.deliver(_start_update(chat))
+        await _replies(telegram, {str(chat): time.perf_counter()})
+
+        single = []
+        for _ in range(args.single):
+            chat = next(chat_ids)
+            sent_at = {str(chat): time.perf_counter()}
+            await mode.deliver(_start_update(chat))
+            single.extend(await _replies(telegram, sent_at))
+
+        sent_at = {}
+        deliveries = []
+        start_at = time.perf_counter()
+        for i in range(args.stream):
+            chat = next(chat_ids)
+            # Обновление «появляется» в свой момент потока, даже если предыдущее ещё доставляется
+            await asyncio.sleep(max(0.0, start_at + i / args.rate - time.perf_counter()))
+            sent_at[str(chat)] = time.perf_counter()
+            deliveries.append(asyncio.create_task(mode.deliver(_start_update(chat))))
+        await asyncio.gather(*deliveries)
+        stream = await _replies(telegram, sent_at)
+
+        print(f"{mode.name}:")
+        print(_summary("по одному", single))
+        print(_summary(f"поток {args.rate:g}/с", stream))
+        if mode.name == "webhook":
+            print(f"  запрос без секрета отклонён: {'да' if await mode.rejects_without_secret() else 'НЕТ'}")
+    finally:
+        await mode.stop()
+
+
+async def _main() -> None:
+    telegram = FakeTelegram(args.latency)
+    runner = await start(telegram.app(), TELEGRAM_PORT)
+    try:
+        await _bench(Mode("polling", telegram), 1_000_000)
+        await _bench(Mode("webhook", telegram), 2_000_000)
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
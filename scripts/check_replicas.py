@@ -0,0 +1,178 @@
+"""
+Проверка работы нескольких экземпляров бота на общем состоянии (utils/state.py).
+Два процесса-«экземпляра» обрабатывают нажатия «Получить новость» одних и тех же пользователей
+вперемешку и одновременно (как за балансировщиком webhook) и публикуют новости в общий канал.
+Затем по сообщениям, которые получил Telegram, проверяется: ни один пользователь не получил
+одну новость дважды и ни одна новость не опубликована в канал дважды.
+Прогон идёт дважды: STATE_BACKEND=memory (у каждого экземпляра своя память — дубли ожидаемы,
+прогон показывает, зачем нужно общее состояние) и STATE_BACKEND=redis (дублей быть не должно).
+Redis — локальная замена из scripts/fake_services.py или настоящий сервер (--redis; его ключи
+с префиксом check-replicas: будут записаны в указанную БД).
+Сервисы сайта, Gemini и Telegram — локальные замены; БД не нужна.
+Запуск из корня проекта: python -m scripts.check_replicas [--users 6] [--presses 8] [--redis redis://localhost:6379/15]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.fake_services import FakeGemini, FakeNewsSite, FakeRedis, FakeTelegram, free_port, start  # noqa: E402
+
+REPLICAS = 2
+CHANNEL = "replicas_channel"
+LINK = re.compile(r'<a href="([^"]+)"')
+
+arg_parser = argparse.ArgumentParser(description="Два экземпляра бота на общем состоянии: нет ли дублей")
+arg_parser.add_argument("--worker", type=int, help="номер экземпляра (внутренний режим)")
+arg_parser.add_argument("--users", type=int, default=6, help="пользователей")
+arg_parser.add_argument("--presses", type=int, default=8, help="нажатий каждого пользователя на каждом экземпляре")
+arg_parser.add_argument("--redis", help="URL настоящего Redis вместо локальной замены")
+args = arg_parser.parse_args()
+
+
+async def _run_worker() -> None:
+    """Один экземпляр: нажатия всех пользователей с небольшими случайными паузами."""
+    from telegram import Bot, Update
+
+    import parser.sports_ru as sports_ru
+    from bot.handlers import button_news_man_city
+    from bot.send_queue import close_send_queue
+    from config import TELEGRAM_API_URL
+    from parser.executor import parse_executor
+    from utils import http_client
+    from utils.state import state_backend
+
+    sports_ru.SPORTS_RU_FOOTBALL_RSS = os.environ["CHECK_FEED_URL"]
+    rng = random.Random(args.worker)
+
+    async def press(bot: Bot, user_id: int, number: int) -> None:
+        update = Update.de_json(
+            {
+                "update_id": (args.worker * 1000 + user_id) * 1000 + number,
+                "callback_query": {
+                    "id": f"{args.worker}-{user_id}-{number}",
+                    "from": {"id": user_id, "is_bot": False, "first_name": "Check"},
+                    "chat_instance": str(user_id),
+                    "data": "news_man_city",
+                    "message": {"message_id": 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}},
+                },
+            },
+            bot,
+        )
+        await button_news_man_city(update, SimpleNamespace(bot=bot))
+
+    async def user(bot: Bot, user_id: int) -> None:
+        for number in range(args.presses):
+            await asyncio.sleep(rng.uniform(0, 0.05))
+            await press(bot, user_id, number)
+
+    try:
+        async with Bot("123456:check", base_url=TELEGRAM_API_URL) as bot:
+            await asyncio.gather(*(user(bot, user_id) for user_id in range(1, args.users + 1)))
+    finally:
+        await close_send_queue()
+        await http_client.close()
+        await state_backend.close()
+        parse_executor.shutdown()
+
+
+def _duplicates(messages: list[tuple[str, str, float]]) -> tuple[int, int]:
+    """Сколько новостей пришло пользователям повторно и сколько опубликовано в канал повторно."""
+    counts = Counter()
+    for chat_id, text, _ in messages:
+        link = LINK.search(text)
+        if link:
+            counts[(chat_id, link.group(1))] += 1
+    channel = sum(n - 1 for (chat_id, _), n in counts.items() if chat_id == f"@{CHANNEL}")
+    private = sum(n - 1 for (chat_id, _), n in counts.items() if chat_id != f"@{CHANNEL}")
+    return private, channel
+
+
+async def _run_check(backend: str, redis_url: str, run: int) -> tuple[int, int, int]:
+    """Оба экземпляра на одном бэкенде состояния; возвращает (сообщений, дублей у пользователей, дублей в канале)."""
+    site_port, gemini_port, telegram_port = free_port(), free_port(), free_port()
+    telegram = FakeTelegram(0.01)
+    runners = [
+        await start(FakeNewsSite(0.01).app(), site_port),
+        await start(FakeGemini(0.05).app(), gemini_port),
+        await start(telegram.app(), telegram_port),
+    ]
+    env = {
+        **os.environ,
+        "STATE_BACKEND": backend,
+        "REDIS_URL": redis_url,
+        # У каждого прогона свои ключи: повторный запуск на настоящем Redis начинает с чистого состояния
+        "STATE_KEY_PREFIX": f"check-replicas:{time.time_ns()}:{run}:",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{gemini_port}/v1beta",
+        "GEMINI_API_KEY": "check-key",
+        "GEMINI_RPM": "1000000",
+        "TELEGRAM_API_URL": f"http://127.0.0.1:{telegram_port}/bot",
+        "TELEGRAM_GLOBAL_RATE": "100000",
+        "CHANNEL_USERNAME": CHANNEL,
+        "PREFETCH_PER_MINUTE": "0",
+        "METRICS_PORT": "0",
+        "CHECK_FEED_URL": f"http://127.0.0.1:{site_port}/replicas-{run}/rss/",
+    }
+    try:
+        workers = [
+            await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "scripts.check_replicas", "--worker", str(k), *sys.argv[1:], cwd=project_root, env=env
+            )
+            for k in range(REPLICAS)
+        ]
+        codes = await asyncio.gather(*(worker.wait() for worker in workers))
+        if any(codes):
+            raise RuntimeError(f"экземпляр завершился с ошибкой: коды {codes}")
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+    private, channel = _duplicates(telegram.messages)
+    return len(telegram.messages), private, channel
+
+
+async def _main() -> int:
+    fake_redis = None
+    redis_url = args.redis
+    if not redis_url:
+        port = free_port()
+        fake_redis = FakeRedis()
+        await fake_redis.start(port)
+        redis_url = f"redis://127.0.0.1:{port}/0"
+    failed = False
+    try:
+        for run, backend in enumerate(("memory", "redis")):
+            sent, private, channel = await _run_check(backend, redis_url, run)
+            print(
+                f"{backend:<7} {REPLICAS} экземпляра, {args.users} пользователей по {args.presses} нажатий на каждом: "
+                f"сообщений {sent}, повторов у пользователей {private}, повторов в канале {channel}"
+            )
+            if backend == "redis" and (private or channel):
+                failed = True
+    finally:
+        if fake_redis is not None:
+            await fake_redis.close()
+    print("ОШИБКА: на общем состоянии есть дубли" if failed else "Общее состояние: дублей нет")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.ERROR)
+    if args.worker is not None:
+        asyncio.run(_run_worker())
+        return
+    sys.exit(asyncio.run(_main()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+Локальные замены внешних сервисов для нагрузочных прогонов (scripts/bench_*.py):
+новостной сайт (RSS, страницы статей из scripts/fixtures и картинки), Gemini API, Telegram Bot API,
+поиск фото Pexels и Redis (подмножество команд, которым пользуется utils/state.py).
+У каждого сервиса настраивается задержка ответа; сервисы считают запросы.
+Модуль не импортирует config — адреса сервисов задаются в окружении до импорта кода бота.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import socket
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+from string import Template
+
+import aiohttp
+from aiohttp import web
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+MODEL = "gemini-2.0-flash"
+# Статьи с чётным номером — длинные (обобщаются отдельно), с нечётным — короткие (упаковываются)
+LONG_ARTICLE_PARAGRAPHS = 8
+SHORT_ARTICLE_PARAGRAPHS = 1
+
+LISTEN_BACKLOG = 1024
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+# User-Agent, с которым Telegram скачивает картинки по ссылке
+TELEGRAM_USER_AGENT = "TelegramBot (like TwitterBot)"
+# Размер картинки-заглушки, байты
+IMAGE_BYTES = 64 * 1024
+
+
+def _image(name: str) -> bytes:
+    """Картинка-заглушка: JPEG-заголовок и псевдослучайное содержимое, своё для каждого имени."""
+    seed = hashlib.sha256(name.encode("utf-8")).digest()
+    return b"\xff\xd8\xff\xe0" + seed * (IMAGE_BYTES // len(seed))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start(app: web.Application, port: int) -> web.AppRunner:
+    """Запускает приложение на 127.0.0.1:port; остановка — runner.cleanup()."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    # Очередь подключений больше стандартной (128): при сотнях одновременных новых соединений
+    # лишние не теряются и не ждут повтора SYN — настоящие сервисы так не тормозят
+    await web.TCPSite(runner, "127.0.0.1", port, backlog=LISTEN_BACKLOG).start()
+    return runner
+
+
+def _first_line(text: str) -> str:
+    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+    return lines[0][:200] if lines else ""
+
+
+def _padding(kb: int) -> str:
+    """Ссылки «популярное» общим размером около kb килобайт."""
+    items = []
+    size = 0
+    while size < kb * 1024:
+        i = len(items)
+        item = f'<li class="popular__item"><a href="/football/news/{i}.html">Материал дня №{i}</a> <span class="comments">{i % 97}</span></li>'
+        items.append(item)
+        size += len(item.encode("utf-8"))
+    return "\n".join(items)
+
+
+class FakeNewsSite:
+    """
+    Новостной сайт: GET /{site}/rss/ — записанная лента, GET /{site}/news/{id}.html — страница статьи,
+    GET /{site}/images/{id}.jpg — её картинка (og:image и enclosure в ленте).
+    site — произвольный префикс пути (например, cycle-100/source-3): у каждого префикса свои URL новостей,
+    так что новый префикс — «холодная» лента без кэшей.
+    padding_kb — сколько килобайт ссылок добавить в боковую колонку страницы: настоящие страницы
+    в сотни килобайт, и их разбор заметно дороже разбора самой статьи.
+    images=False — у новостей нет картинок; hotlink_every — картинка каждой такой новости (по номеру)
+    не отдаётся Telegram (защита от хотлинков: 403 на его User-Agent). requests["image"] — скачивания
+    картинок ботом, requests["image_telegram"] — Telegram.
+    """
+
+    def __init__(self, latency: float, padding_kb: int = 0, images: bool = True, hotlink_every: int = 0):
+        self.latency = latency
+        self.images = images
+        self.hotlink_every = hotlink_every
+        self._padding = _padding(padding_kb)
+        self.requests = Counter()
+        feed = (FIXTURES / "rss_football.xml").read_text(encoding="utf-8")
+        if not images:
+            feed = re.sub(r"<enclosure [^>]*/>\n", "", feed)
+        self._feed = Template(feed)
+        self._page = Template((FIXTURES / "article.html").read_text(encoding="utf-8"))
+        self._paragraphs = (FIXTURES / "article_paragraphs.txt").read_text(encoding="utf-8").split("\n")
+        self._stories = {}
+        for item in ET.fromstring(self._feed.substitute(site="").encode("utf-8")).iter("item"):
+            news_id = re.search(r"(\d+)\.html", item.findtext("link")).group(1)
+            self._stories[news_id] = (item.findtext("title"), item.findtext("description"), item.findtext("pubDate"))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/{site:.+}/rss/", self.feed)
+        app.router.add_get(r"/{site:.+}/news/{news_id:\d+}.html", self.article)
+        app.router.add_get(r"/{site:.+}/images/{news_id:\d+}.jpg", self.image)
+        return app
+
+    async def feed(self, request: web.Request) -> web.Response:
+        self.requests["rss"] += 1
+        await asyncio.sleep(self.latency)
+        body = self._feed.substitute(site=f"http://{request.host}/{request.match_info['site']}")
+        return web.Response(body=body.encode("utf-8"), content_type="application/rss+xml", charset="utf-8")
+
+    async def article(self, request: web.Request) -> web.Response:
+        self.requests["article"] += 1
+        await asyncio.sleep(self.latency)
+        news_id = request.match_info["news_id"]
+        story = self._stories.get(news_id)
+        if story is None:
+            raise web.HTTPNotFound()
+        title, lead, published = story
+        count = LONG_ARTICLE_PARAGRAPHS if int(news_id) % 2 == 0 else SHORT_ARTICLE_PARAGRAPHS
+        paragraphs = [lead] + [self._paragraphs[i % len(self._paragraphs)] for i in range(count)]
+        page = self._page.substitute(
+            title=title,
+            published=published,
+            image=f"http://{request.host}/{request.match_info['site']}/images/{news_id}.jpg" if self.images else "",
+            body="\n".join(f"<p>{p}</p>" for p in paragraphs),
+            padding=self._padding,
+        )
+        if not self.images:
+            page = re.sub(r"<img [^>]*>", "", page)
+        return web.Response(text=page, content_type="text/html", charset="utf-8")
+
+    async def image(self, request: web.Request) -> web.Response:
+        news_id = request.match_info["news_id"]
+        from_telegram = request.headers.get("User-Agent", "").startswith("TelegramBot")
+        self.requests["image_telegram" if from_telegram else "image"] += 1
+        await asyncio.sleep(self.latency)
+        if not self.images:
+            raise web.HTTPNotFound()
+        if from_telegram and self.hotlink_every and int(news_id) % self.hotlink_every == 0:
+            raise web.HTTPForbidden()
+        return web.Response(body=_image(request.path), content_type="image/jpeg")
+
+
+class FakeGemini:
+    """
+    Gemini API: GET /v1beta/models и POST /v1beta/models/{model}:generateContent.
+    Обобщение — первая строка статьи с префиксом; упакованный запрос получает JSON-массив {id, summary}.
+    error_every — каждый такой запрос отвечает 500, drop_every — каждый такой упакованный ответ
+    теряет первую запись (0 — без сбоев).
+    """
+
+    def __init__(self, latency: float, error_every: int = 0, drop_every: int = 0):
+        self.latency = latency
+        self.error_every = error_every
+        self.drop_every = drop_every
+        self.requests = 0
+        self.packed = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1beta/models", self.models)
+        app.router.add_post("/v1beta/models/{name}", self.generate)
+        return app
+
+    async def models(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": f"models/{MODEL}"}]})
+
+    async def generate(self, request: web.Request) -> web.Response:
+        # Номера запоминаются при получении: одновременные запросы не должны видеть чужой счётчик
+        self.requests += 1
+        number = self.requests
+        body = await request.json()
+        prompt = body["contents"][0]["parts"][0]["text"]
+        packed = "responseSchema" in body["generationConfig"]
+        if packed:
+            self.packed += 1
+        packed_number = self.packed
+        await asyncio.sleep(self.latency)
+        if self.error_every and number % self.error_every == 0:
+            return web.json_response({"error": "internal"}, status=500)
+        if packed:
+            parts = re.split(r"^\[(\d+)\]$", prompt, flags=re.M)
+            entries = [
+                {"id": int(idx), "summary": f"Обобщение: {_first_line(text)}"}
+                for idx, text in zip(parts[1::2], parts[2::2])
+            ]
+            if self.drop_every and packed_number % self.drop_every == 0:
+                entries = entries[1:]  # неполный ответ — недостающие статьи должны уйти по одной
+            text = json.dumps(entries, ensure_ascii=False)
+        else:
+            article = re.search(r"^---$(.*?)^---$", prompt, re.S | re.M)
+            text = f"Обобщение: {_first_line(article.group(1) if article else prompt)}"
+        return web.json_response({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+
+class FakeTelegram:
+    """
+    Telegram Bot API: POST /bot{token}/{method}; sendMessage и sendPhoto возвращают сообщение, прочие методы — true.
+    messages — отправленные сообщения (chat_id, текст, time.perf_counter() получения) по порядку.
+    push_update() ставит обновление в очередь getUpdates (long polling: запрос ждёт до timeout секунд).
+    sendPhoto по ссылке скачивает картинку (ошибка скачивания — 400, как у Telegram), файл принимает
+    загрузкой, ранее выданный file_id — без скачивания; photos считает отправки по этим трём способам.
+    Отправка в чат из missing_chats отвечает 400 «chat not found».
+    """
+
+    # Сколько обновлений отдаёт один getUpdates (как у Bot API)
+    UPDATES_LIMIT = 100
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = Counter()
+        self.photos = Counter()
+        self.messages: list[tuple[str, str, float]] = []
+        self.missing_chats: set[str] = set()
+        self._file_ids: set[str] = set()
+        self._message_id = 0
+        self._updates: list[dict] = []
+        self._update_id = 0
+        self._new_updates: asyncio.Event | None = None
+
+    def push_update(self, update: dict) -> int:
+        """Ставит обновление в очередь getUpdates; возвращает его update_id."""
+        self._update_id += 1
+        self._updates.append({**update, "update_id": self._update_id})
+        if self._new_updates is not None:
+            self._new_updates.set()
+        return self._update_id
+
+    async def _get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset") or 0)
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates:
+            self._new_updates = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[: self.UPDATES_LIMIT]
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.call)
+        return app
+
+    @staticmethod
+    def _chat(chat_id: str) -> dict:
+        if chat_id.startswith("@"):
+            return {"id": -1001, "type": "channel", "username": chat_id[1:]}
+        value = int(chat_id)
+        return {"id": value, "type": "private" if value > 0 else "channel"}
+
+    async def _photo(self, photo) -> str:
+        """file_id для параметра photo; ошибка — ValueError с описанием, как у Bot API."""
+        if isinstance(photo, web.FileField):
+            self.photos["uploaded"] += 1
+            content = photo.file.read()
+        elif str(photo).startswith(("http://", "https://")):
+            self.photos["by_url"] += 1
+            async with aiohttp.ClientSession(headers={"User-Agent": TELEGRAM_USER_AGENT}) as session:
+                async with session.get(str(photo)) as resp:
+                    if resp.status != 200:
+                        raise ValueError("Bad Request: failed to get HTTP URL content")
+                    content = await resp.read()
+        elif photo in self._file_ids:
+            self.photos["by_file_id"] += 1
+            return photo
+        else:
+            raise ValueError("Bad Request: wrong file identifier/HTTP URL specified")
+        file_id = "photo-" + hashlib.sha256(content).hexdigest()[:32]
+        self._file_ids.add(file_id)
+        return file_id
+
+    async def call(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        self.calls[method] += 1
+        if method == "getUpdates":
+            result = await self._get_updates(params)
+            await asyncio.sleep(self.latency)
+            return web.json_response({"ok": True, "result": result})
+        await asyncio.sleep(self.latency)
+        if method == "getMe":
+            result = BOT_USER
+        elif method in ("sendMessage", "sendPhoto"):
+            if str(params.get("chat_id", "")) in self.missing_chats:
+                return web.json_response(
+                    {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"}, status=400
+                )
+            photo = None
+            if method == "sendPhoto":
+                try:
+                    photo = await self._photo(params.get("photo"))
+                except ValueError as e:
+                    return web.json_response({"ok": False, "error_code": 400, "description": str(e)}, status=400)
+            self._message_id += 1
+            text = params.get("text") or params.get("caption") or ""
+            self.messages.append((str(params.get("chat_id", "")), text, time.perf_counter()))
+            result = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": self._chat(str(params.get("chat_id", "0"))),
+                "text": params.get("text") or params.get("caption") or "",
+            }
+            if photo is not None:
+                result["photo"] = [{"file_id": photo, "file_unique_id": photo[-16:], "width": 1280, "height": 720}]
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+class FakePexels:
+    """
+    Поиск фото Pexels: GET /v1/search?query=… — одно фото на запрос (своё для каждого запроса),
+    GET /photos/{name}.jpg — само фото. requests["search"] — поисковые запросы, requests["image"]
+    и requests["image_telegram"] — скачивания фото ботом и Telegram.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/search", self.search)
+        app.router.add_get("/photos/{name}.jpg", self.photo)
+        return app
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.requests["search"] += 1
+        await asyncio.sleep(self.latency)
+        if not request.headers.get("Authorization"):
+            raise web.HTTPUnauthorized()
+        name = hashlib.sha256(request.query.get("query", "").encode("utf-8")).hexdigest()[:16]
+        large = f"http://{request.host}/photos/{name}.jpg"
+        return web.json_response({"photos": [{"id": 1, "src": {"large": large}}]})
+
+    async def photo(self, request: web.Request) -> web.Response:
+        from_telegram = request.headers.get("User-Agent", "").startswith("TelegramBot")
+        self.requests["image_telegram" if from_telegram else "image"] += 1
+        return web.Response(body=_image(request.path), content_type="image/jpeg")
+
+
+class FakeRedis:
+    """
+    Redis на asyncio (RESP2/RESP3): PING, HELLO, CLIENT, SELECT, GET, SET (NX, EX, PX), DEL,
+    SCRIPT LOAD, EVAL и EVALSHA. Из Lua-скриптов поддерживаются два скрипта utils/state.py
+    (корзина токенов и снятие блокировки) — они узнаются по тексту и выполняются на Python.
+    """
+
+    def __init__(self):
+        # Ключ → (значение, срок годности по time.monotonic или None)
+        self._data: dict[str, tuple[object, float | None]] = {}
+        self._scripts: dict[str, str] = {}
+        self.commands = Counter()
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, port: int) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> list[str] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2].decode("utf-8"))
+        return args
+
+    @staticmethod
+    def _encode(value, resp3: bool) -> bytes:
+        if value is None:
+            return b"_\r\n" if resp3 else b"$-1\r\n"
+        if isinstance(value, Exception):
+            # NOSCRIPT, WRONGTYPE и т. п. идут без префикса ERR — по нему клиент узнаёт тип ошибки
+            message = str(value)
+            prefix = "" if message.split(" ", 1)[0].isupper() else "ERR "
+            return f"-{prefix}{message}\r\n".encode()
+        if value is True:
+            return b"+OK\r\n"
+        if isinstance(value, int):
+            return f":{value}\r\n".encode()
+        if isinstance(value, dict):
+            body = b"".join(FakeRedis._encode(str(k), resp3) + FakeRedis._encode(v, resp3) for k, v in value.items())
+            return f"%{len(value)}\r\n".encode() + body if resp3 else f"*{len(value) * 2}\r\n".encode() + body
+        data = str(value).encode("utf-8")
+        return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        resp3 = False
+        try:
+            while (args := await self._read_command(reader)) is not None:
+                name = args[0].upper()
+                self.commands[name] += 1
+                if name == "HELLO":
+                    resp3 = len(args) > 1 and args[1] == "3"
+                    reply = {"server": "redis", "version": "7.0.0", "proto": 3 if resp3 else 2}
+                else:
+                    try:
+                        reply = self._execute(name, args[1:])
+                    except Exception as e:
+                        reply = e
+                writer.write(self._encode(reply, resp3))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _execute(self, name: str, args: list[str]):
+        if name in ("PING", "SELECT"):
+            return True
+        if name == "CLIENT":
+            raise ValueError("unknown subcommand")
+        if name == "GET":
+            value = self._get(args[0])
+            return value if isinstance(value, str) or value is None else ValueError("WRONGTYPE")
+        if name == "SET":
+            return self._set(args)
+        if name == "DEL":
+            removed = 0
+            for key in args:
+                if self._get(key) is not None:
+                    del self._data[key]
+                    removed += 1
+            return removed
+        if name == "SCRIPT" and args[0].upper() == "LOAD":
+            sha = hashlib.sha1(args[1].encode("utf-8")).hexdigest()
+            self._scripts[sha] = args[1]
+            return sha
+        if name in ("EVAL", "EVALSHA"):
+            script = args[0] if name == "EVAL" else self._scripts.get(args[0])
+            if script is None:
+                raise ValueError("NOSCRIPT No matching script")
+            numkeys = int(args[1])
+            return self._run_script(script, args[2:2 + numkeys], args[2 + numkeys:])
+        raise ValueError(f"unknown command '{name}'")
+
+    def _set(self, args: list[str]):
+        key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+        expires_at = None
+        for unit, scale in (("PX", 0.001), ("EX", 1.0)):
+            if unit in options:
+                expires_at = time.monotonic() + float(args[2 + options.index(unit) + 1]) * scale
+        if "NX" in options and self._get(key) is not None:
+            return None
+        self._data[key] = (value, expires_at)
+        return True
+
+    def _run_script(self, script: str, keys: list[str], argv: list[str]):
+        if "redis.call('TIME')" in script:
+            rate, capacity, tokens = (float(a) for a in argv)
+            now = time.monotonic()
+            state = self._get(keys[0]) or {}
+            have = min(capacity, state.get("tokens", capacity) + max(0.0, now - state.get("updated", now)) * rate)
+            wait = 0.0
+            if have >= tokens:
+                have -= tokens
+            else:
+                wait = (tokens - have) / rate
+            self._data[keys[0]] = ({"tokens": have, "updated": now}, now + capacity / rate + 1)
+            return repr(wait)
+        if "redis.call('DEL'" in script:
+            if self._get(keys[0]) == argv[0]:
+                del self._data[keys[0]]
+                return 1
+            return 0
+        raise ValueError("unsupported script")
@@ -16,7 +16,7 @@ from database import init_db
 def main() -> None:
     print("Создание таблиц в БД...")
     init_db()
-    print("Готово. Таблицы users и channels созданы.")
+    print("Готово. Таблицы users, channels, summaries, sent_news, posted_news и feed_marks созданы.")
 
 
 if __name__ == "__main__":
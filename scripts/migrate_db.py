@@ -0,0 +1,45 @@
+"""
+Миграция существующей БД до текущих моделей (database/models.py).
+create_all (scripts/init_db.py) создаёт только недостающие таблицы: новые колонки и индексы
+уже существующей users он не добавляет — их добавляет этот скрипт (и убирает ненужный индекс channels).
+Все изменения идемпотентны (IF [NOT] EXISTS), выполняются в одной транзакции; повторный запуск безопасен.
+Запуск из корня проекта: python -m scripts.migrate_db
+"""
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text  # noqa: E402
+
+from database import engine, init_db  # noqa: E402
+
+STATEMENTS = (
+    # Флаг действующей подписки: снимается ежедневной задачей (bot/subscriptions.py)
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_subscribed BOOLEAN NOT NULL DEFAULT false",
+    "COMMENT ON COLUMN users.is_subscribed IS 'Подписка действует (снимается по истечении subscription_expires_at)'",
+    # Подписки, действующие на момент миграции, остаются действующими
+    "UPDATE users SET is_subscribed = true WHERE NOT is_subscribed AND subscription_expires_at > now()",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS expiry_reminded_at TIMESTAMP WITH TIME ZONE",
+    "COMMENT ON COLUMN users.expiry_reminded_at IS 'Когда отправлено напоминание о скором окончании подписки'",
+    # Частичный индекс для ежедневной задачи: истёкшие и истекающие среди действующих подписок
+    "CREATE INDEX IF NOT EXISTS ix_users_subscription_expires_at ON users (subscription_expires_at) WHERE is_subscribed",
+    # GIN-индекс по источникам каналов больше не нужен: «источник → каналы» строит снимок каналов в памяти
+    "DROP INDEX IF EXISTS ix_channels_news_source_urls",
+)
+
+
+def main() -> None:
+    print("Создание недостающих таблиц...")
+    init_db()
+    print("Миграция users и channels...")
+    with engine.begin() as conn:
+        for statement in STATEMENTS:
+            conn.execute(text(statement))
+    print("Готово.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Экземпляр бота для tests/test_replicas.py — отдельный процесс на общем состоянии (STATE_BACKEND=redis).
+Режимы:
+  button — нажатия «Получить новость» пользователей 1..REPLICA_USERS, по REPLICA_PRESSES на каждого;
+  autopost — цикл автопостинга по REPLICA_CHANNELS каналам, подписанным на REPLICA_FEED_URL
+  (каналы и posted_news — в памяти процесса, повторы между процессами отсекает только общее состояние);
+  REPLICA_IGNORE_LOCK=1 — цикл идёт, даже если блокировку держит другой процесс
+  (как если бы она истекла, пока первый цикл ещё шёл).
+Печатает "ready", ждёт строку "go" из stdin (оба экземпляра начинают одновременно),
+результат — JSON в последней строке stdout.
+Запуск: python tests/replica_worker.py button|autopost
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Добавляем корень проекта и tests в PYTHONPATH
+tests_dir = Path(__file__).resolve().parent
+sys.path[:0] = [str(tests_dir.parent), str(tests_dir)]
+
+from telegram import Bot  # noqa: E402
+
+import bot.autopost as autopost  # noqa: E402
+import parser.sports_ru as sports_ru  # noqa: E402
+from bot import handlers  # noqa: E402
+from config import TELEGRAM_API_URL  # noqa: E402
+from database.channels import ActiveChannel  # noqa: E402
+from parser.executor import parse_executor  # noqa: E402
+from support import BOT_TOKEN, close_bot_resources, isolate_autopost, press  # noqa: E402
+from utils.state import state_backend  # noqa: E402
+
+FEED_URL = os.environ["REPLICA_FEED_URL"]
+
+
+async def _button(bot: Bot) -> dict:
+    users, presses = int(os.environ["REPLICA_USERS"]), int(os.environ["REPLICA_PRESSES"])
+    rng = random.Random()
+    sports_ru.SPORTS_RU_FOOTBALL_RSS = FEED_URL
+
+    async def user(user_id: int) -> None:
+        for number in range(presses):
+            await asyncio.sleep(rng.uniform(0, 0.05))
+            await press(bot, user_id, number)
+
+    await asyncio.gather(*(user(user_id) for user_id in range(1, users + 1)))
+    # Публикации в канал идут в фоне — дожидаемся их
+    await asyncio.gather(*handlers._channel_posts, return_exceptions=True)
+    return {}
+
+
+async def _autopost(bot: Bot) -> dict:
+    return await autopost.run_autopost_cycle(bot)
+
+
+def _ignore_lock() -> None:
+    @asynccontextmanager
+    async def lock(key: str, ttl: float):
+        yield True
+
+    state_backend.lock = lock
+
+
+async def _run(mode: str) -> dict:
+    try:
+        async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+            return await (_button if mode == "button" else _autopost)(bot)
+    finally:
+        await close_bot_resources()
+        parse_executor.shutdown()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.ERROR)
+    mode = sys.argv[1]
+    if mode == "autopost":
+        channels = int(os.environ["REPLICA_CHANNELS"])
+        isolate_autopost(setattr, [ActiveChannel(k, -1000 - k, (FEED_URL,), "") for k in range(1, channels + 1)])
+        if os.environ.get("REPLICA_IGNORE_LOCK") == "1":
+            _ignore_lock()
+    print("ready", flush=True)
+    sys.stdin.readline()
+    print(json.dumps(asyncio.run(_run(mode))), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Помощники тестов: запуск локальных замен сервисов на портах из окружения тестов,
+нажатие кнопки «Получить новость», автопостинг без БД и освобождение ресурсов бота в конце цикла событий.
+"""
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any
+
+from aiohttp import web
+
+from scripts.fake_services import free_port, start
+
+PORTS = {name: free_port() for name in ("site", "gemini", "telegram", "pexels")}
+BOT_TOKEN = "123456:test"
+
+
+def feed_url(prefix: str) -> str:
+    """Лента замены сайта с префиксом prefix: у каждого префикса свои URL, кэши холодные."""
+    return f"http://127.0.0.1:{PORTS['site']}/{prefix}/rss/"
+
+
+async def close_bot_resources() -> None:
+    """Закрывает то, что привязано к циклу событий теста: очередь отправки, HTTP-сессию, общее состояние."""
+    from bot.send_queue import close_send_queue
+    from utils import http_client
+    from utils.state import state_backend
+
+    await close_send_queue()
+    await http_client.close()
+    await state_backend.close()
+
+
+@asynccontextmanager
+async def services(**apps: web.Application) -> AsyncIterator[None]:
+    """Запускает замены сервисов (site=, gemini=, telegram=, pexels= — приложения aiohttp) на их портах."""
+    runners = [await start(app, PORTS[name]) for name, app in apps.items()]
+    try:
+        yield
+    finally:
+        await close_bot_resources()
+        for runner in runners:
+            await runner.cleanup()
+
+
+def callback_update(bot, user_id: int, number: int, data: str = "news_man_city"):
+    """Обновление «нажата кнопка» от пользователя user_id в личном чате."""
+    from telegram import Update
+
+    return Update.de_json(
+        {
+            "update_id": user_id * 1000 + number,
+            "callback_query": {
+                "id": f"{user_id}-{number}",
+                "from": {"id": user_id, "is_bot": False, "first_name": "Test"},
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {"message_id": 1, "date": int(time.time()), "chat": {"id": user_id, "type": "private"}},
+            },
+        },
+        bot,
+    )
+
+
+async def press(bot, user_id: int, number: int = 0) -> None:
+    """Нажатие «Получить новость» (обработчик вызывается напрямую, как из Application)."""
+    from bot.handlers import button_news_man_city
+
+    await button_news_man_city(callback_update(bot, user_id, number), SimpleNamespace(bot=bot))
+
+
+def isolate_autopost(patch: Callable[[Any, str, Any], None], channels: list) -> list[tuple[int, int]]:
+    """
+    Автопостинг без БД: каналы (ActiveChannel с подпиской на месяц вперёд) — в снимке, posted_news —
+    в списке процесса, отметки лент не сохраняются. patch — monkeypatch.setattr или setattr.
+    Возвращает список пар (channel_id, url_hash), отмеченных опубликованными.
+    """
+    import bot.autopost as autopost
+    import parser.ingest as ingest
+    from config import DEDUP_MAX_ITEMS, DEDUP_SIMILARITY
+    from database.channels import ChannelSnapshot, _SnapshotEntry
+    from parser.dedup import StoryIndex
+    from utils.urls import normalize_url
+
+    snapshot = ChannelSnapshot(overlap=0, full_refresh=3600)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=30)
+    for channel in channels:
+        snapshot._put(_SnapshotEntry(
+            channel, frozenset(normalize_url(url) for url in channel.news_source_urls), True, expires_at,
+        ))
+    posted: list[tuple[int, int]] = []
+
+    async def refresh() -> None:
+        pass
+
+    async def load_posted(url_hashes: list[int]) -> set[tuple[int, int]]:
+        return {pair for pair in posted if pair[1] in set(url_hashes)}
+
+    async def mark_posted(pairs: list[tuple[int, int]]) -> None:
+        posted.extend(pairs)
+
+    async def load_mark(url: str) -> None:
+        return None
+
+    async def save_marks(marks: list) -> None:
+        pass
+
+    patch(snapshot, "refresh", refresh)
+    patch(autopost, "channel_snapshot", snapshot)
+    patch(autopost, "story_index", StoryIndex(DEDUP_SIMILARITY, DEDUP_MAX_ITEMS))
+    patch(autopost, "feed_ingest", ingest.FeedIngest())
+    patch(autopost, "_attempts", {})
+    patch(autopost, "load_posted", load_posted)
+    patch(autopost, "mark_posted", mark_posted)
+    patch(ingest, "load_mark", load_mark)
+    patch(ingest, "save_marks", save_marks)
+    return posted
@@ -0,0 +1,143 @@
+"""
+Цикл автопостинга (bot/autopost.py) на локальных заменах сайта, Gemini и Telegram:
+каналы и posted_news подменяются памятью процесса, отметки лент не сохраняются в БД.
+"""
+import asyncio
+from collections import Counter
+
+from telegram import Bot
+
+import bot.autopost as autopost
+from config import AUTOPOST_MAX_PER_CHANNEL, TELEGRAM_API_URL
+from database.channels import ActiveChannel
+from scripts.fake_services import FakeGemini, FakeNewsSite, FakeTelegram
+from support import BOT_TOKEN, feed_url, isolate_autopost, services
+
+
+def test_cycle_fetches_each_source_once_and_fans_out_to_all_channels(monkeypatch):
+    """
+    Источник, на который подписаны несколько каналов (в разных написаниях), загружается один раз
+    по исходному адресу; каждая новость обобщается один раз и уходит во все подписанные каналы.
+    """
+    source_a, source_b = feed_url("fanout-a"), feed_url("fanout-b")
+    channels = [
+        ActiveChannel(1, -1001, (source_a,), ""),
+        ActiveChannel(2, -1002, (source_a, source_b), ""),
+        # То же, что source_b, с трекинговым параметром: после нормализации — один источник
+        ActiveChannel(3, -1003, (f"{source_b}?utm_source=tg",), ""),
+    ]
+    posted = isolate_autopost(monkeypatch.setattr, channels)
+    site, telegram = FakeNewsSite(0.02), FakeTelegram(0.02)
+
+    async def scenario() -> tuple[dict[str, int], Counter, dict[str, int]]:
+        async with services(site=site.app(), gemini=FakeGemini(0.05).app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                first = await autopost.run_autopost_cycle(bot)
+                requests = site.requests.copy()
+                second = await autopost.run_autopost_cycle(bot)
+        return first, requests, second
+
+    first, requests, second = asyncio.run(scenario())
+
+    assert first["channels"] == 3 and first["sources"] == 2
+    # Ленты загружены по записанным (http://, со слэшем) адресам, каждая один раз
+    assert requests["rss"] == 2
+    # Ленты source_a и source_b — одни и те же истории: каждая из самых свежих загружается и обобщается один раз
+    assert first["rendered"] == AUTOPOST_MAX_PER_CHANNEL
+    assert requests["article"] == AUTOPOST_MAX_PER_CHANNEL
+    assert first["sent"] == 3 * AUTOPOST_MAX_PER_CHANNEL
+
+    by_chat: dict[str, list[str]] = {}
+    for chat_id, text, _ in telegram.messages:
+        by_chat.setdefault(chat_id, []).append(text)
+    assert set(by_chat) == {"-1001", "-1002", "-1003"}
+    assert all(len(texts) == AUTOPOST_MAX_PER_CHANNEL for texts in by_chat.values())
+    assert by_chat["-1001"] == by_chat["-1002"] == by_chat["-1003"]
+    assert all('<a href="' in text for text in by_chat["-1001"])
+
+    marked = {channel_id: {h for c, h in posted if c == channel_id} for channel_id in (1, 2, 3)}
+    assert len(set(posted)) == len(posted)
+    assert marked[1] == marked[2] == marked[3]
+
+    # Отметки лент сдвинуты: повторный цикл новых записей не видит и ничего не публикует
+    assert second["items"] == 0 and second["sent"] == 0
+    assert len(telegram.messages) == 3 * AUTOPOST_MAX_PER_CHANNEL
+
+
+def _failing_channel_send(monkeypatch, failures: dict[int, int]) -> None:
+    """Отправка в канал chat_id падает failures[chat_id] раз (на каждую новость)."""
+    from bot.media import media_pipeline
+
+    send = media_pipeline.send
+    attempts: Counter = Counter()
+
+    async def send_or_fail(bot, chat_id, text, image_url, priority):
+        attempts[chat_id, text] += 1
+        if attempts[chat_id, text] <= failures.get(chat_id, 0):
+            raise RuntimeError("канал недоступен")
+        await send(bot, chat_id, text, image_url, priority)
+
+    monkeypatch.setattr(media_pipeline, "send", send_or_fail)
+
+
+def _run_cycles(site: FakeNewsSite, telegram: FakeTelegram, cycles: int) -> list[dict[str, int]]:
+    async def scenario() -> list[dict[str, int]]:
+        async with services(site=site.app(), gemini=FakeGemini(0.01).app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                return [await autopost.run_autopost_cycle(bot) for _ in range(cycles)]
+
+    return asyncio.run(scenario())
+
+
+def test_failed_posts_are_retried_by_the_next_cycle(monkeypatch):
+    """Новости, не отправленные в канал, не теряются: лента остаётся на прежней отметке до успешной публикации."""
+    source = feed_url("retry")
+    channels = [ActiveChannel(1, -1001, (source,), ""), ActiveChannel(2, -1002, (source,), "")]
+    posted = isolate_autopost(monkeypatch.setattr, channels)
+    _failing_channel_send(monkeypatch, {-1002: 1})
+    telegram = FakeTelegram(0.01)
+
+    first, second, third = _run_cycles(FakeNewsSite(0.01), telegram, 3)
+
+    assert (first["sent"], first["failed"]) == (AUTOPOST_MAX_PER_CHANNEL, AUTOPOST_MAX_PER_CHANNEL)
+    # Канал 1 новость уже получил, канал 2 получает её со второй попытки
+    assert (second["sent"], second["failed"]) == (AUTOPOST_MAX_PER_CHANNEL, 0)
+    assert third["items"] == 0
+    texts = {chat_id: [text for c, text, _ in telegram.messages if c == chat_id] for chat_id in ("-1001", "-1002")}
+    assert texts["-1001"] == texts["-1002"] and len(texts["-1001"]) == AUTOPOST_MAX_PER_CHANNEL
+    assert len(set(posted)) == len(posted)
+
+
+def test_post_is_skipped_after_max_attempts(monkeypatch):
+    """Новость, которую не удаётся отправить AUTOPOST_MAX_ATTEMPTS циклов, отмечается пропущенной, и лента идёт дальше."""
+    source = feed_url("give-up")
+    posted = isolate_autopost(monkeypatch.setattr, [ActiveChannel(1, -1001, (source,), "")])
+    monkeypatch.setattr(autopost, "AUTOPOST_MAX_ATTEMPTS", 2)
+    _failing_channel_send(monkeypatch, {-1001: 10})
+    telegram = FakeTelegram(0.01)
+
+    first, second, third = _run_cycles(FakeNewsSite(0.01), telegram, 3)
+
+    assert first["failed"] == second["failed"] == AUTOPOST_MAX_PER_CHANNEL
+    assert third["items"] == 0
+    assert telegram.messages == []
+    assert len(posted) == len(set(posted)) == first["items"]
+
+
+def test_cycle_posts_when_shared_state_fails(monkeypatch):
+    """Ошибка общего состояния при отметке posted: не роняет цикл: новости публикуются и учитываются в posted_news."""
+    from utils.state import state_backend
+
+    async def broken(*args, **kwargs):
+        raise ConnectionError("redis недоступен")
+
+    source = feed_url("claims-down")
+    posted = isolate_autopost(monkeypatch.setattr, [ActiveChannel(1, -1001, (source,), "")])
+    monkeypatch.setattr(state_backend, "claim", broken)
+    monkeypatch.setattr(state_backend, "forget", broken)
+    telegram = FakeTelegram(0.01)
+
+    (stats,) = _run_cycles(FakeNewsSite(0.01), telegram, 1)
+
+    assert stats["sent"] == len(telegram.messages) == AUTOPOST_MAX_PER_CHANNEL
+    assert len(posted) == stats["items"]
@@ -0,0 +1,57 @@
+"""
+Бэкенды извлечения (parser/extract.py): на страницах из scripts/fixtures selectolax даёт тот же текст
+и ту же картинку, что и эталонный bs4. Время разбора сравнивает scripts/bench_extract.py.
+"""
+from string import Template
+
+from parser.extract import Bs4Backend, SelectolaxBackend
+from scripts.fake_services import FIXTURES, _padding
+
+ARTICLE_URL = "https://www.sports.ru/football/news/1.html"
+
+
+def _pages() -> dict[str, str]:
+    """Шаблон статьи замены сайта (с og:image, без картинок, с тяжёлой боковой колонкой) и готовые страницы."""
+    template = Template((FIXTURES / "article.html").read_text(encoding="utf-8"))
+    paragraphs = (FIXTURES / "article_paragraphs.txt").read_text(encoding="utf-8").split("\n")
+    fields = {
+        "title": "Гвардиола: «Мы заслужили победу»",
+        "published": "Sat, 18 Oct 2026 12:00:00 +0300",
+        "image": "https://www.sports.ru/images/1.jpg",
+        "body": "\n".join(f"<p>{p}</p>" for p in paragraphs),
+        "padding": "",
+    }
+    pages = {
+        "article": template.substitute(fields),
+        "article_no_og_image": template.substitute(fields, image=""),
+        "article_padded": template.substitute(fields, padding=_padding(200)),
+    }
+    for path in sorted(FIXTURES.glob("*.html")):
+        if path.name != "article.html":
+            pages[path.stem] = path.read_text(encoding="utf-8")
+    return pages
+
+
+def test_selectolax_matches_bs4_on_fixture_pages():
+    bs4, selectolax = Bs4Backend(), SelectolaxBackend()
+    pages = _pages()
+    assert len(pages) >= 5
+
+    for name, page_html in pages.items():
+        expected_text, expected_image = bs4.extract(page_html, ARTICLE_URL)
+        text, image = selectolax.extract(page_html, ARTICLE_URL)
+        assert expected_text, name
+        assert text == expected_text, name
+        assert image == expected_image, name
+
+
+def test_extracted_text_skips_page_chrome_and_junk():
+    """Оба бэкенда берут блок статьи без меню, скриптов, рекламы и боковой колонки."""
+    page_html = _pages()["article_padded"]
+    first_paragraph = (FIXTURES / "article_paragraphs.txt").read_text(encoding="utf-8").split("\n")[0]
+
+    for backend in (Bs4Backend(), SelectolaxBackend()):
+        text, image = backend.extract(page_html, ARTICLE_URL)
+        assert text.startswith(first_paragraph), backend.name
+        assert "Реклама" not in text and "loadWidget" not in text and "Материал дня" not in text, backend.name
+        assert image == "https://www.sports.ru/images/1.jpg", backend.name
@@ -0,0 +1,97 @@
+"""
+Обработчик кнопки «Получить новость» на локальных заменах сайта, Gemini и Telegram.
+"""
+import asyncio
+import time
+
+from telegram import Bot
+
+import parser.sports_ru as sports_ru
+from config import TELEGRAM_API_URL
+from scripts.fake_services import FakeGemini, FakeNewsSite, FakeTelegram
+from support import BOT_TOKEN, feed_url, press, services
+from utils.urls import url_hash
+
+CONCURRENT_PRESSES = 8
+
+
+def test_concurrent_presses_finish_in_about_the_time_of_one(monkeypatch):
+    """N одновременных нажатий разных пользователей идут параллельно, а не друг за другом."""
+    telegram = FakeTelegram(0.1)
+
+    async def scenario() -> tuple[float, float]:
+        async with services(site=FakeNewsSite(0.05).app(), gemini=FakeGemini(0.3).app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                # Прогрев: список моделей Gemini, пулы соединений и потоков разбора
+                monkeypatch.setattr(sports_ru, "SPORTS_RU_FOOTBALL_RSS", feed_url("concurrency-warmup"))
+                await press(bot, 1)
+
+                monkeypatch.setattr(sports_ru, "SPORTS_RU_FOOTBALL_RSS", feed_url("concurrency-one"))
+                started = time.perf_counter()
+                await press(bot, 2)
+                single = time.perf_counter() - started
+
+                monkeypatch.setattr(sports_ru, "SPORTS_RU_FOOTBALL_RSS", feed_url("concurrency-many"))
+                started = time.perf_counter()
+                await asyncio.gather(*(press(bot, 100 + i) for i in range(CONCURRENT_PRESSES)))
+                concurrent = time.perf_counter() - started
+        return single, concurrent
+
+    single, concurrent = asyncio.run(scenario())
+
+    news = {chat_id for chat_id, text, _ in telegram.messages if '<a href="' in text}
+    assert news == {"1", "2", *(str(100 + i) for i in range(CONCURRENT_PRESSES))}
+    # Друг за другом нажатия заняли бы около CONCURRENT_PRESSES × single
+    assert concurrent < 2 * single, f"одно нажатие {single:.2f} с, {CONCURRENT_PRESSES} одновременных {concurrent:.2f} с"
+
+
+def test_channel_post_runs_in_background_and_logs_errors(monkeypatch, caplog):
+    """Ответ пользователю не ждёт публикации в канал; ошибка публикации попадает в лог и снимает отметку."""
+    from bot import handlers
+    from bot.media import media_pipeline
+    from bot.send_queue import CHANNEL
+    from utils.state import state_backend
+
+    telegram = FakeTelegram(0.05)
+    send = media_pipeline.send
+    failing: set[str] = set()
+
+    async def send_or_fail(bot, chat_id, text, image_url, priority):
+        if priority == CHANNEL and chat_id in failing:
+            raise RuntimeError("канал недоступен")
+        await send(bot, chat_id, text, image_url, priority)
+
+    urls: list[str] = []
+    render = handlers.render_news
+
+    async def render_and_remember(item):
+        urls.append(item.url)
+        return await render(item)
+
+    monkeypatch.setattr(handlers, "CHANNEL_USERNAME", "test_channel")
+    monkeypatch.setattr(handlers, "render_news", render_and_remember)
+    monkeypatch.setattr(media_pipeline, "send", send_or_fail)
+
+    async def scenario() -> tuple[int, list[bool]]:
+        async with services(site=FakeNewsSite(0.01).app(), gemini=FakeGemini(0.01).app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                monkeypatch.setattr(sports_ru, "SPORTS_RU_FOOTBALL_RSS", feed_url("channel-post"))
+                await press(bot, 1)
+                pending = len(handlers._channel_posts)
+                await asyncio.gather(*handlers._channel_posts)
+
+                failing.add("@test_channel")
+                await press(bot, 1, 1)
+                await asyncio.wait(list(handlers._channel_posts))
+                # Неудачная публикация не оставляет отметку: следующее нажатие попробует снова
+                claims = [await state_backend.claim(f"channel_post:@test_channel:{url_hash(url)}", 60) for url in urls]
+        return pending, claims
+
+    pending, claims = asyncio.run(scenario())
+
+    # Обработчик вернулся, пока публикация в канал ещё шла
+    assert pending == 1
+    channel_posts = [text for chat_id, text, _ in telegram.messages if chat_id == "@test_channel"]
+    assert len(channel_posts) == 1
+    assert claims == [False, True]
+    assert "Не удалось опубликовать новость" in caplog.text
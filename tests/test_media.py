@@ -0,0 +1,105 @@
+"""
+Отправка новостей с картинками (bot/media.py) на локальных заменах сайта и Telegram; БД недоступна,
+file_id живут в памяти процесса.
+"""
+import asyncio
+
+import pytest
+from telegram import Bot
+from telegram.error import BadRequest
+
+from bot.media import CAPTION_LIMIT, MediaPipeline
+from bot.send_queue import CHANNEL, INTERACTIVE
+from config import TELEGRAM_API_URL
+from scripts.fake_services import FakeNewsSite, FakeTelegram
+from support import BOT_TOKEN, PORTS, services
+
+SHORT = "<b>Заголовок</b>\n\nКороткое обобщение."
+LONG = "<b>Заголовок</b>\n\n" + "Длинное обобщение. " * (CAPTION_LIMIT // 10)
+
+
+def _image(prefix: str, news_id: int) -> str:
+    return f"http://127.0.0.1:{PORTS['site']}/{prefix}/images/{news_id}.jpg"
+
+
+def _pipeline() -> MediaPipeline:
+    return MediaPipeline(enabled=True, pexels_api_key="", cache_ttl=60, max_bytes=10**6)
+
+
+def test_long_message_sends_photo_by_file_id_then_text():
+    """Текст длиннее подписи: фото отдельным сообщением (повторно — по file_id), следом текст целиком."""
+    telegram = FakeTelegram(0.01)
+    pipeline = _pipeline()
+    image = _image("media-long", 1)
+
+    async def scenario() -> None:
+        async with services(site=FakeNewsSite(0.01).app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                for chat_id in (101, 102, -1003):
+                    await pipeline.send(bot, chat_id, LONG, image, INTERACTIVE if chat_id > 0 else CHANNEL)
+
+    asyncio.run(scenario())
+
+    assert telegram.photos["by_url"] == 1 and telegram.photos["by_file_id"] == 2
+    for chat_id in ("101", "102", "-1003"):
+        assert [text for c, text, _ in telegram.messages if c == chat_id] == ["", LONG]
+    assert pipeline.stats["photo_then_text"] == 3
+
+
+def test_hotlinked_image_is_uploaded_for_long_messages():
+    """Картинку, которую сайт не отдаёт Telegram, бот загружает сам — и для длинного сообщения тоже."""
+    telegram = FakeTelegram(0.01)
+    pipeline = _pipeline()
+    image = _image("media-hotlink", 3)
+
+    async def scenario() -> None:
+        async with services(site=FakeNewsSite(0.01, hotlink_every=3).app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                await pipeline.send(bot, 101, LONG, image, INTERACTIVE)
+                await pipeline.send(bot, 102, SHORT, image, INTERACTIVE)
+
+    asyncio.run(scenario())
+
+    assert telegram.photos["uploaded"] == 1 and telegram.photos["by_file_id"] == 1
+    assert [text for c, text, _ in telegram.messages if c == "101"] == ["", LONG]
+    assert [text for c, text, _ in telegram.messages if c == "102"] == [SHORT]
+
+
+def test_chat_errors_do_not_mark_image_broken():
+    """«chat not found» — ошибка чата: картинка остаётся годной и уходит фото в другие чаты."""
+    telegram = FakeTelegram(0.01)
+    telegram.missing_chats.add("-1009")
+    pipeline = _pipeline()
+    image = _image("media-chat", 1)
+
+    async def scenario() -> None:
+        async with services(site=FakeNewsSite(0.01).app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                with pytest.raises(BadRequest, match="not found"):
+                    await pipeline.send(bot, -1009, SHORT, image, CHANNEL)
+                await pipeline.send(bot, 101, SHORT, image, INTERACTIVE)
+
+    asyncio.run(scenario())
+
+    assert telegram.photos["by_url"] == 1
+    assert [text for c, text, _ in telegram.messages if c == "101"] == [SHORT]
+
+
+def test_undownloadable_image_is_marked_broken():
+    """Картинку, которую не скачать ни Telegram, ни боту, больше не пробуем: сообщения уходят текстом."""
+    telegram = FakeTelegram(0.01)
+    pipeline = _pipeline()
+    site = FakeNewsSite(0.01, images=False)
+    image = _image("media-missing", 1)
+
+    async def scenario() -> None:
+        async with services(site=site.app(), telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                await pipeline.send(bot, 101, SHORT, image, INTERACTIVE)
+                await pipeline.send(bot, 102, SHORT, image, INTERACTIVE)
+
+    asyncio.run(scenario())
+
+    assert [text for _, text, _ in telegram.messages] == [SHORT, SHORT]
+    # Вторая отправка картинку уже не пробует
+    assert telegram.photos["by_url"] == 1 and site.requests["image"] == 1
@@ -0,0 +1,127 @@
+"""
+Два экземпляра бота (отдельные процессы tests/replica_worker.py) на общем состоянии в локальной замене Redis:
+ни нажатия кнопки, ни два планировщика автопостинга не дают повторов ни пользователям, ни в каналы.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from config import AUTOPOST_MAX_PER_CHANNEL
+from scripts.fake_services import FakeGemini, FakeNewsSite, FakeRedis, FakeTelegram, free_port
+from support import feed_url, services
+
+WORKER = Path(__file__).resolve().parent / "replica_worker.py"
+LINK = re.compile(r'<a href="([^"]+)"')
+CHANNEL = "replicas_channel"
+
+
+def _run_replicas(mode: str, telegram: FakeTelegram, **env: str) -> list[dict]:
+    """Запускает два экземпляра в режиме mode одновременно; возвращает их результаты."""
+
+    async def scenario() -> list[dict]:
+        redis = FakeRedis()
+        port = free_port()
+        await redis.start(port)
+        worker_env = {
+            **os.environ,
+            "STATE_BACKEND": "redis",
+            "REDIS_URL": f"redis://127.0.0.1:{port}/0",
+            "STATE_KEY_PREFIX": f"replicas:{time.time_ns()}:",
+            **env,
+        }
+        try:
+            async with services(site=FakeNewsSite(0.05).app(), gemini=FakeGemini(0.05).app(), telegram=telegram.app()):
+                workers = [
+                    await asyncio.create_subprocess_exec(
+                        sys.executable, str(WORKER), mode,
+                        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, env=worker_env,
+                    )
+                    for _ in range(2)
+                ]
+                for worker in workers:
+                    assert (await asyncio.wait_for(worker.stdout.readline(), 60)).strip() == b"ready"
+                for worker in workers:
+                    worker.stdin.write(b"go\n")
+                    await worker.stdin.drain()
+                outputs = await asyncio.wait_for(asyncio.gather(*(worker.communicate() for worker in workers)), 120)
+                assert [worker.returncode for worker in workers] == [0, 0]
+        finally:
+            await redis.close()
+        return [json.loads(stdout.decode().strip().splitlines()[-1]) for stdout, _ in outputs]
+
+    return asyncio.run(scenario())
+
+
+def _links(telegram: FakeTelegram) -> Counter:
+    """Сколько раз каждая ссылка на новость пришла в каждый чат."""
+    counts = Counter()
+    for chat_id, text, _ in telegram.messages:
+        link = LINK.search(text)
+        if link:
+            counts[chat_id, link.group(1)] += 1
+    return counts
+
+
+def test_button_presses_on_two_replicas_do_not_repeat_news():
+    """Нажатия одних и тех же пользователей вперемешку на двух экземплярах: новости не повторяются."""
+    users, presses = 3, 2
+    telegram = FakeTelegram(0.01)
+
+    _run_replicas(
+        "button",
+        telegram,
+        REPLICA_FEED_URL=feed_url("replicas-button"),
+        REPLICA_USERS=str(users),
+        REPLICA_PRESSES=str(presses),
+        CHANNEL_USERNAME=CHANNEL,
+    )
+
+    links = _links(telegram)
+    assert all(count == 1 for count in links.values()), [key for key, count in links.items() if count > 1]
+    for user_id in range(1, users + 1):
+        assert sum(1 for chat_id, _ in links if chat_id == str(user_id)) == 2 * presses
+    channel_links = {link for chat_id, link in links if chat_id == f"@{CHANNEL}"}
+    user_links = {link for chat_id, link in links if chat_id != f"@{CHANNEL}"}
+    # Каждая выданная новость опубликована в канал ровно один раз, каким бы экземпляром ни была выдана
+    assert channel_links == user_links
+
+
+def test_autopost_cycle_runs_on_one_scheduler_at_a_time():
+    """Два планировщика запускают цикл одновременно: блокировка пропускает только один."""
+    channels = 3
+    telegram = FakeTelegram(0.01)
+
+    stats = _run_replicas(
+        "autopost", telegram, REPLICA_FEED_URL=feed_url("replicas-lock"), REPLICA_CHANNELS=str(channels),
+    )
+
+    assert sorted(s["channels"] for s in stats) == [0, channels]
+    assert sum(s["sent"] for s in stats) == channels * AUTOPOST_MAX_PER_CHANNEL
+    links = _links(telegram)
+    assert len(links) == channels * AUTOPOST_MAX_PER_CHANNEL and set(links.values()) == {1}
+
+
+def test_autopost_claims_prevent_duplicates_without_the_lock():
+    """Если циклы всё же идут одновременно (блокировка истекла), отметки posted: не дают опубликовать дважды."""
+    channels = 3
+    telegram = FakeTelegram(0.01)
+
+    stats = _run_replicas(
+        "autopost",
+        telegram,
+        REPLICA_FEED_URL=feed_url("replicas-claims"),
+        REPLICA_CHANNELS=str(channels),
+        REPLICA_IGNORE_LOCK="1",
+    )
+
+    assert [s["channels"] for s in stats] == [channels, channels]
+    assert sum(s["sent"] for s in stats) == channels * AUTOPOST_MAX_PER_CHANNEL
+    links = _links(telegram)
+    assert len(links) == channels * AUTOPOST_MAX_PER_CHANNEL and set(links.values()) == {1}
+    for k in range(1, channels + 1):
+        assert sum(1 for chat_id, _ in links if chat_id == str(-1000 - k)) == AUTOPOST_MAX_PER_CHANNEL
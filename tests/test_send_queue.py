@@ -0,0 +1,37 @@
+"""
+Очередь отправки (bot/send_queue.py) без сети: отправки — корутины теста.
+"""
+import asyncio
+
+from bot.send_queue import SendQueue
+
+
+class _BrokenBucket:
+    """Общая корзина, у которой недоступен Redis."""
+
+    capacity = 1
+
+    async def acquire(self, tokens: float = 1) -> None:
+        raise ConnectionError("redis недоступен")
+
+
+def test_sends_complete_when_shared_bucket_fails():
+    """Ошибка общей корзины не останавливает диспетчер: лимит берётся из корзины процесса, отправки доходят."""
+
+    async def scenario() -> tuple[list[str], dict[str, int]]:
+        queue = SendQueue(global_rate=100, max_pending=10)
+        queue._global = _BrokenBucket()
+
+        async def send() -> str:
+            return "ok"
+
+        try:
+            results = await asyncio.wait_for(asyncio.gather(*(queue.send(-1000 - i, send) for i in range(5))), 5)
+        finally:
+            await queue.close()
+        return results, queue.stats
+
+    results, stats = asyncio.run(scenario())
+
+    assert results == ["ok"] * 5
+    assert stats["sent"] == stats["local_tokens"] == 5
@@ -0,0 +1,112 @@
+"""
+Уведомления о подписке (bot/subscriptions.py) на локальной замене Telegram:
+запросы к БД подменяются памятью процесса, отправка идёт через настоящую очередь.
+"""
+import asyncio
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+
+from telegram import Bot
+
+import bot.subscriptions as subscriptions
+from config import TELEGRAM_API_URL
+from scripts.fake_services import FakeTelegram
+from support import BOT_TOKEN, services
+
+EXPIRES_AT = datetime.now(timezone.utc) + timedelta(days=2)
+
+
+def _isolate(monkeypatch, expired: list[int], reminders: list[int]) -> dict[int, datetime | None]:
+    """Истекающие подписки и отметки напоминаний — в памяти; возвращает отметки по id пользователя."""
+    reminded: dict[int, datetime | None] = dict.fromkeys(reminders)
+
+    async def expire_subscriptions(now=None) -> list[int]:
+        return expired
+
+    async def pending_reminders(remind_before, limit, after=None, now=None) -> list[tuple[int, datetime]]:
+        rows = sorted((EXPIRES_AT, user_id) for user_id, at in reminded.items() if at is None)
+        rows = [row for row in rows if after is None or row > after]
+        return [(user_id, expires_at) for expires_at, user_id in rows[:limit]]
+
+    async def mark_reminded(user_ids: list[int], now=None) -> None:
+        for user_id in user_ids:
+            reminded[user_id] = datetime.now(timezone.utc)
+
+    monkeypatch.setattr(subscriptions, "_expired", deque())
+    monkeypatch.setattr(subscriptions, "expire_subscriptions", expire_subscriptions)
+    monkeypatch.setattr(subscriptions, "pending_reminders", pending_reminders)
+    monkeypatch.setattr(subscriptions, "mark_reminded", mark_reminded)
+    return reminded
+
+
+def _flaky_sends(monkeypatch, failures: dict[int, int]) -> dict[str, int]:
+    """Отправка пользователю user_id падает failures[user_id] раз; возвращает наибольшее число одновременных отправок."""
+    get_send_queue = subscriptions.get_send_queue
+    attempts: Counter = Counter()
+    in_flight = {"now": 0, "max": 0}
+
+    class FlakyQueue:
+        async def send(self, chat_id, send, priority):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            try:
+                attempts[chat_id] += 1
+                if attempts[chat_id] <= failures.get(chat_id, 0):
+                    raise RuntimeError("сеть недоступна")
+                return await get_send_queue().send(chat_id, send, priority=priority)
+            finally:
+                in_flight["now"] -= 1
+
+    monkeypatch.setattr(subscriptions, "get_send_queue", FlakyQueue)
+    return in_flight
+
+
+def _run(telegram: FakeTelegram, *cycles) -> list[dict[str, int]]:
+    async def scenario() -> list[dict[str, int]]:
+        async with services(telegram=telegram.app()):
+            async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_URL) as bot:
+                return [await cycle(bot) for cycle in cycles]
+
+    return asyncio.run(scenario())
+
+
+def test_reminders_are_marked_only_when_sent(monkeypatch):
+    """Напоминание, которое не удалось отправить, не отмечается и уходит в следующий запуск; нет чата — не повторяется."""
+    reminded = _isolate(monkeypatch, [], list(range(1, 8)))
+    _flaky_sends(monkeypatch, {3: 1})
+    telegram = FakeTelegram(0.01)
+    telegram.missing_chats.add("5")
+    monkeypatch.setattr(subscriptions, "SUBSCRIPTION_NOTIFY_BATCH", 3)
+
+    first, second, third = _run(
+        telegram, subscriptions.send_notifications, subscriptions.send_notifications, subscriptions.send_notifications,
+    )
+
+    assert (first["reminded"], first["failed"]) == (6, 1)
+    assert (second["reminded"], second["failed"]) == (1, 0)
+    assert (third["reminded"], third["failed"]) == (0, 0)
+    assert all(at is not None for at in reminded.values())
+    chats = Counter(chat_id for chat_id, _, _ in telegram.messages)
+    assert chats == Counter({str(user_id): 1 for user_id in (1, 2, 3, 4, 6, 7)})
+
+
+def test_notifications_are_sent_in_bounded_portions(monkeypatch):
+    """За запуск — не больше SUBSCRIPTION_NOTIFY_LIMIT уведомлений пачками по SUBSCRIPTION_NOTIFY_BATCH, остальные ждут."""
+    expired, reminders = list(range(1, 26)), list(range(101, 111))
+    reminded = _isolate(monkeypatch, expired, reminders)
+    in_flight = _flaky_sends(monkeypatch, {})
+    telegram = FakeTelegram(0.01)
+    monkeypatch.setattr(subscriptions, "SUBSCRIPTION_NOTIFY_LIMIT", 10)
+    monkeypatch.setattr(subscriptions, "SUBSCRIPTION_NOTIFY_BATCH", 4)
+    send = subscriptions.send_notifications
+
+    runs = _run(telegram, subscriptions.run_subscription_cycle, send, send, send, send)
+
+    assert runs[0]["expired"] == 25
+    assert [(r["notified"], r["reminded"], r["pending_expired"]) for r in runs] == [
+        (10, 0, 15), (10, 0, 5), (5, 5, 0), (0, 5, 0), (0, 0, 0),
+    ]
+    assert in_flight["max"] == 4
+    assert all(at is not None for at in reminded.values())
+    chats = Counter(chat_id for chat_id, _, _ in telegram.messages)
+    assert chats == Counter({str(user_id): 1 for user_id in expired + reminders})
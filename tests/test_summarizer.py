@@ -0,0 +1,126 @@
+"""
+Пул обобщений (utils/summarizer.py) на локальной замене Gemini: порядок результатов, упаковка,
+запасные варианты при сбоях и приоритет ответов по кнопке над фоновыми обобщениями.
+"""
+import asyncio
+import time
+
+import utils.gemini as gemini
+from config import GEMINI_MODELS_CACHE_TTL
+from parser.executor import background_parsing
+from scripts.fake_services import FakeGemini
+from support import services
+from utils.summarizer import SummarizerPool
+
+API_KEY = "test-key"
+
+
+def _articles(n: int, long_every: int = 3) -> list[str]:
+    """Каждая long_every-я статья длинная (обобщается отдельно), остальные короткие (упаковываются)."""
+    return [f"МЕТКА-{i}\n" + "Текст новости. " * (200 if i % long_every == 0 else 20) for i in range(n)]
+
+
+def _fresh_models(monkeypatch) -> None:
+    # Ошибки 500 от замены не должны разрывать цепь модели для других тестов
+    monkeypatch.setattr(gemini, "model_registry", gemini.ModelRegistry(ttl=GEMINI_MODELS_CACHE_TTL))
+
+
+def test_batch_packs_short_articles_and_keeps_order(monkeypatch):
+    """Без сбоев: длинные статьи — по одной, короткие — пачками по 5, результаты на своих местах."""
+    _fresh_models(monkeypatch)
+    fake = FakeGemini(0.02)
+    pool = SummarizerPool(4, 10**6, 10**9, 1500, 5)
+    articles = _articles(40)
+
+    async def scenario():
+        async with services(gemini=fake.app()):
+            return await pool.summarize_batch(articles, API_KEY)
+
+    results = asyncio.run(scenario())
+
+    assert [summary for summary, _ in results] == [f"Обобщение: МЕТКА-{i}" for i in range(40)]
+    assert all(model is not None for _, model in results)
+    # 14 длинных по одной; 26 коротких — 5 пачек по 5 и последняя статья отдельным запросом
+    assert fake.requests == pool.stats["requests"] == 14 + 5 + 1
+    assert fake.packed == pool.stats["packed_requests"] == 5
+
+
+def test_batch_falls_back_on_errors_and_incomplete_packs(monkeypatch):
+    """Неполные упакованные ответы дообобщаются по одной, ошибки дают обрезанный текст — порядок сохраняется."""
+    _fresh_models(monkeypatch)
+    fake = FakeGemini(0.02, error_every=11, drop_every=3)
+    pool = SummarizerPool(4, 10**6, 10**9, 1500, 5)
+    articles = _articles(40)
+
+    async def scenario():
+        async with services(gemini=fake.app()):
+            return await pool.summarize_batch(articles, API_KEY)
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 40
+    for i, (summary, model) in enumerate(results):
+        if model is None:
+            assert summary.startswith(f"МЕТКА-{i}")
+        else:
+            assert summary == f"Обобщение: МЕТКА-{i}"
+    fallbacks = sum(1 for _, model in results if model is None)
+    assert fallbacks == pool.stats["fallbacks"] > 0
+    # Каждый третий упакованный ответ без первой записи: её статья ушла отдельным запросом
+    assert pool.stats["pack_fallbacks"] > 0
+    assert fake.requests == pool.stats["requests"]
+
+
+def test_interactive_call_is_not_queued_behind_background_batch(monkeypatch):
+    """Фоновая пачка выбирает свою долю бюджета и мест, обобщение для ответа по кнопке идёт сразу."""
+    _fresh_models(monkeypatch)
+    latency = 0.2
+    # 30 запросов в минуту с запасом на 10 с (5 сразу, дальше раз в 2 с); фоновым — половина бюджета и 2 места из 4
+    pool = SummarizerPool(4, 30, 10**9, 0, 1, background_share=0.5)
+
+    async def scenario() -> tuple[float, bool, tuple[str, str | None]]:
+        async with services(gemini=FakeGemini(latency).app()):
+            with background_parsing():
+                batch = asyncio.create_task(pool.summarize_batch(_articles(20, long_every=1), API_KEY))
+            # Фоновая пачка успевает выбрать всё, что ей доступно
+            await asyncio.sleep(3 * latency)
+            started = time.perf_counter()
+            result = await pool.summarize("МЕТКА-кнопка\n" + "Текст новости. " * 200, API_KEY)
+            elapsed = time.perf_counter() - started
+            background_busy = not batch.done()
+            batch.cancel()
+            await asyncio.gather(batch, return_exceptions=True)
+        return elapsed, background_busy, result
+
+    elapsed, background_busy, (summary, model) = asyncio.run(scenario())
+
+    assert summary == "Обобщение: МЕТКА-кнопка" and model is not None
+    assert background_busy
+    # Без резерва фоновая пачка выбрала бы весь запас, и запрос ждал бы следующего токена (секунды)
+    assert elapsed < 3 * latency, f"обобщение для кнопки заняло {elapsed:.2f} с"
+    assert pool.stats["background_requests"] >= 2
+
+
+def test_interactive_calls_fall_back_when_budget_wait_expires(monkeypatch):
+    """Нажатия сверх бюджета не стоят в очереди за токенами: через interactive_wait — обрезанный текст."""
+    _fresh_models(monkeypatch)
+    wait = 0.3
+    # 6 запросов в минуту: в корзине один запрос, следующий — через 10 с
+    pool = SummarizerPool(4, 6, 10**9, 0, 1, interactive_wait=wait)
+    presses = [f"МЕТКА-{i}\n" + "Текст новости. " * 200 for i in range(4)]
+
+    async def scenario() -> tuple[float, list[tuple[str, str | None]]]:
+        async with services(gemini=FakeGemini(0.05).app()):
+            started = time.perf_counter()
+            results = await asyncio.gather(*(pool.summarize(text, API_KEY) for text in presses))
+            return time.perf_counter() - started, results
+
+    elapsed, results = asyncio.run(scenario())
+
+    summarized = [summary for summary, model in results if model is not None]
+    assert len(summarized) == 1 and summarized[0].startswith("Обобщение: МЕТКА-")
+    for i, (summary, model) in enumerate(results):
+        if model is None:
+            assert summary.startswith(f"МЕТКА-{i}")
+    assert pool.stats["budget_timeouts"] == pool.stats["fallbacks"] == 3
+    assert elapsed < wait + 1, f"нажатия ждали бюджета {elapsed:.2f} с"
@@ -0,0 +1,46 @@
+"""
+Сервер webhook (bot/webhook.py): проверка секрета и разбор тела обновления.
+"""
+import asyncio
+
+import aiohttp
+from telegram.ext import ApplicationBuilder
+
+from bot.webhook import SECRET_HEADER, start_webhook_server
+from scripts.fake_services import free_port
+from support import BOT_TOKEN
+
+PATH = "/telegram/webhook"
+SECRET = "test-secret"
+
+
+def test_webhook_rejects_bodies_that_are_not_updates():
+    """Чужой секрет — 403, не JSON и JSON не-объект — 400, обновление — 200 и попадает в очередь."""
+    application = ApplicationBuilder().token(BOT_TOKEN).updater(None).build()
+    port = free_port()
+
+    async def scenario() -> tuple[list[int], int]:
+        runner = await start_webhook_server(application, "127.0.0.1", port, PATH, SECRET)
+        url = f"http://127.0.0.1:{port}{PATH}"
+        headers = {SECRET_HEADER: SECRET}
+        bodies = [
+            ({SECRET_HEADER: "wrong"}, b"{}"),
+            (headers, b"not json"),
+            (headers, b"[]"),
+            (headers, b'"x"'),
+            (headers, b'{"update_id": 1}'),
+        ]
+        try:
+            async with aiohttp.ClientSession() as session:
+                statuses = []
+                for request_headers, body in bodies:
+                    async with session.post(url, data=body, headers=request_headers) as response:
+                        statuses.append(response.status)
+        finally:
+            await runner.cleanup()
+        return statuses, application.update_queue.qsize()
+
+    statuses, queued = asyncio.run(scenario())
+
+    assert statuses == [403, 400, 400, 400, 200]
+    assert queued == 1
@@ -0,0 +1,116 @@
+"""
+Кэширование и объединение одинаковых одновременных запросов.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одним ключом: функция выполняется один раз,
+    все ожидающие получают тот же результат (или то же исключение).
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Выполняется ли сейчас вызов с этим ключом."""
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет fn() или присоединяется к уже идущему вызову с тем же ключом."""
+        fut = self._calls.get(key)
+        if fut is not None:
+            self.coalesced += 1
+        else:
+            fut = asyncio.ensure_future(fn())
+            self._calls[key] = fut
+            fut.add_done_callback(lambda _: self._calls.pop(key, None))
+        # shield: отмена одного ожидающего не отменяет общий запрос для остальных
+        return await asyncio.shield(fut)
+
+
+class LRUCache:
+    """Простой LRU-кэш в памяти на maxsize записей."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache:
+    """
+    Кэш с временем жизни записи и ограничением общего размера в байтах.
+    sizeof(value) оценивает размер значения; при превышении max_bytes вытесняются
+    самые давно использованные записи.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int, sizeof: Callable[[Any], int]):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        if key in self._data:
+            self._pop(key)
+        self._data[key] = (time.monotonic() + self.ttl, size, value)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._pop(oldest)
+            self.evictions += 1
+
+    def _pop(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,16 +1,30 @@
 """
 Краткое обобщение текста через Google Gemini API для публикации в одно сообщение Telegram.
+Список моделей (GET /models) кэшируется, у каждой модели есть состояние здоровья
+(недоступна / упёрлась в лимит / здорова) с разрывом цепи; время ответа ограничено дедлайном,
+а медленный ответ дублируется запросом к следующей модели (hedging).
 """
+import asyncio
 import logging
 import re
+import time
+from dataclasses import dataclass
 
+import aiohttp
 import requests
 
+from config import GEMINI_BASE_URL, GEMINI_DEADLINE, GEMINI_HEDGE_DELAY, GEMINI_MODELS_CACHE_TTL
+from utils import http_client
+from utils.cache import SingleFlight
+from utils.metrics import gemini_attempt_seconds, gemini_results
+
 logger = logging.getLogger(__name__)
 
 MAX_SUMMARY_CHARS = 3800
+# Версия промпта: меняйте при изменении build_prompt, чтобы не отдавать старые обобщения из кэша
+PROMPT_VERSION = "v1"
 
-BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+BASE_URL = GEMINI_BASE_URL.rstrip("/")
 
 # Модели по приоритету (часть могла быть снята с поддержки — пробуем по порядку)
 GEMINI_MODELS = [
@@ -24,35 +38,152 @@ GEMINI_MODELS = [
     "gemini-3-pro-preview",
 ]
 
+# Сколько моделей максимум пробуем за одно обобщение
+MAX_MODEL_ATTEMPTS = 3
+# Состояния здоровья модели
+HEALTHY = "healthy"
+DEAD = "dead"  # 404 — модель снята или недоступна для ключа
+RATE_LIMITED = "rate_limited"  # 429
+# Сколько секунд не трогать «мёртвую» модель, модель в лимите (если нет Retry-After)
+# и модель с разорванной цепью после FAILURE_THRESHOLD ошибок подряд
+DEAD_COOLDOWN = 24 * 3600
+RATE_LIMIT_COOLDOWN = 60
+FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 30
+
+
+class GeminiModelError(Exception):
+    """Ошибка вызова конкретной модели: HTTP-статус и Retry-After (если есть)."""
+
+    def __init__(self, model: str, status: int | None, retry_after: float | None = None):
+        super().__init__(f"{model}: HTTP {status}")
+        self.model = model
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class _ModelHealth:
+    """Состояние модели: state, ошибки подряд и до какого момента (monotonic) её пропускать."""
+    state: str = HEALTHY
+    failures: int = 0
+    skip_until: float = 0.0
+
+
+class ModelRegistry:
+    """Кэш списка моделей из API и состояние здоровья каждой модели."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._listed: set[str] | None = None
+        self._listed_at = 0.0
+        self._health: dict[str, _ModelHealth] = {}
+
+    def listed(self) -> set[str] | None:
+        """Закэшированный список моделей из API (None — нет или устарел)."""
+        if self._listed is None or time.monotonic() - self._listed_at >= self.ttl:
+            return None
+        return self._listed
+
+    def set_listed(self, names: set[str]) -> None:
+        self._listed = names
+        self._listed_at = time.monotonic()
+
+    def candidates(self) -> list[str]:
+        """
+        Модели для попытки: по приоритету GEMINI_MODELS, только присутствующие в списке API
+        (если он известен) и без разорванной цепи.
+        """
+        listed = self.listed()
+        order = [*GEMINI_MODELS]
+        if listed:
+            order = [m for m in order if m in listed] or [_pick_model_from_names(listed)]
+        now = time.monotonic()
+        return [m for m in order if m and self._health.get(m, _ModelHealth()).skip_until <= now]
+
+    def record_success(self, model: str) -> None:
+        self._health[model] = _ModelHealth()
+
+    def record_failure(self, model: str, status: int | None, retry_after: float | None = None) -> None:
+        health = self._health.setdefault(model, _ModelHealth())
+        now = time.monotonic()
+        if status == 404:
+            health.state = DEAD
+            health.skip_until = now + DEAD_COOLDOWN
+        elif status == 429:
+            health.state = RATE_LIMITED
+            health.skip_until = now + (retry_after or RATE_LIMIT_COOLDOWN)
+        else:
+            health.failures += 1
+            if health.failures >= FAILURE_THRESHOLD:
+                health.skip_until = now + BREAKER_COOLDOWN
+                health.failures = 0
+
+    def states(self) -> dict[str, str]:
+        """Текущие состояния моделей (для логов и метрик)."""
+        return {model: health.state for model, health in self._health.items()}
+
+
+model_registry = ModelRegistry(ttl=GEMINI_MODELS_CACHE_TTL)
+_models_flight = SingleFlight()
+
+
+def _pick_model_from_names(names: set[str]) -> str | None:
+    for model in GEMINI_MODELS:
+        if model in names:
+            return model
+    if names:
+        return next(iter(names))
+    return None
+
+
+def _model_names(data: dict) -> set[str]:
+    """Имена моделей из ответа GET /models."""
+    return {m.get("name", "").replace("models/", "") for m in (data.get("models") or [])} - {""}
+
+
+def _retry_after(headers) -> float | None:
+    try:
+        return float(headers.get("Retry-After")) if headers and headers.get("Retry-After") else None
+    except (TypeError, ValueError):
+        return None
+
 
-def _get_available_model(api_key: str) -> str | None:
-    """Возвращает первую доступную модель из списка (GET /v1beta/models)."""
+def _refresh_models(api_key: str) -> None:
+    """Обновляет кэш списка моделей (GET /v1beta/models), если он устарел."""
+    if model_registry.listed() is not None:
+        return
     try:
-        resp = requests.get(
+        resp = http_client.get_sync_session().get(
             f"{BASE_URL}/models?key={api_key}",
-            timeout=10,
+            timeout=http_client.sync_timeout(10),
         )
         resp.raise_for_status()
-        data = resp.json()
-        names = {m.get("name", "").replace("models/", "") for m in (data.get("models") or [])}
-        for model in GEMINI_MODELS:
-            if model in names:
-                return model
-        if names:
-            return next(iter(names))
+        model_registry.set_listed(_model_names(resp.json()))
     except Exception as e:
         logger.debug("Could not list Gemini models: %s", e)
-    return None
 
 
-def summarize_for_telegram(full_text: str, api_key: str) -> str:
-    """
-    Отправляет полный текст в Gemini, возвращает краткое обобщение (до MAX_SUMMARY_CHARS).
-    При ошибке (в т.ч. 404 по модели) пробует другие модели; если всё неудача — обрезает текст.
-    """
-    if not api_key or not full_text.strip():
-        return _truncate(full_text, MAX_SUMMARY_CHARS)
-    prompt = f"""Ты — редактор новостей. Обобщи следующий текст новости кратко и по делу на русском языке.
+async def refresh_models_async(api_key: str) -> None:
+    """Асинхронная версия _refresh_models; одновременные обновления объединяются."""
+    if model_registry.listed() is not None:
+        return
+
+    async def _load() -> None:
+        try:
+            session = http_client.get_session()
+            async with session.get(f"{BASE_URL}/models?key={api_key}", timeout=http_client.timeout(10)) as resp:
+                resp.raise_for_status()
+                model_registry.set_listed(_model_names(await resp.json()))
+        except Exception as e:
+            logger.debug("Could not list Gemini models: %s", e)
+
+    await _models_flight.do("models", _load)
+
+
+def build_prompt(full_text: str) -> str:
+    """Промпт для обобщения текста новости."""
+    return f"""Ты — редактор новостей. Обобщи следующий текст новости кратко и по делу на русском языке.
 Сохрани главные факты и суть. Результат не длиннее {MAX_SUMMARY_CHARS} символов — ограничение одного сообщения в мессенджере.
 Пиши сплошным текстом, без подзаголовков. Не добавляй вступлений вроде «Краткое содержание» — только суть новости.
 
@@ -60,54 +191,191 @@ def summarize_for_telegram(full_text: str, api_key: str) -> str:
 ---
 {full_text[:12000]}
 ---"""
-    models_to_try = [*(GEMINI_MODELS)]
-    available = _get_available_model(api_key)
-    if available and available not in models_to_try:
-        models_to_try.insert(0, available)
-    elif available:
-        models_to_try = [available] + [m for m in models_to_try if m != available]
+
+
+def generate_payload(prompt: str, max_tokens: int = 1024, schema: dict | None = None) -> dict:
+    """Тело запроса generateContent; со schema — структурированный ответ в JSON."""
+    generation_config = {
+        "maxOutputTokens": max_tokens,
+        "temperature": 0.3,
+    }
+    if schema is not None:
+        generation_config["responseMimeType"] = "application/json"
+        generation_config["responseSchema"] = schema
+    return {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": generation_config,
+    }
+
+
+def _summary_from_response(data: dict) -> str:
+    """Достаёт текст обобщения из ответа generateContent (пустая строка — ответа нет)."""
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    if not parts:
+        return ""
+    summary = (parts[0].get("text") or "").strip()
+    return re.sub(r"\n{3,}", "\n\n", summary)
+
+
+def summarize_for_telegram(full_text: str, api_key: str) -> str:
+    """
+    Отправляет полный текст в Gemini, возвращает краткое обобщение (до MAX_SUMMARY_CHARS).
+    Пробует до MAX_MODEL_ATTEMPTS здоровых моделей; если всё неудача — обрезает текст.
+    """
+    if not api_key or not full_text.strip():
+        return truncate(full_text, MAX_SUMMARY_CHARS)
+    prompt = build_prompt(full_text)
+    _refresh_models(api_key)
     last_error = None
-    for model in models_to_try:
+    for model in model_registry.candidates()[:MAX_MODEL_ATTEMPTS]:
         url = f"{BASE_URL}/models/{model}:generateContent?key={api_key}"
         try:
-            resp = requests.post(
+            resp = http_client.get_sync_session().post(
                 url,
-                json={
-                    "contents": [{"parts": [{"text": prompt}]}],
-                    "generationConfig": {
-                        "maxOutputTokens": 1024,
-                        "temperature": 0.3,
-                    },
-                },
-                headers={"Content-Type": "application/json"},
-                timeout=30,
+                json=generate_payload(prompt),
+                timeout=http_client.sync_timeout(30),
             )
             resp.raise_for_status()
-            data = resp.json()
-            candidates = data.get("candidates") or []
-            if not candidates:
-                continue
-            parts = (candidates[0].get("content") or {}).get("parts") or []
-            if not parts:
-                continue
-            summary = (parts[0].get("text") or "").strip()
-            summary = re.sub(r"\n{3,}", "\n\n", summary)
+            summary = _summary_from_response(resp.json())
             if summary:
+                model_registry.record_success(model)
+                gemini_results.inc(model)
                 logger.info("Gemini model used: %s", model)
                 return summary[:MAX_SUMMARY_CHARS]
         except requests.HTTPError as e:
             last_error = e
-            if e.response is not None and e.response.status_code == 404:
-                continue
-            break
+            status = e.response.status_code if e.response is not None else None
+            headers = e.response.headers if e.response is not None else None
+            model_registry.record_failure(model, status, _retry_after(headers))
         except Exception as e:
             last_error = e
-            break
+            model_registry.record_failure(model, None)
     logger.warning("Gemini summarize failed (last: %s), using truncate", last_error)
-    return _truncate(full_text, MAX_SUMMARY_CHARS)
+    gemini_results.inc("none")
+    return truncate(full_text, MAX_SUMMARY_CHARS)
+
+
+async def _call_model(model: str, payload: dict, api_key: str) -> str:
+    """
+    Один запрос generateContent к модели. Ошибки HTTP — GeminiModelError.
+    Длительность попадает в метрику попыток с исходом: ok, empty, HTTP-статус, error или cancelled
+    (проигравший запрос при дублировании).
+    """
+    url = f"{BASE_URL}/models/{model}:generateContent?key={api_key}"
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        async with http_client.get_session().post(
+            url,
+            json=payload,
+            timeout=http_client.timeout(30),
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        summary = _summary_from_response(data)
+        outcome = "ok" if summary else "empty"
+        return summary
+    except aiohttp.ClientResponseError as e:
+        outcome = str(e.status)
+        raise GeminiModelError(model, e.status, _retry_after(e.headers)) from e
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        gemini_attempt_seconds.observe(time.perf_counter() - start, model, outcome)
+
+
+async def generate_hedged(payload: dict, api_key: str) -> tuple[str, str | None]:
+    """
+    Запрос generateContent с телом payload (см. generate_payload).
+    Перебирает здоровые модели с общим дедлайном GEMINI_DEADLINE.
+    Если ответ не пришёл за GEMINI_HEDGE_DELAY, параллельно запускается следующая модель;
+    побеждает первый непустой ответ. Возвращает (summary, model) или ("", None).
+    """
+    models = iter(model_registry.candidates()[:MAX_MODEL_ATTEMPTS])
+    pending: dict[asyncio.Task, str] = {}
+    deadline = time.monotonic() + GEMINI_DEADLINE
+    last_error: Exception | None = None
+
+    def launch() -> bool:
+        model = next(models, None)
+        if model is None:
+            return False
+        pending[asyncio.create_task(_call_model(model, payload, api_key))] = model
+        return True
+
+    launch()
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                last_error = TimeoutError(f"deadline {GEMINI_DEADLINE}s")
+                break
+            wait_for = remaining
+            if GEMINI_HEDGE_DELAY > 0 and len(pending) == 1:
+                wait_for = min(remaining, GEMINI_HEDGE_DELAY)
+            done, _ = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # Медленный ответ: дублируем запрос к следующей модели
+                if not launch() and wait_for == remaining:
+                    last_error = TimeoutError(f"deadline {GEMINI_DEADLINE}s")
+                    break
+                continue
+            for task in done:
+                model = pending.pop(task)
+                try:
+                    summary = task.result()
+                except GeminiModelError as e:
+                    last_error = e
+                    model_registry.record_failure(model, e.status, e.retry_after)
+                    continue
+                except Exception as e:
+                    last_error = e
+                    model_registry.record_failure(model, None)
+                    continue
+                if summary:
+                    model_registry.record_success(model)
+                    gemini_results.inc(model)
+                    return summary, model
+            if not pending:
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+    logger.warning("Gemini summarize failed (last: %s)", last_error)
+    gemini_results.inc("none")
+    return "", None
+
+
+async def summarize_with_model_async(full_text: str, api_key: str) -> tuple[str, str | None]:
+    """
+    Обобщение и модель, которая его сделала. Если Gemini не ответил — (обрезанный текст, None):
+    такой результат не является настоящим обобщением и не должен кэшироваться.
+    """
+    if not api_key or not full_text.strip():
+        return truncate(full_text, MAX_SUMMARY_CHARS), None
+    await refresh_models_async(api_key)
+    summary, model = await generate_hedged(generate_payload(build_prompt(full_text)), api_key)
+    if summary:
+        logger.info("Gemini model used: %s", model)
+        return summary[:MAX_SUMMARY_CHARS], model
+    logger.warning("Gemini summarize failed, using truncate")
+    return truncate(full_text, MAX_SUMMARY_CHARS), None
+
+
+async def summarize_for_telegram_async(full_text: str, api_key: str) -> str:
+    """
+    Асинхронная версия summarize_for_telegram — не блокирует цикл событий бота.
+    Время ответа ограничено GEMINI_DEADLINE; при неудаче — обрезка текста.
+    """
+    summary, _ = await summarize_with_model_async(full_text, api_key)
+    return summary
 
 
-def _truncate(text: str, max_len: int) -> str:
+def truncate(text: str, max_len: int) -> str:
     """Обрезает текст до max_len символов с многоточием."""
     text = (text or "").strip()
     if len(text) <= max_len:
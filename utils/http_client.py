@@ -0,0 +1,190 @@
+"""
+Общий HTTP-клиент для парсеров и утилит.
+Один пул keep-alive соединений на процесс (aiohttp — для асинхронного кода, requests.Session — для синхронного),
+ограничение одновременных соединений на хост, кэш DNS, сжатие gzip/brotli и единые таймауты.
+"""
+import asyncio
+import logging
+import threading
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Bot/1.0"
+
+# Единые таймауты (секунды): соединение и общий на запрос
+CONNECT_TIMEOUT = 5
+DEFAULT_TIMEOUT = 15
+
+# Размер пула: всего соединений и одновременно к одному хосту
+POOL_LIMIT = 100
+POOL_LIMIT_PER_HOST = 8
+# Сколько секунд держать адреса хостов в кэше DNS
+DNS_CACHE_TTL = 300
+# Сколько секунд синхронный запрос ждёт свободного соединения пула (дальше — EmptyPoolError)
+SYNC_POOL_TIMEOUT = 30
+
+try:  # brotli декодируется только при установленном пакете Brotli / brotlicffi
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING}
+
+# Счётчики пула асинхронного клиента: hit — соединение взято из пула, miss — открыто новое
+_async_stats = {"pool_hits": 0, "pool_misses": 0}
+
+_session: aiohttp.ClientSession | None = None
+_session_loop: asyncio.AbstractEventLoop | None = None
+
+_sync_session: requests.Session | None = None
+_sync_lock = threading.Lock()
+
+
+def timeout(total: float = DEFAULT_TIMEOUT) -> aiohttp.ClientTimeout:
+    """Таймаут для запроса aiohttp (общий и на соединение)."""
+    return aiohttp.ClientTimeout(total=total, connect=CONNECT_TIMEOUT)
+
+
+def sync_timeout(total: float = DEFAULT_TIMEOUT) -> tuple[float, float]:
+    """Таймаут для requests: (соединение, чтение)."""
+    return (CONNECT_TIMEOUT, total)
+
+
+async def _on_connection_reused(session, ctx, params) -> None:
+    _async_stats["pool_hits"] += 1
+
+
+async def _on_connection_created(session, ctx, params) -> None:
+    _async_stats["pool_misses"] += 1
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Общая aiohttp-сессия процесса. Создаётся лениво в текущем цикле событий;
+    если цикл сменился (например, новый asyncio.run), создаётся заново. Сессию прошлого цикла
+    нужно закрыть (close()) до его завершения: незакрытая сессия другого цикла — ошибка,
+    её соединения закрыть уже нельзя.
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is not None and not _session.closed and _session_loop is not loop:
+        raise RuntimeError(
+            "HTTP-сессия другого цикла событий не закрыта: вызовите http_client.close() до завершения цикла"
+        )
+    if _session is None or _session.closed:
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_reuseconn.append(_on_connection_reused)
+        trace.on_connection_create_end.append(_on_connection_created)
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT,
+            limit_per_host=POOL_LIMIT_PER_HOST,
+            use_dns_cache=True,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=60,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout(),
+            headers=DEFAULT_HEADERS,
+            trace_configs=[trace],
+        )
+        _session_loop = loop
+    return _session
+
+
+class _BoundedWaitHTTPPool(HTTPConnectionPool):
+    """Пул urllib3, в котором ожидание свободного соединения ограничено SYNC_POOL_TIMEOUT секундами."""
+
+    def _get_conn(self, timeout: float | None = None):
+        return super()._get_conn(timeout=SYNC_POOL_TIMEOUT if timeout is None else timeout)
+
+
+class _BoundedWaitHTTPSPool(HTTPSConnectionPool):
+    def _get_conn(self, timeout: float | None = None):
+        return super()._get_conn(timeout=SYNC_POOL_TIMEOUT if timeout is None else timeout)
+
+
+class _BoundedWaitAdapter(HTTPAdapter):
+    """HTTPAdapter с пулами _BoundedWait*: requests сам не передаёт urllib3 время ожидания пула."""
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _BoundedWaitHTTPPool, "https": _BoundedWaitHTTPSPool}
+
+
+def get_sync_session() -> requests.Session:
+    """
+    Общая requests-сессия для синхронного кода.
+    pool_block=True: при занятых POOL_LIMIT_PER_HOST соединениях к хосту запрос ждёт освобождения,
+    но не дольше SYNC_POOL_TIMEOUT секунд (затем urllib3.exceptions.EmptyPoolError).
+    """
+    global _sync_session
+    with _sync_lock:
+        if _sync_session is None:
+            adapter = _BoundedWaitAdapter(
+                pool_connections=32,
+                pool_maxsize=POOL_LIMIT_PER_HOST,
+                pool_block=True,
+            )
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sync_session = session
+    return _sync_session
+
+
+def _sync_pool_stats() -> tuple[int, int]:
+    """(hits, misses) синхронного пула по счётчикам urllib3-пулов."""
+    if _sync_session is None:
+        return 0, 0
+    requests_total = connections_total = 0
+    for adapter in {id(a): a for a in _sync_session.adapters.values()}.values():
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_total += pool.num_requests
+            connections_total += pool.num_connections
+    return max(requests_total - connections_total, 0), connections_total
+
+
+def pool_stats() -> dict[str, int]:
+    """Счётчики попаданий (повторное использование соединения) и промахов (новое соединение) пула."""
+    sync_hits, sync_misses = _sync_pool_stats()
+    return {
+        "pool_hits": _async_stats["pool_hits"] + sync_hits,
+        "pool_misses": _async_stats["pool_misses"] + sync_misses,
+        "async_pool_hits": _async_stats["pool_hits"],
+        "async_pool_misses": _async_stats["pool_misses"],
+        "sync_pool_hits": sync_hits,
+        "sync_pool_misses": sync_misses,
+    }
+
+
+registry.collect("http", pool_stats)
+
+
+async def close() -> None:
+    """Закрывает общие сессии (вызывать при остановке бота)."""
+    global _session, _sync_session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    with _sync_lock:
+        if _sync_session is not None:
+            _sync_session.close()
+        _sync_session = None
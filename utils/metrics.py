@@ -0,0 +1,202 @@
+"""
+Метрики процесса в формате Prometheus: гистограммы длительности этапов, счётчики
+и счётчики кэшей и очередей, которые модули уже ведут в своих stats (они подключаются
+как сборщики и читаются при каждом запросе /metrics).
+span(stage) измеряет этап обработки: загрузку ленты, статьи, разбор HTML, вызов Gemini, отправку.
+HTTP-сервер метрик запускается вместе с ботом (bot/main.py), порт — METRICS_PORT.
+"""
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "bot_"
+# Границы корзин гистограмм длительности, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик с метками; inc(*значения меток)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Гистограмма с метками: корзины по верхней границе, сумма и число наблюдений."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Метки → [счётчики по корзинам (не накопленные), сумма, число]
+        self._values: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = _labels(self.labelnames, labels, f'le="{_number(float(bound))}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, _INF_BUCKET)} {count}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {count}"
+
+
+class Registry:
+    """Метрики процесса и сборщики чужих stats; render() — текст для /metrics."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: dict[str, Callable[[], dict[str, float]]] = {}
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(self.prefix + name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Histogram:
+        metric = Histogram(self.prefix + name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def collect(self, name: str, stats: Callable[[], dict[str, float]]) -> None:
+        """Подключает словарь счётчиков модуля: каждый ключ станет метрикой {prefix}{name}_{key}."""
+        self._collectors[name] = stats
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, stats in self._collectors.items():
+            try:
+                values = stats()
+            except Exception as e:
+                logger.debug("Метрики %s недоступны: %s", name, e)
+                continue
+            for key, value in values.items():
+                lines.append(f"# TYPE {self.prefix}{name}_{key} untyped")
+                lines.append(f"{self.prefix}{name}_{key} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(PREFIX)
+
+stage_seconds = registry.histogram(
+    "stage_seconds",
+    "Длительность этапов обработки новости, секунды",
+    ("stage",),
+)
+gemini_attempt_seconds = registry.histogram(
+    "gemini_attempt_seconds",
+    "Длительность запросов generateContent по моделям и исходу (ok, empty, HTTP-статус, error, cancelled)",
+    ("model", "outcome"),
+)
+gemini_results = registry.counter(
+    "gemini_results_total",
+    "Обобщения по модели, которая ответила (none — ни одна, текст обрезан)",
+    ("model",),
+)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Измеряет длительность блока как этап stage (в том числе завершившегося исключением)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+
+_runner: web.AppRunner | None = None
+
+
+async def start_server(host: str, port: int) -> None:
+    """Запускает HTTP-сервер с GET /metrics в текущем цикле событий."""
+    global _runner
+    if _runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _runner = runner
+    logger.info("Метрики: http://%s:%d/metrics", host, port)
+
+
+async def stop_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+    _runner = None
@@ -0,0 +1,95 @@
+"""
+MinHash-подписи множеств и LSH-индекс для поиска похожих множеств (оценка меры Жаккара).
+Подпись — num_perm минимумов хэшей элементов при разных хэш-функциях; доля совпадающих
+позиций двух подписей приближает |A ∩ B| / |A ∪ B|. Индекс делит подпись на полосы:
+кандидаты — подписи, совпавшие хотя бы в одной полосе целиком, затем проверяется оценка.
+"""
+import hashlib
+import random
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _base_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    """Построитель подписей: num_perm хэш-функций вида (a·x + b) mod p, одинаковых для всех подписей."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rnd = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rnd.randrange(1, _PRIME), rnd.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+    def signature(self, tokens: Iterable[str]) -> tuple[int, ...]:
+        """Подпись множества токенов; у пустого множества — подпись из максимальных значений."""
+        hashes = [_base_hash(t) for t in set(tokens)]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in self._params)
+
+
+def similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """Оценка меры Жаккара по двум подписям."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class LSHIndex:
+    """
+    Индекс последних max_items подписей с поиском похожих (оценка Жаккара не ниже threshold).
+    bands полос по num_perm / bands позиций: чем больше полос, тем ниже порог, с которого
+    пара попадает в кандидаты. Самые старые подписи вытесняются.
+    """
+
+    def __init__(self, num_perm: int, bands: int, threshold: float, max_items: int):
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.max_items = max_items
+        self._signatures: OrderedDict[Hashable, tuple[int, ...]] = OrderedDict()
+        self._buckets: list[dict[tuple[int, ...], set[Hashable]]] = [{} for _ in range(bands)]
+
+    def _band_keys(self, sig: tuple[int, ...]) -> list[tuple[int, ...]]:
+        return [sig[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+
+    def query(self, sig: tuple[int, ...]) -> list[tuple[Hashable, float]]:
+        """Ключи похожих подписей с оценкой сходства, от самых похожих."""
+        candidates: set[Hashable] = set()
+        for band, key in zip(self._buckets, self._band_keys(sig)):
+            candidates |= band.get(key, set())
+        scored = [(key, similarity(sig, self._signatures[key])) for key in candidates]
+        return sorted((pair for pair in scored if pair[1] >= self.threshold), key=lambda pair: pair[1], reverse=True)
+
+    def add(self, key: Hashable, sig: tuple[int, ...]) -> list[Hashable]:
+        """Добавляет подпись; возвращает ключи вытесненных старых подписей."""
+        if key in self._signatures:
+            self.remove(key)
+        self._signatures[key] = sig
+        for band, band_key in zip(self._buckets, self._band_keys(sig)):
+            band.setdefault(band_key, set()).add(key)
+        evicted = []
+        while len(self._signatures) > self.max_items:
+            oldest = next(iter(self._signatures))
+            self.remove(oldest)
+            evicted.append(oldest)
+        return evicted
+
+    def remove(self, key: Hashable) -> None:
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for band, band_key in zip(self._buckets, self._band_keys(sig)):
+            keys = band.get(band_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del band[band_key]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
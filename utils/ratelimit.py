@@ -0,0 +1,52 @@
+"""
+Ограничение частоты запросов: корзина токенов (token bucket).
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Корзина на capacity токенов, пополняется со скоростью rate токенов в секунду.
+    block(seconds) временно закрывает корзину (например, по Retry-After от API).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, tokens: float = 1) -> float:
+        """Через сколько секунд будет доступно tokens токенов (0 — уже сейчас)."""
+        now = time.monotonic()
+        self._refill(now)
+        wait_blocked = max(0.0, self.blocked_until - now)
+        missing = tokens - self.tokens
+        wait_tokens = missing / self.rate if missing > 0 else 0.0
+        return max(wait_blocked, wait_tokens)
+
+    def consume(self, tokens: float = 1) -> bool:
+        """Забирает токены, если они есть и корзина не заблокирована."""
+        if self.delay(tokens) > 0:
+            return False
+        self.tokens -= tokens
+        return True
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Ждёт, пока появятся токены, и забирает их."""
+        while not self.consume(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+    def block(self, seconds: float) -> None:
+        """Не выдавать токены ближайшие seconds секунд."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def idle(self) -> bool:
+        """Корзина полна и не заблокирована — её состояние можно забыть."""
+        return self.delay(self.capacity) == 0
@@ -0,0 +1,291 @@
+"""
+Общее состояние процессов бота: отметки «уже сделано» (claim), кэш строк, блокировки и корзины
+лимитов скорости. memory — в памяти процесса (бот работает одним экземпляром), redis — в Redis:
+несколько экземпляров bot.main и планировщика видят одни и те же отметки, блокировки и лимиты.
+Бэкенд выбирается STATE_BACKEND; ключи получают префикс STATE_KEY_PREFIX.
+"""
+import asyncio
+import logging
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Protocol
+
+from config import REDIS_URL, STATE_BACKEND, STATE_KEY_PREFIX
+from utils.metrics import registry
+from utils.ratelimit import TokenBucket
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis не установлен — доступен только бэкенд memory
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Сколько ключей держать в памяти (бэкенд memory): при превышении вытесняются самые давние
+MEMORY_MAX_KEYS = 100_000
+
+# Корзина токенов в Redis: пополнение по времени сервера, ответ — сколько секунд ждать (0 — токены забраны)
+TAKE_TOKENS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local tokens = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local have = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+have = math.min(capacity, have + math.max(0, now - updated) * rate)
+local wait = 0
+if have >= tokens then
+    have = have - tokens
+else
+    wait = (tokens - have) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(have), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+# Снятие блокировки только её владельцем (по токену)
+UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Bucket(Protocol):
+    """Корзина лимита скорости: TokenBucket процесса или общая корзина в бэкенде."""
+
+    capacity: float
+
+    async def acquire(self, tokens: float = 1) -> None: ...
+
+
+class StateBackend(ABC):
+    """Общее состояние: отметки, кэш строк, блокировки и корзины лимитов скорости."""
+
+    name: str
+    # Видят ли состояние другие процессы
+    shared: bool
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.stats = {"claims": 0, "claims_taken": 0, "locks": 0, "locks_busy": 0}
+
+    @abstractmethod
+    async def _claim(self, key: str, ttl: float) -> bool: ...
+
+    @abstractmethod
+    async def forget(self, *keys: str) -> None:
+        """Удаляет ключи (отметки, кэш)."""
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+
+    @abstractmethod
+    async def _lock(self, key: str, token: str, ttl: float) -> bool: ...
+
+    @abstractmethod
+    async def _unlock(self, key: str, token: str) -> None: ...
+
+    @abstractmethod
+    def bucket(self, key: str, rate: float, capacity: float) -> Bucket:
+        """Корзина на capacity токенов, пополняется со скоростью rate в секунду."""
+
+    async def close(self) -> None:
+        """Закрывает соединения (вызывать в конце цикла событий)."""
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        """
+        Отметка «сделано» на ttl секунд: True — отметка поставлена сейчас (делать можно),
+        False — она уже стоит (сделал этот или другой процесс).
+        """
+        self.stats["claims"] += 1
+        claimed = await self._claim(key, ttl)
+        if not claimed:
+            self.stats["claims_taken"] += 1
+        return claimed
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float) -> AsyncIterator[bool]:
+        """
+        Блокировка без ожидания: внутри блока — True, если она взята, False — если её держит другой.
+        ttl — страховка: блокировка упавшего процесса снимается сама через ttl секунд.
+        """
+        token = secrets.token_hex(8)
+        acquired = await self._lock(key, token, ttl)
+        self.stats["locks"] += 1
+        if not acquired:
+            self.stats["locks_busy"] += 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await self._unlock(key, token)
+
+
+class MemoryState(StateBackend):
+    """Состояние в памяти процесса: ключи с временем жизни (LRU до MEMORY_MAX_KEYS) и TokenBucket."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self, prefix: str, max_keys: int = MEMORY_MAX_KEYS):
+        super().__init__(prefix)
+        self.max_keys = max_keys
+        # Ключ → (значение, срок годности по time.monotonic)
+        self._data: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def _live(self, key: str, now: float) -> str | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value: str, ttl: float, now: float) -> None:
+        self._data[key] = (value, now + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+
+    async def _claim(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        if self._live(key, now) is not None:
+            return False
+        self._put(key, "1", ttl, now)
+        return True
+
+    async def forget(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def get(self, key: str) -> str | None:
+        return self._live(key, time.monotonic())
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._put(key, value, ttl, time.monotonic())
+
+    async def _lock(self, key: str, token: str, ttl: float) -> bool:
+        now = time.monotonic()
+        if self._live(key, now) is not None:
+            return False
+        self._put(key, token, ttl, now)
+        return True
+
+    async def _unlock(self, key: str, token: str) -> None:
+        if self._live(key, time.monotonic()) == token:
+            del self._data[key]
+
+    def bucket(self, key: str, rate: float, capacity: float) -> Bucket:
+        return TokenBucket(rate, capacity)
+
+
+class _RedisBucket:
+    """Корзина токенов в Redis, общая для всех процессов с тем же ключом."""
+
+    def __init__(self, state: "RedisState", key: str, rate: float, capacity: float):
+        self._state = state
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Ждёт, пока появятся токены, и забирает их."""
+        while True:
+            wait = await self._state.take(self.key, self.rate, self.capacity, tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class RedisState(StateBackend):
+    """Состояние в Redis: SET NX с временем жизни, блокировки с токеном владельца, корзины на Lua."""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, prefix: str, url: str):
+        if aioredis is None:
+            raise RuntimeError("STATE_BACKEND=redis, но пакет redis не установлен (pip install redis)")
+        super().__init__(prefix)
+        self.url = url
+        # Клиент привязан к циклу событий: пересоздаём, если цикл сменился (планировщик)
+        self._redis = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._take_tokens = None
+        self._unlock_script = None
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            self._redis = aioredis.from_url(self.url, decode_responses=True)
+            self._take_tokens = self._redis.register_script(TAKE_TOKENS_SCRIPT)
+            self._unlock_script = self._redis.register_script(UNLOCK_SCRIPT)
+            self._loop = loop
+        return self._redis
+
+    async def _claim(self, key: str, ttl: float) -> bool:
+        return bool(await self._client().set(self.prefix + key, "1", nx=True, px=max(1, int(ttl * 1000))))
+
+    async def forget(self, *keys: str) -> None:
+        if keys:
+            await self._client().delete(*(self.prefix + key for key in keys))
+
+    async def get(self, key: str) -> str | None:
+        return await self._client().get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._client().set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    async def _lock(self, key: str, token: str, ttl: float) -> bool:
+        return bool(await self._client().set(self.prefix + key, token, nx=True, px=max(1, int(ttl * 1000))))
+
+    async def _unlock(self, key: str, token: str) -> None:
+        self._client()
+        try:
+            await self._unlock_script(keys=[self.prefix + key], args=[token])
+        except Exception as e:
+            # Не сняли — блокировка истечёт сама через ttl
+            logger.warning("Не удалось снять блокировку %s: %s", key, e)
+
+    async def take(self, key: str, rate: float, capacity: float, tokens: float = 1) -> float:
+        """Забирает tokens токенов корзины key; возвращает, сколько секунд ждать (0 — забраны)."""
+        self._client()
+        wait = await self._take_tokens(keys=[self.prefix + key], args=[rate, capacity, tokens])
+        return float(wait)
+
+    def bucket(self, key: str, rate: float, capacity: float) -> Bucket:
+        return _RedisBucket(self, f"bucket:{key}", rate, capacity)
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+        self._redis = None
+        self._loop = None
+
+
+def make_state_backend(name: str, prefix: str = STATE_KEY_PREFIX, url: str = REDIS_URL) -> StateBackend:
+    """Бэкенд состояния по имени: "memory" или "redis"."""
+    if name == MemoryState.name:
+        return MemoryState(prefix)
+    if name == RedisState.name:
+        return RedisState(prefix, url)
+    raise ValueError(f"Неизвестный бэкенд состояния: {name}")
+
+
+state_backend = make_state_backend(STATE_BACKEND)
+registry.collect("state", lambda: state_backend.stats)
@@ -0,0 +1,253 @@
+"""
+Пул обобщений через Gemini для пачки статей.
+Статьи обрабатываются параллельно, но не больше GEMINI_CONCURRENCY запросов одновременно
+и в пределах бюджета запросов (GEMINI_RPM) и токенов (GEMINI_TPM) в минуту.
+Короткие статьи упаковываются по несколько в один запрос generateContent
+со структурированным ответом (JSON-массив {id, summary}).
+Результаты возвращаются в порядке входа. Если упакованный ответ не разобрался,
+его статьи обобщаются по одной; если и это не удалось — текст обрезается.
+Фоновые обобщения (автопостинг и предзагрузка идут внутри background_parsing) занимают
+не больше GEMINI_BACKGROUND_SHARE бюджета и мест пула: остаток зарезервирован за ответами по кнопке.
+Ответ по кнопке ждёт места и бюджета не дольше GEMINI_BUDGET_WAIT, затем получает обрезанный текст.
+"""
+import asyncio
+import json
+import logging
+from contextlib import nullcontext
+
+from config import (
+    GEMINI_BACKGROUND_SHARE,
+    GEMINI_BUDGET_WAIT,
+    GEMINI_CONCURRENCY,
+    GEMINI_DEADLINE,
+    GEMINI_PACK_MAX_CHARS,
+    GEMINI_PACK_MAX_ITEMS,
+    GEMINI_RPM,
+    GEMINI_TPM,
+)
+from parser.executor import BACKGROUND, current_priority
+from utils.gemini import (
+    MAX_SUMMARY_CHARS,
+    build_prompt,
+    generate_hedged,
+    generate_payload,
+    refresh_models_async,
+    truncate,
+)
+from utils.metrics import registry
+from utils.state import state_backend
+
+logger = logging.getLogger(__name__)
+
+# Грубая оценка: символов текста на токен (для бюджета токенов в минуту)
+CHARS_PER_TOKEN = 3
+MAX_OUTPUT_TOKENS = 1024
+# Корзины бюджета вмещают запросы и токены за столько секунд (допустимый всплеск)
+BUDGET_BURST_SECONDS = 10
+
+PACK_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "summary": {"type": "STRING"},
+        },
+        "required": ["id", "summary"],
+    },
+}
+
+
+def _build_pack_prompt(texts: list[str]) -> str:
+    """Промпт для нескольких коротких новостей сразу; ответ — JSON-массив по схеме PACK_SCHEMA."""
+    articles = "\n\n".join(f"[{i}]\n{text}" for i, text in enumerate(texts))
+    return f"""Ты — редактор новостей. Ниже {len(texts)} отдельных новостей, каждая начинается с номера в квадратных скобках.
+Обобщи каждую новость отдельно, кратко и по делу на русском языке, сохрани главные факты и суть.
+Каждое обобщение не длиннее {MAX_SUMMARY_CHARS} символов, сплошным текстом, без подзаголовков и вступлений.
+Верни JSON-массив объектов {{"id": номер новости, "summary": обобщение}} — по одному на каждую новость.
+
+{articles}"""
+
+
+def _parse_pack(raw: str, count: int) -> dict[int, str]:
+    """Обобщения из упакованного ответа по номерам; неверные и пустые записи пропускаются."""
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return {}
+    result = {}
+    for entry in data if isinstance(data, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        idx, summary = entry.get("id"), entry.get("summary")
+        if isinstance(idx, int) and 0 <= idx < count and isinstance(summary, str) and summary.strip():
+            result[idx] = summary.strip()[:MAX_SUMMARY_CHARS]
+    return result
+
+
+def _estimate_tokens(text: str, output_tokens: int) -> int:
+    return len(text) // CHARS_PER_TOKEN + output_tokens
+
+
+class SummarizerPool:
+    """Пул запросов к Gemini с ограничением параллельности, бюджетом в минуту и упаковкой коротких статей."""
+
+    def __init__(
+        self,
+        concurrency: int,
+        rpm: float,
+        tpm: float,
+        pack_max_chars: int,
+        pack_max_items: int,
+        background_share: float = 1.0,
+        interactive_wait: float | None = None,
+    ):
+        self.concurrency = concurrency
+        self.pack_max_chars = pack_max_chars
+        self.pack_max_items = pack_max_items
+        # Сколько ответ по кнопке ждёт места и бюджета (None — сколько нужно)
+        self.interactive_wait = interactive_wait
+        # Бюджет ключа API общий для всех процессов бота (при STATE_BACKEND=redis)
+        self._requests = state_backend.bucket("gemini_requests", rpm / 60, max(1.0, rpm / 60 * BUDGET_BURST_SECONDS))
+        self._tokens = state_backend.bucket("gemini_tokens", tpm / 60, max(1.0, tpm / 60 * BUDGET_BURST_SECONDS))
+        # Фоновые вызовы сначала проходят через свои, меньшие корзины и места
+        rpm, tpm = rpm * background_share, tpm * background_share
+        self._background_requests = state_backend.bucket(
+            "gemini_background_requests", rpm / 60, max(1.0, rpm / 60 * BUDGET_BURST_SECONDS)
+        )
+        self._background_tokens = state_backend.bucket(
+            "gemini_background_tokens", tpm / 60, max(1.0, tpm / 60 * BUDGET_BURST_SECONDS)
+        )
+        self.background_concurrency = max(1, min(concurrency - 1, int(concurrency * background_share)))
+        # Семафоры привязаны к циклу событий: пересоздаём, если цикл сменился (планировщик)
+        self._semaphore: asyncio.Semaphore | None = None
+        self._background_semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.stats = {
+            "requests": 0,
+            "background_requests": 0,
+            "packed_requests": 0,
+            "pack_fallbacks": 0,
+            "fallbacks": 0,
+            "budget_timeouts": 0,
+        }
+
+    def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._background_semaphore = asyncio.Semaphore(self.background_concurrency)
+            self._loop = loop
+
+    async def _reserve(self, background: bool, tokens: int) -> None:
+        """Место в пуле и бюджет на один вызов (для фоновых — и в пределах их доли)."""
+        await self._semaphore.acquire()
+        try:
+            if background:
+                await self._background_requests.acquire()
+                await self._background_tokens.acquire(min(tokens, self._background_tokens.capacity))
+                self.stats["background_requests"] += 1
+            await self._requests.acquire()
+            await self._tokens.acquire(min(tokens, self._tokens.capacity))
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def _generate(self, payload: dict, api_key: str, tokens: int) -> tuple[str, str | None]:
+        """Один вызов Gemini внутри ограничений пула; ("", None), если ответ по кнопке не дождался бюджета."""
+        self._bind()
+        background = current_priority() == BACKGROUND
+        async with self._background_semaphore if background else nullcontext():
+            try:
+                await asyncio.wait_for(self._reserve(background, tokens), None if background else self.interactive_wait)
+            except asyncio.TimeoutError:
+                self.stats["budget_timeouts"] += 1
+                logger.info("Gemini: бюджет запросов занят, вместо обобщения — обрезанный текст")
+                return "", None
+            try:
+                self.stats["requests"] += 1
+                return await generate_hedged(payload, api_key)
+            finally:
+                self._semaphore.release()
+
+    async def _summarize_one(self, text: str, api_key: str) -> tuple[str, str | None]:
+        prompt = build_prompt(text)
+        summary, model = await self._generate(
+            generate_payload(prompt, MAX_OUTPUT_TOKENS),
+            api_key,
+            _estimate_tokens(prompt, MAX_OUTPUT_TOKENS),
+        )
+        if summary:
+            return summary[:MAX_SUMMARY_CHARS], model
+        self.stats["fallbacks"] += 1
+        return truncate(text, MAX_SUMMARY_CHARS), None
+
+    async def _summarize_pack(self, texts: list[str], api_key: str) -> list[tuple[str, str | None]]:
+        prompt = _build_pack_prompt(texts)
+        output_tokens = MAX_OUTPUT_TOKENS * len(texts)
+        self.stats["packed_requests"] += 1
+        raw, model = await self._generate(
+            generate_payload(prompt, output_tokens, PACK_SCHEMA),
+            api_key,
+            _estimate_tokens(prompt, output_tokens),
+        )
+        if model is None:
+            # Gemini не ответил вовсе — повтор по одной статье упрётся в то же самое
+            self.stats["fallbacks"] += len(texts)
+            return [(truncate(text, MAX_SUMMARY_CHARS), None) for text in texts]
+        parsed = _parse_pack(raw, len(texts))
+        missing = [i for i in range(len(texts)) if i not in parsed]
+        if missing:
+            self.stats["pack_fallbacks"] += len(missing)
+            logger.info("Gemini: в упакованном ответе нет %d из %d обобщений, обобщаем по одной", len(missing), len(texts))
+        retried = await asyncio.gather(*(self._summarize_one(texts[i], api_key) for i in missing))
+        results = {i: (summary, model) for i, summary in parsed.items()}
+        results.update(zip(missing, retried))
+        return [results[i] for i in range(len(texts))]
+
+    async def summarize_batch(self, texts: list[str], api_key: str) -> list[tuple[str, str | None]]:
+        """
+        Обобщения для texts в том же порядке: (текст, модель) или (обрезанный текст, None),
+        если Gemini не справился — такой результат не кэшируется.
+        """
+        results: list[tuple[str, str | None] | None] = [None] * len(texts)
+        todo = []
+        for i, text in enumerate(texts):
+            if api_key and text.strip():
+                todo.append(i)
+            else:
+                results[i] = (truncate(text, MAX_SUMMARY_CHARS), None)
+        if todo:
+            await refresh_models_async(api_key)
+        short = [i for i in todo if self.pack_max_items > 1 and len(texts[i]) <= self.pack_max_chars]
+        packs = [short[k:k + self.pack_max_items] for k in range(0, len(short), self.pack_max_items)]
+        short_set = set(short)
+        # Пачка из одной статьи — обычный запрос
+        singles = [i for i in todo if i not in short_set] + [p[0] for p in packs if len(p) == 1]
+        packs = [p for p in packs if len(p) > 1]
+
+        async def run_single(i: int) -> None:
+            results[i] = await self._summarize_one(texts[i], api_key)
+
+        async def run_pack(indexes: list[int]) -> None:
+            for i, result in zip(indexes, await self._summarize_pack([texts[i] for i in indexes], api_key)):
+                results[i] = result
+
+        await asyncio.gather(*(run_single(i) for i in singles), *(run_pack(p) for p in packs))
+        return results
+
+    async def summarize(self, text: str, api_key: str) -> tuple[str, str | None]:
+        """Обобщение одной статьи через тот же пул (общий бюджет с пакетными вызовами)."""
+        return (await self.summarize_batch([text], api_key))[0]
+
+
+summarizer_pool = SummarizerPool(
+    GEMINI_CONCURRENCY,
+    GEMINI_RPM,
+    GEMINI_TPM,
+    GEMINI_PACK_MAX_CHARS,
+    GEMINI_PACK_MAX_ITEMS,
+    GEMINI_BACKGROUND_SHARE,
+    min(GEMINI_BUDGET_WAIT, GEMINI_DEADLINE),
+)
+registry.collect("summarizer", lambda: summarizer_pool.stats)
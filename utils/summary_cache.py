@@ -0,0 +1,132 @@
+"""
+Кэш обобщений статей: LRU в памяти процесса перед таблицей summaries в Postgres.
+Ключ — (нормализованный URL, sha256 текста, версия промпта): Gemini вызывается один раз на статью.
+Промахи уходят в пул обобщений (utils/summarizer.py); запасной результат (обрезка текста без Gemini)
+не кэшируется. При нескольких экземплярах бота (STATE_BACKEND=redis) между LRU и БД стоит общий
+кэш в Redis: статью, обобщённую одним экземпляром, другой берёт оттуда, не обращаясь к БД.
+"""
+import asyncio
+import hashlib
+import logging
+
+from database.summaries import get_summary, save_summary
+from utils.cache import LRUCache, SingleFlight
+from utils.gemini import PROMPT_VERSION
+from utils.metrics import registry
+from utils.state import state_backend
+from utils.summarizer import summarizer_pool
+from utils.urls import normalize_url, url_hash
+
+logger = logging.getLogger(__name__)
+
+LRU_SIZE = 1024
+# Сколько секунд обобщение живёт в общем кэше (STATE_BACKEND=redis)
+SHARED_TTL = 24 * 3600
+
+
+class SummaryCache:
+    """Обобщения статей с кэшем в памяти и в БД; одновременные запросы одной статьи объединяются."""
+
+    def __init__(self, maxsize: int = LRU_SIZE):
+        self._lru = LRUCache(maxsize)
+        self._flight = SingleFlight()
+        self.stats = {"db_hits": 0, "shared_hits": 0, "generated": 0, "fallbacks": 0}
+
+    @staticmethod
+    def key(url: str, full_text: str, prompt_version: str = PROMPT_VERSION) -> tuple[str, str, str]:
+        content_hash = hashlib.sha256(full_text.strip().encode("utf-8")).hexdigest()
+        return normalize_url(url), content_hash, prompt_version
+
+    async def summarize(self, url: str, full_text: str, api_key: str) -> str:
+        """Обобщение статьи: из LRU, из БД или (один раз) через Gemini."""
+        key = self.key(url, full_text)
+        cached = self._lru.get(key)
+        if cached is not None:
+            return cached
+        return await self._flight.do(key, lambda: self._load(key, full_text, api_key))
+
+    @staticmethod
+    def _shared_key(key: tuple[str, str, str]) -> str:
+        url, content_hash, prompt_version = key
+        return f"summary:{url_hash(url)}:{content_hash}:{prompt_version}"
+
+    async def _stored(self, key: tuple[str, str, str]) -> str | None:
+        if state_backend.shared:
+            try:
+                shared = await state_backend.get(self._shared_key(key))
+            except Exception as e:
+                logger.debug("SummaryCache: общий кэш недоступен при чтении: %s", e)
+                shared = None
+            if shared:
+                self.stats["shared_hits"] += 1
+                self._lru.set(key, shared)
+                return shared
+        try:
+            stored = await get_summary(*key)
+        except Exception as e:
+            logger.debug("SummaryCache: БД недоступна при чтении: %s", e)
+            return None
+        if stored:
+            self.stats["db_hits"] += 1
+            self._lru.set(key, stored)
+        return stored
+
+    async def _store(self, key: tuple[str, str, str], summary: str, model: str | None) -> None:
+        if model is None:
+            self.stats["fallbacks"] += 1
+            return
+        self.stats["generated"] += 1
+        self._lru.set(key, summary)
+        if state_backend.shared:
+            try:
+                await state_backend.set(self._shared_key(key), summary, SHARED_TTL)
+            except Exception as e:
+                logger.debug("SummaryCache: не удалось сохранить в общий кэш: %s", e)
+        try:
+            await save_summary(*key, summary, model)
+        except Exception as e:
+            logger.debug("SummaryCache: не удалось сохранить обобщение: %s", e)
+
+    async def _load(self, key: tuple[str, str, str], full_text: str, api_key: str) -> str:
+        stored = await self._stored(key)
+        if stored:
+            return stored
+        summary, model = await summarizer_pool.summarize(full_text, api_key)
+        await self._store(key, summary, model)
+        return summary
+
+    async def summarize_many(self, articles: list[tuple[str, str]], api_key: str) -> list[str]:
+        """
+        Обобщения для пачки статей (url, полный текст) в том же порядке.
+        Найденные в LRU и БД берутся оттуда, остальные одним вызовом пула обобщений
+        (параллельно, с упаковкой коротких статей); одинаковые статьи обобщаются один раз.
+        """
+        keys = [self.key(url, text) for url, text in articles]
+        results: dict[tuple[str, str, str], str] = {}
+        for key in keys:
+            cached = self._lru.get(key)
+            if cached is not None:
+                results[key] = cached
+        unique = {key: text for key, (_, text) in zip(keys, articles) if key not in results}
+        stored = await asyncio.gather(*(self._stored(key) for key in unique))
+        for key, summary in zip(list(unique), stored):
+            if summary:
+                results[key] = summary
+                del unique[key]
+        generated = await summarizer_pool.summarize_batch(list(unique.values()), api_key)
+        for key, (summary, model) in zip(list(unique), generated):
+            await self._store(key, summary, model)
+            results[key] = summary
+        return [results[key] for key in keys]
+
+    def snapshot_stats(self) -> dict[str, int]:
+        return {
+            **self.stats,
+            "lru_hits": self._lru.hits,
+            "lru_misses": self._lru.misses,
+            "coalesced": self._flight.coalesced,
+        }
+
+
+summary_cache = SummaryCache()
+registry.collect("summary_cache", summary_cache.snapshot_stats)
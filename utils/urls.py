@@ -0,0 +1,34 @@
+"""
+Нормализация ссылок на статьи: один и тот же материал — один ключ в кэшах и хранилищах.
+"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Параметры ссылки, не влияющие на содержимое страницы
+_TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "from", "ref"}
+
+
+def _is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param.startswith("utm_") or param in _TRACKING_PARAMS
+
+
+def normalize_url(url: str) -> str:
+    """
+    Приводит URL к каноническому виду: https, хост в нижнем регистре без www,
+    без фрагмента, трекинговых параметров и завершающего слэша.
+    """
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def url_hash(url: str) -> int:
+    """64-битный хэш нормализованного URL (знаковое целое — помещается в BIGINT)."""
+    digest = hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)